@@ -1,265 +1,543 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import asyncio
 import os
-import google.generativeai as genai
-from calendar_utils import create_event, get_free_slots, get_calendar_service, TEST_CALENDAR_ID
+import logging
+from gemini_pool import GeminiKeyPool, NoKeyAvailable
+import fast_parser
+import prompts
+import intent_schema
+import resilience
+from token_ledger import TokenLedger
+from intent_cache import IntentCache
+from booking import IdempotentCalls, SlotReservationTimeout, booking_key, event_id
+from calendar_utils import (book_if_free, fetch_busy_snapshot, find_common_slots, get_event, get_free_slots,
+                            is_busy)
+from tenants import get_tenant
+from tracing import set_request_attribute, span
+import timeutils
 import datetime
 import re
-from dateutil import parser as dateparser
-import pytz
 
-# Read multiple API keys from .env
+# Read multiple API keys from .env. Without any, only turns the local parser handles get answered
 GEMINI_API_KEYS = os.getenv('GEMINI_API_KEYS', '').split(',')
 GEMINI_API_KEYS = [k.strip() for k in GEMINI_API_KEYS if k.strip()]
-if not GEMINI_API_KEYS:
-    raise ValueError('No Gemini API keys found in .env!')
 
-model: genai.GenerativeModel | None = None
-current_key_index = 0
+log = logging.getLogger(__name__)
 
-def set_gemini_key(index):
-    global model
-    genai.configure(api_key=GEMINI_API_KEYS[index])
-    model = genai.GenerativeModel('models/gemini-1.5-flash')
+# Days of busy time (from today, in the user's zone) fetched while Gemini works out the intent; 0 = off
+PREFETCH_DAYS = int(os.getenv('PREFETCH_DAYS', '2'))
 
-set_gemini_key(0)
+# While Gemini is failing, local-parser intents down to this confidence are acted on
+DEGRADED_MIN_CONFIDENCE = float(os.getenv('DEGRADED_MIN_CONFIDENCE', '0.5'))
+
+TROUBLE_REPLY = "Sorry, I had trouble processing your request."
+GEMINI_DOWN_REPLY = (TROUBLE_REPLY + " Clearly phrased requests still work, like \"book Team sync "
+                     "tomorrow at 3pm\" or \"what's free on Friday?\".")
+CALENDAR_DOWN_REPLY = "Sorry, I can't reach your calendar right now. Please try again in a minute."
+SLOT_BUSY_REPLY = "That time is being booked by someone else right now. Please try again in a moment."
+
+# One client per key; calls are spread across keys by remaining per-minute quota
+gemini_pool = GeminiKeyPool(GEMINI_API_KEYS) if GEMINI_API_KEYS else None
+
+# Input/output tokens per call, by prompt template and intent
+token_ledger = TokenLedger()
+# How often model JSON validates first time, after a repair retry, or not at all
+parse_stats = intent_schema.ParseStats()
+
+def gemini_pool_for(tenant=None):
+    """The tenant's own key pool, else the shared one. Raises NoKeyAvailable if there is neither."""
+    pool = (tenant and tenant.gemini_pool) or gemini_pool
+    if pool is None:
+        raise NoKeyAvailable('No Gemini API keys configured (GEMINI_API_KEYS)')
+    return pool
+
+def warm_up(tenant=None):
+    """
+    Load the Gemini SDK and build the key pool's models, then build the tenant's Calendar
+    service, so the first chat turn doesn't pay for either. Failures are logged, not raised:
+    the same setup is retried lazily on first use.
+    """
+    tenant = tenant or get_tenant()
+    try:
+        with span('startup.gemini'):
+            gemini_pool_for(tenant).warm_up((prompts.CHAT_JSON.system, prompts.CHAT.system))
+    except Exception as e:
+        log.warning("Gemini warm-up skipped: %s", e)
+    try:
+        with span('startup.calendar'):
+            tenant.calendar.get_service()
+    except Exception as e:
+        log.warning("Calendar warm-up skipped: %s", e)
 
 def extract_booking_info(user_message):
     """
     Use Gemini to extract summary, date, start time, and end time from the user's message.
     Returns a dict with keys: summary, date, start_time, end_time (all as strings or None).
     """
-    global model
-    # Get current date for reference
-    current_date = datetime.datetime.now().strftime('%Y-%m-%d')
-    current_day = datetime.datetime.now().strftime('%A')  # Monday, Tuesday, etc.
-    
-    prompt = f"""
-    Extract the following information from the user's message for booking a calendar event:
-    - Event summary (title) - what the meeting/appointment is about
-    - Date (YYYY-MM-DD format)
-    - Start time (24h format, HH:MM)
-    - End time (24h format, HH:MM)
-    
-    IMPORTANT: Today is {current_date} ({current_day}). Use this as the reference for calculating relative dates.
-    
-    TIME CONVERSION RULES:
-    - "2pm" or "2:00 pm" → "14:00"
-    - "10am" or "10:00 am" → "10:00"
-    - "3:30pm" → "15:30"
-    - "9:15am" → "09:15"
-    - "14:30" (already 24h) → "14:30"
-    
-    Examples:
-    - "Book me a meeting with John tomorrow at 2pm" → summary: "Meeting with John", date: {current_date} + 1 day, start_time: "14:00", end_time: "15:00" (default 1 hour)
-    - "Schedule a call about the project for Friday at 3pm" → summary: "Project call", date: next Friday from {current_date}, start_time: "15:00", end_time: "16:00"
-    - "summary: discussion about pay date: 03-07-2025 start_time: 10:00 am end_time: 10:20 am" → summary: "discussion about pay", date: "2025-07-03", start_time: "10:00", end_time: "10:20"
-    
-    If any information is missing, return null for that field.
-    For relative dates like "tomorrow", "next Monday", calculate the actual date based on today ({current_date}).
-    For times without duration, assume 1 hour duration.
-    
-    User message: {user_message}
-    Respond in JSON with keys: summary, date, start_time, end_time.
-    """
-    if model is None:
-        set_gemini_key(current_key_index)
-    if model is None:
-        raise RuntimeError("Gemini model could not be initialized")
-    response = model.generate_content(prompt)
-    print('Gemini extraction raw response:', response.text)  # <-- Debug print
-    import json
-    raw = response.text.strip()
-    
-    # Remove code block wrappers if present
-    if raw.startswith('```'):
-        lines = raw.split('\n')
-        # Find the JSON content between the code block markers
-        json_lines = []
-        in_json = False
-        for line in lines:
-            if line.strip().startswith('```'):
-                if in_json:
-                    break  # End of JSON block
-                else:
-                    in_json = True
-                    continue
-            if in_json:
-                json_lines.append(line)
-        raw = '\n'.join(json_lines).strip()
-    
-    # Try to find JSON object in the response
+    # Structured or clearly phrased bookings don't need Gemini
+    info, confidence = fast_parser.parse_message(user_message)
+    if confidence >= fast_parser.FAST_PATH_MIN_CONFIDENCE and info['date'] and info['start_time']:
+        try:
+            return intent_schema.validate_booking(info)
+        except intent_schema.InvalidModelOutput as e:
+            log.warning("Discarding fast-path booking %s: %s", info, e)
+
+    now = datetime.datetime.now()
+    prompt = prompts.EXTRACT.render(date=now.strftime('%Y-%m-%d'), weekday=now.strftime('%A'),
+                                    message=user_message)
+    config = intent_schema.json_config(intent_schema.BOOKING_SCHEMA)
+    response = gemini_pool_for().generate_content(prompt, system_instruction=prompts.EXTRACT.system,
+                                                  generation_config=config)
+    token_ledger.record(prompts.EXTRACT.name, response, 'book')
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Gemini extraction raw response: %s", response.text)
     try:
-        # Look for the first { and last } to extract just the JSON
-        start = raw.find('{')
-        end = raw.rfind('}') + 1
-        if start != -1 and end != 0:
-            json_str = raw[start:end]
-            info = json.loads(json_str)
-            print(f"Parsed JSON: {info}")  # Debug print
-        else:
-            raise ValueError("No JSON object found")
-    except Exception as e:
-        print(f"JSON parsing error: {e}")  # Debug print
-        info: dict[str, str | None] = {"summary": None, "date": None, "start_time": None, "end_time": None}
-    
-    # Fallback: try to parse date/time if not in ISO format
-    if info['date']:
+        with span('intent.validate'):
+            info = intent_schema.validate_booking(response.text)
+        parse_stats.record(prompts.EXTRACT.name, 'ok')
+    except intent_schema.InvalidModelOutput as e:
+        # One repair round trip instead of handing the user all-null fields
+        log.warning("Invalid extraction (%s), asking Gemini to repair it", e)
+        response = gemini_pool_for().generate_content(
+            intent_schema.repair_contents(prompt, response.text, e),
+            system_instruction=prompts.EXTRACT.system, generation_config=config)
+        token_ledger.record(prompts.EXTRACT.name, response, 'repair')
         try:
-            dt = dateparser.parse(info['date'], dayfirst=False, yearfirst=True)
-            info['date'] = dt.strftime('%Y-%m-%d')
-        except Exception:
-            info['date'] = None
-    
-    # Improved time parsing
-    for k in ['start_time', 'end_time']:
-        if info.get(k):  # Use .get() to safely check if key exists and has a value
-            try:
-                # First try to parse as a time string
-                time_str = str(info[k]).strip()
-                print(f"Parsing time '{time_str}' for {k}")  # Debug print
-                
-                # Handle common time formats
-                if 'pm' in time_str.lower() or 'am' in time_str.lower():
-                    # Parse 12-hour format
-                    parsed_time = dateparser.parse(time_str)
-                    info[k] = parsed_time.strftime('%H:%M')
-                    print(f"Converted {time_str} to {info[k]}")  # Debug print
-                else:
-                    # Try to parse as 24-hour format
-                    parsed_time = dateparser.parse(time_str)
-                    info[k] = parsed_time.strftime('%H:%M')
-                    print(f"Parsed {time_str} as {info[k]}")  # Debug print
-            except Exception as e:
-                print(f"Time parsing error for {k}: {e}")  # Debug print
-                info[k] = None
-    
-    print(f"Final extracted info: {info}")  # Debug print
+            info = intent_schema.validate_booking(response.text)
+            parse_stats.record(prompts.EXTRACT.name, 'repaired')
+        except intent_schema.InvalidModelOutput as e:
+            log.warning("Extraction still invalid after repair: %s", e)
+            parse_stats.record(prompts.EXTRACT.name, 'failed')
+            info = {"summary": None, "date": None, "start_time": None, "end_time": None}
     return info
 
-def chat_with_agent(user_message, history=None):
-    import json
-    global current_key_index, model
-    current_date = datetime.datetime.now().strftime('%Y-%m-%d')
-    current_day = datetime.datetime.now().strftime('%A')
+def build_chat_prompt(user_message, history=None, now=None, summary=None):
+    """The per-turn part of the chat prompt; the instructions are prompts.CHAT(_JSON).system."""
+    now = now or datetime.datetime.now()
 
     # Build conversation context if history is provided
     conversation = ""
+    if summary:
+        conversation += f"(Earlier in this conversation: {summary})\n"
     if history:
         for msg in history[-6:]:  # Use last 6 turns (user/bot)
             role = "User" if msg["role"] == "user" else "Bot"
             conversation += f"{role}: {msg['content']}\n"
     conversation += f"User: {user_message}\nBot:"
 
-    prompt = f"""
-You are CalPal, a smart AI calendar assistant. Today is {current_date} ({current_day}).
-
-You are having a conversation with a user. Continue the conversation naturally, keeping context from previous turns. If the user wants to book, check, or ask about calendar events, extract and respond as before. If the user is just chatting, reply in a friendly, conversational way as CalPal, referencing previous messages if relevant.
-
-### INTENT types:
-- "book" → user wants to schedule an appointment.
-- "check_availability" → user is asking if a time is free (but not booking).
-- "ask_slots" → user wants to know all available slots for a day.
-- "confirm_booking" → user is confirming an earlier suggested time.
-- "smalltalk" → general conversation or greeting.
-- "unknown" → intent is unclear.
-
-### Extraction goals:
-- summary → short title of the event.
-- date → in YYYY-MM-DD format (resolve "tomorrow", "next Monday", etc. using today's date).
-- start_time / end_time → in 24h format (HH:MM), assume 1 hour duration if only start_time is provided.
-
-Respond ONLY in JSON like this for booking/slots/availability:
-{{
-  "intent": "...",
-  "summary": "...",
-  "date": "...",
-  "start_time": "...",
-  "end_time": "..."
-}}
-
-If the user is just chatting, reply as CalPal in natural language.
-
-Conversation so far:
-{conversation}
-"""
-
-    # Handle key rotation
-    for _ in range(len(GEMINI_API_KEYS)):
+    return prompts.CHAT.render(date=now.strftime('%Y-%m-%d'), weekday=now.strftime('%A'),
+                               conversation=conversation)
+
+CALENDAR_INTENTS = ("book", "confirm_booking", "check_availability", "ask_slots", "find_common_slot")
+INTENT_FIELDS = ("intent", "summary", "date", "start_time", "end_time", "attendees")
+
+# Parsed intents from Gemini, reused for repeated messages on the same day
+intent_cache = IntentCache()
+
+# Chat-triggered and /book bookings: duplicates in flight or just finished share one insert
+booking_calls = IdempotentCalls()
+
+def _intent_cache_key(user_message, history, tenant):
+    context = ""
+    if history:
+        context = "\n".join(f"{msg['role']}: {msg['content']}" for msg in history[-6:])
+    # Tenants differ in timezone (so "today"), and one tenant's entries must never serve another
+    day = f"{tenant.tenant_id}:{tenant.now().strftime('%Y-%m-%d')}"
+    return IntentCache.make_key(user_message, day, context)
+
+def _checked(info):
+    """A local-parser intent held to the same rules as Gemini's (validate_intent), or None."""
+    if info.get("intent") in (None, "unknown"):
+        return None
+    try:
+        return intent_schema.validate_intent(info)
+    except intent_schema.InvalidModelOutput as e:
+        log.warning("Discarding fast-path intent %s: %s", info, e)
+        return None
+
+def local_intent(user_message, history=None, tenant=None):
+    """
+    Intent dict for the message without calling Gemini: the rule-based parser first,
+    then intents Gemini already extracted for the same message today. None if neither applies.
+    """
+    tenant = tenant or get_tenant()
+    with span('intent.fast_parse') as step:
+        info, confidence = fast_parser.parse_message(user_message, tenant.now())
+        step.set(confidence=confidence)
+    if confidence >= fast_parser.FAST_PATH_MIN_CONFIDENCE:
+        checked = _checked(info)
+        if checked:
+            return checked
+    with span('intent.cache_lookup') as step:
+        cached = intent_cache.get(_intent_cache_key(user_message, history, tenant))
+        step.set(hit=cached is not None)
+    return cached
+
+def degraded_intent(user_message, tenant, error):
+    """
+    What to do when the Gemini call failed: the local parser's intent if it is reasonably sure
+    (DEGRADED_MIN_CONFIDENCE, lower than the usual fast-path bar), else None.
+    """
+    if isinstance(error, resilience.CircuitOpen):
+        log.warning("Gemini unavailable: %s", error)
+    else:
+        log.error("Gemini API error: %s", error, exc_info=error)
+    info, confidence = fast_parser.parse_message(user_message, tenant.now())
+    return _checked(info) if confidence >= DEGRADED_MIN_CONFIDENCE else None
+
+def remember_intent(user_message, history, parsed, tenant=None):
+    # Only calendar intents are cached; chat replies and calendar answers never are
+    if parsed and parsed.get("intent") in CALENDAR_INTENTS:
+        intent_cache.put(_intent_cache_key(user_message, history, tenant or get_tenant()),
+                         {k: parsed.get(k) for k in INTENT_FIELDS})
+
+async def generate_intent(pool, prompt, raw=None, error=None, template=prompts.CHAT_JSON):
+    """
+    Validated intent dict from a JSON-mode Gemini call, with one repair retry; None if the
+    answer is still invalid. Pass raw and error to go straight to the repair for an answer
+    obtained elsewhere (the streaming path). Outcomes are counted under template.name.
+    """
+    config = intent_schema.json_config(intent_schema.INTENT_SCHEMA)
+    if raw is None:
+        response = await pool.generate_content_async(
+            prompt, system_instruction=template.system, generation_config=config)
+        raw = response.text
+        log.debug("Gemini intent raw response: %s", raw)
         try:
-            if model is None:
-                set_gemini_key(current_key_index)
-            response = model.generate_content(prompt)
-            break
+            with span('intent.validate'):
+                parsed = intent_schema.validate_intent(raw)
+        except intent_schema.InvalidModelOutput as e:
+            error = e
+            token_ledger.record(template.name, response, "invalid")
+        else:
+            token_ledger.record(template.name, response, parsed["intent"])
+            parse_stats.record(template.name, "ok")
+            return parsed
+
+    log.warning("Invalid intent JSON (%s), asking Gemini to repair it", error)
+    # The repair is always a JSON-mode call, so it gets the JSON-only rules whatever the template;
+    # its tokens still count towards the template whose answer it repairs, like parse_stats
+    response = await pool.generate_content_async(
+        intent_schema.repair_contents(prompt, raw, error),
+        system_instruction=prompts.CHAT_JSON.system, generation_config=config)
+    token_ledger.record(template.name, response, "repair")
+    try:
+        parsed = intent_schema.validate_intent(response.text)
+    except intent_schema.InvalidModelOutput as e:
+        log.warning("Intent JSON still invalid after repair: %s", e)
+        parse_stats.record(template.name, "failed")
+        return None
+    parse_stats.record(template.name, "repaired")
+    return parsed
+
+def prefetch_busy(tenant):
+    """
+    Start fetching the tenant's busy time for the next PREFETCH_DAYS days, to run alongside the
+    Gemini call. Returns the asyncio task (None if disabled); reply_for_intent uses its result.
+    """
+    if PREFETCH_DAYS <= 0:
+        return None
+    calendar = tenant.calendar
+    today = tenant.now().date()
+    start = timeutils.local_epoch(today, tenant.tz)
+    end = timeutils.local_epoch(today + datetime.timedelta(days=PREFETCH_DAYS), tenant.tz)
+    task = asyncio.ensure_future(calendar.run(fetch_busy_snapshot, start, end, calendar=calendar))
+    # An unused or failed prefetch is fine: the lookups then fetch for themselves
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return task
+
+async def _prefetched(prefetch, tenant, date_str):
+    """The prefetched BusySnapshot if it can answer for date_str (YYYY-MM-DD), else None."""
+    if prefetch is None or not date_str:
+        return None
+    today = tenant.now().date()
+    if not today <= datetime.date.fromisoformat(date_str) < today + datetime.timedelta(days=PREFETCH_DAYS):
+        return None
+    try:
+        return await prefetch
+    except Exception as e:
+        log.warning("Calendar prefetch failed: %s", e)
+        return None
+
+async def chat_with_agent(user_message, history=None, tenant=None, summary=None, session=None):
+    """
+    Reply to one chat turn. session identifies the conversation (main.py passes the tenant-scoped
+    session key); bookings are only deduplicated within it.
+    """
+    tenant = tenant or get_tenant()
+    # Skip Gemini when the intent is already known locally
+    info = local_intent(user_message, history, tenant)
+    if info:
+        return await reply_for_intent(info, tenant=tenant, session=session)
+
+    prompt = build_chat_prompt(user_message, history, tenant.now(), summary)
+    # The likely calendar lookups run while Gemini works out the intent
+    prefetch = prefetch_busy(tenant)
+
+    # The pool picks a key with quota left and moves off keys that hit a 429
+    try:
+        parsed = await generate_intent(gemini_pool_for(tenant), prompt)
+    except Exception as e:
+        parsed = degraded_intent(user_message, tenant, e)
+        if parsed is None:
+            return GEMINI_DOWN_REPLY
+        return await reply_for_intent(parsed, tenant=tenant, prefetch=prefetch, session=session)
+    if parsed is None:
+        return TROUBLE_REPLY
+
+    remember_intent(user_message, history, parsed, tenant)
+    return await reply_for_intent(parsed, parsed.get("reply") or "", tenant, prefetch, session)
+
+_INTENT_RE = re.compile(r'"intent"\s*:\s*"([a-z_]+)"')
+
+def _failure_reply(e):
+    if isinstance(e, SlotReservationTimeout):
+        return SLOT_BUSY_REPLY
+    if isinstance(e, resilience.CircuitOpen):
+        return CALENDAR_DOWN_REPLY if e.name == "calendar" else GEMINI_DOWN_REPLY
+    return TROUBLE_REPLY
+
+async def stream_chat_with_agent(user_message, history=None, tenant=None, summary=None, session=None):
+    """
+    Streaming variant of chat_with_agent. Yields (kind, text) pairs:
+    ("delta", text) for reply text as Gemini produces it, ("status", text) while a calendar
+    lookup runs, and ("reply", text) with the full reply when it was not streamed.
+    Never raises: the exception handlers in main.py can't reach a response that has started,
+    so failures end the stream with a ("reply", apology) instead.
+    """
+    try:
+        async for event in _stream_chat(user_message, history, tenant, summary, session):
+            yield event
+    except Exception as e:
+        log.warning("Streaming chat failed: %s", e, exc_info=not isinstance(e, resilience.CircuitOpen))
+        yield "reply", _failure_reply(e)
+
+async def _next_chunk(chunks):
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
+
+async def _stream_chat(user_message, history, tenant, summary, session):
+    tenant = tenant or get_tenant()
+    info = local_intent(user_message, history, tenant)
+    if info:
+        if info['intent'] in CALENDAR_INTENTS:
+            yield "status", "🔭 Checking your calendar..."
+        yield "reply", await reply_for_intent(info, tenant=tenant, session=session)
+        return
+
+    prompt = build_chat_prompt(user_message, history, tenant.now(), summary)
+    prefetch = prefetch_busy(tenant)
+    pool = gemini_pool_for(tenant)
+    try:
+        response = await pool.generate_content_async(prompt, system_instruction=prompts.CHAT.system,
+                                                     stream=True)
+    except Exception as e:
+        async for event in _degraded_reply(user_message, tenant, e, prefetch, session):
+            yield event
+        return
+
+    # Plain-text replies are forwarded chunk by chunk. A reply that opens with JSON (or a code
+    # fence) is an intent, so it is buffered and handled like chat_with_agent once complete.
+    buffered = ""
+    is_json = None
+    status_sent = False
+    chunks = response.__aiter__()
+    while True:
+        # The call's deadline only covers the first chunk; each later one gets its own
+        try:
+            chunk = await resilience.with_deadline(_next_chunk(chunks), pool.timeout, 'Gemini stream')
         except Exception as e:
-            if 'quota' in str(e).lower() or '429' in str(e):
-                current_key_index = (current_key_index + 1) % len(GEMINI_API_KEYS)
-                set_gemini_key(current_key_index)
+            if resilience.is_transient(e):
+                pool.breaker.failure()
+            if is_json is False:
+                # Part of a chat reply is already on screen; don't act on the message instead
+                log.warning("Gemini stream broke off: %s", e)
+                yield "reply", GEMINI_DOWN_REPLY
+                return
+            async for event in _degraded_reply(user_message, tenant, e, prefetch, session):
+                yield event
+            return
+        if chunk is None:
+            break
+        # The final chunk can carry only finish metadata and no text parts
+        text = chunk.text if chunk.parts else ""
+        if is_json is False:
+            if text:
+                yield "delta", text
+            continue
+        buffered += text
+        stripped = buffered.lstrip()
+        if not stripped:
+            continue
+        if is_json is None:
+            is_json = stripped[0] in "{`"
+            if not is_json:
+                yield "delta", buffered
                 continue
-            else:
-                print(f"Gemini API error: {e}")
-                return "Sorry, I had trouble processing your request."
+        match = _INTENT_RE.search(buffered)
+        if match and match.group(1) in CALENDAR_INTENTS and not status_sent:
+            status_sent = True
+            yield "status", "🔭 Checking your calendar..."
+    if not is_json:
+        # usage_metadata is complete once the stream is drained
+        token_ledger.record(prompts.CHAT.name, response, "chat")
+        return
+    with span('intent.parse'):
+        parsed, chat_text = parse_model_text(buffered.strip())
+    try:
+        if parsed is None:
+            raise intent_schema.InvalidModelOutput("no JSON object found")
+        with span('intent.validate'):
+            parsed = intent_schema.validate_intent(parsed)
+    except intent_schema.InvalidModelOutput as e:
+        token_ledger.record(prompts.CHAT.name, response, "invalid")
+        try:
+            parsed = await generate_intent(gemini_pool_for(tenant), prompt,
+                                           raw=buffered, error=e, template=prompts.CHAT)
+        except Exception as e:
+            parsed = degraded_intent(user_message, tenant, e)
+        if parsed is None:
+            yield "reply", TROUBLE_REPLY
+            return
+    else:
+        token_ledger.record(prompts.CHAT.name, response, parsed["intent"])
+        parse_stats.record(prompts.CHAT.name, "ok")
+    remember_intent(user_message, history, parsed, tenant)
+    yield "reply", await reply_for_intent(parsed, chat_text or parsed.get("reply") or "", tenant, prefetch,
+                                          session)
+
+async def _degraded_reply(user_message, tenant, error, prefetch, session):
+    """The stream's events once Gemini failed: the local parser's intent, or an apology."""
+    parsed = degraded_intent(user_message, tenant, error)
+    if parsed is None:
+        yield "reply", GEMINI_DOWN_REPLY
+        return
+    if parsed["intent"] in CALENDAR_INTENTS:
+        yield "status", "🔭 Checking your calendar..."
+    yield "reply", await reply_for_intent(parsed, tenant=tenant, prefetch=prefetch, session=session)
 
-    raw = response.text.strip()
+def parse_model_text(raw):
+    """
+    Split the model's raw text into (parsed intent dict or None, natural-language part).
+    """
+    import json
     start = raw.find('{')
     end = raw.rfind('}') + 1
+    parsed = None
     # If JSON found, parse as before
     if start != -1 and end != -1:
         try:
             parsed = json.loads(raw[start:end])
-            intent = parsed.get("intent", "unknown")
-            summary = parsed.get("summary")
-            date_str = parsed.get("date")
-            start_time = parsed.get("start_time")
-            end_time = parsed.get("end_time")
         except Exception as e:
-            print("JSON parsing error:", e)
-            parsed = None
-            intent = "unknown"
+            log.info("JSON parsing error: %s", e)
+    # The non-JSON part of the response (natural language)
+    chat_text = (raw[end:].strip() or raw[:start].strip()) if start != -1 else raw.strip()
+    return parsed, chat_text
+
+def _duration_label(minutes):
+    return f"{minutes // 60}-hour" if minutes % 60 == 0 else f"{minutes}-minute"
+
+async def reply_for_intent(parsed, chat_text="", tenant=None, prefetch=None, session=None):
+    """
+    Act on a parsed intent dict (intent, summary, date, start_time, end_time) and return the reply.
+    chat_text is any natural-language text the model sent alongside it.
+    Calendar calls go to the tenant's calendars (the default tenant if None). prefetch is the
+    task from prefetch_busy(), whose busy time answers lookups on the days it covers. session
+    scopes booking deduplication (see chat_with_agent).
+    When Calendar is unreachable (breaker open, deadline passed, 5xx after retries) the reply
+    says so instead of failing the request.
+    """
+    try:
+        return await _reply_for_intent(parsed, chat_text, tenant, prefetch, session)
+    except SlotReservationTimeout:
+        raise
+    except Exception as e:
+        if not (isinstance(e, resilience.CircuitOpen) or resilience.is_transient(e)):
+            raise
+        log.warning("Calendar unavailable: %s", e)
+        return CALENDAR_DOWN_REPLY
+
+async def _reply_for_intent(parsed, chat_text, tenant, prefetch, session):
+    tenant = tenant or get_tenant()
+    calendar = tenant.calendar
+    if parsed:
+        intent = parsed.get("intent", "unknown")
+        summary = parsed.get("summary")
+        date_str = parsed.get("date")
+        start_time = parsed.get("start_time")
+        end_time = parsed.get("end_time")
     else:
-        parsed = None
         intent = "unknown"
+    set_request_attribute(intent=intent)
 
-    # For easier conversion
-    local_tz = pytz.timezone('Asia/Kolkata')
+    # Dates and times in the intent are wall-clock times in the user's timezone
+    tz = tenant.tz
 
     if parsed and intent == "smalltalk":
         # If Gemini returns a JSON for smalltalk, fallback to natural language
-        return raw[end:].strip() or "Hi! I'm CalPal — your calendar assistant. Need help finding or booking a slot?"
+        return chat_text or "Hi! I'm CalPal — your calendar assistant. Need help finding or booking a slot?"
     if not parsed or intent == "unknown":
         # If not a booking/slots/availability intent, treat as chat
-        # Return the non-JSON part of the response (natural language)
-        chat_reply = raw[end:].strip()
-        if not chat_reply:
-            chat_reply = raw[:start].strip()
-        return chat_reply or "I'm here to help!"
+        return chat_text or "I'm here to help!"
 
     if intent == "ask_slots" and date_str:
-        day = datetime.datetime.strptime(date_str, '%Y-%m-%d')
-        start_dt = day.replace(hour=8, minute=0)
-        end_dt = day.replace(hour=20, minute=0)
-        slots = get_free_slots(start_dt, end_dt, 60)
+        # The whole day; the user's availability profile decides which hours are offered
+        start_dt = datetime.datetime.strptime(date_str, '%Y-%m-%d')
+        end_dt = start_dt + datetime.timedelta(days=1)
+        slot_minutes = tenant.availability.slot_minutes
+        slots = await calendar.run(get_free_slots, start_dt, end_dt, slot_minutes, calendar=calendar,
+                                   tz=tz, profile=tenant.availability,
+                                   snapshot=await _prefetched(prefetch, tenant, date_str))
         if slots:
-            reply = f"Here are 1-hour slots available on {date_str}:\n"
+            reply = f"Here are {_duration_label(slot_minutes)} slots available on {date_str}:\n"
             reply += "\n".join([f"- {s[0].strftime('%I:%M %p')} to {s[1].strftime('%I:%M %p')}" for s in slots])
         else:
-            reply = f"Sorry, no free 1-hour slots available on {date_str}."
+            reply = f"Sorry, no free {_duration_label(slot_minutes)} slots available on {date_str}."
         return reply
 
+    if intent == "find_common_slot":
+        attendees = [a for a in (parsed.get("attendees") or []) if isinstance(a, str) and "@" in a]
+        if not attendees:
+            return "Who should I find a time for? Please give me their email addresses."
+        profile = tenant.availability
+        duration = profile.slot_minutes
+        if start_time and end_time:
+            length = datetime.datetime.strptime(end_time, '%H:%M') - datetime.datetime.strptime(start_time, '%H:%M')
+            duration = length.seconds // 60 or duration
+        if date_str:
+            day = datetime.date.fromisoformat(date_str)
+            start, end = timeutils.local_epoch(day, tz), timeutils.local_epoch(day + datetime.timedelta(days=1), tz)
+            # Within the tenant's bookable hours that day, if it has any
+            bookable = profile.free_gaps([], start, end, tz)
+            if bookable:
+                start, end = bookable[0][0], bookable[-1][1]
+            start_dt, end_dt = timeutils.from_epoch(start, tz), timeutils.from_epoch(end, tz)
+        else:
+            # No day given: look over the coming week
+            start_dt = tenant.now().replace(second=0, microsecond=0)
+            end_dt = start_dt + datetime.timedelta(days=7)
+        slots = await calendar.run(find_common_slots, attendees, start_dt, end_dt, duration,
+                                   top_k=3, calendar=calendar, tz=tz, profile=profile)
+        if not slots:
+            return "Sorry, I couldn't find any time that works in that range."
+        lines = []
+        for slot in slots:
+            line = f"- {slot['start'].strftime('%a %d %b, %I:%M %p')} to {slot['end'].strftime('%I:%M %p')}"
+            if slot['unavailable']:
+                line += f" (busy: {', '.join(slot['unavailable'])})"
+            lines.append(line)
+        everyone = " for everyone" if slots[0]['conflicts'] == 0 else ""
+        return f"Here are the best times{everyone}:\n" + "\n".join(lines)
+
     if intent == "check_availability" and date_str and start_time and end_time:
-        start_dt = local_tz.localize(datetime.datetime.fromisoformat(f"{date_str}T{start_time}"))
-        end_dt = local_tz.localize(datetime.datetime.fromisoformat(f"{date_str}T{end_time}"))
-        service = get_calendar_service()
-        events = service.events().list(
-            calendarId=TEST_CALENDAR_ID,
-            timeMin=start_dt.isoformat(),
-            timeMax=end_dt.isoformat(),
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute().get('items', [])
-
-        if events:
+        start_dt = timeutils.localize(datetime.datetime.fromisoformat(f"{date_str}T{start_time}"), tz)
+        end_dt = timeutils.localize(datetime.datetime.fromisoformat(f"{date_str}T{end_time}"), tz)
+        snapshot = await _prefetched(prefetch, tenant, date_str)
+        if await calendar.run(is_busy, start_dt, end_dt, calendar=calendar, tz=tz, snapshot=snapshot):
             return f"❌ That time slot ({start_time}–{end_time}) on {date_str} is already booked."
         else:
             return f"✅ Yes, {start_time} to {end_time} on {date_str} is available."
@@ -274,29 +552,44 @@ Conversation so far:
             end_dt = (start_dt + datetime.timedelta(hours=1)).strftime('%H:%M')
             end_time = end_dt
 
-        start_dt = local_tz.localize(datetime.datetime.fromisoformat(f"{date_str}T{start_time}"))
-        end_dt = local_tz.localize(datetime.datetime.fromisoformat(f"{date_str}T{end_time}"))
-
-        # Check conflicts
-        service = get_calendar_service()
-        events = service.events().list(
-            calendarId=TEST_CALENDAR_ID,
-            timeMin=start_dt.isoformat(),
-            timeMax=end_dt.isoformat(),
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute().get('items', [])
-
-        if events:
-            alt_slots = get_free_slots(
-                start_dt.replace(hour=8, minute=0),
-                start_dt.replace(hour=20, minute=0),
-                (end_dt - start_dt).seconds // 60
+        start_dt = timeutils.localize(datetime.datetime.fromisoformat(f"{date_str}T{start_time}"), tz)
+        end_dt = timeutils.localize(datetime.datetime.fromisoformat(f"{date_str}T{end_time}"), tz)
+
+        day_start = start_dt.replace(hour=0, minute=0)
+        day_end = day_start + datetime.timedelta(days=1)
+        snapshot = await _prefetched(prefetch, tenant, date_str)
+
+        async def book():
+            nonlocal snapshot
+            if snapshot is None:
+                # One fetch of the day serves both the conflict check and the alternatives
+                snapshot = await calendar.run(fetch_busy_snapshot, timeutils.to_epoch(day_start, tz),
+                                              timeutils.to_epoch(day_end, tz), calendar=calendar)
+            return await calendar.run(book_if_free, summary or "Appointment", start_dt, end_dt,
+                                      calendar=calendar, tz=tz, event_id=event_id(key), snapshot=snapshot)
+
+        async def still_booked(event):
+            return await calendar.run(get_event, event["id"], calendar=calendar) is not None
+
+        # The same booking asked for again in this conversation (a rerun, a double submit) must
+        # not insert twice; someone else asking for the same time gets a conflict instead
+        key = booking_key(tenant.tenant_id, calendar.calendar_id, session, summary or "Appointment",
+                          timeutils.to_epoch(start_dt, tz), timeutils.to_epoch(end_dt, tz))
+        event = await booking_calls.run(key, book, verify=still_booked)
+        if event is None:
+            alt_slots = await calendar.run(
+                get_free_slots,
+                day_start,
+                day_end,
+                (end_dt - start_dt).seconds // 60,
+                calendar=calendar,
+                tz=tz,
+                profile=tenant.availability,
+                snapshot=snapshot
             )
             suggestion = "\n".join([f"- {s[0].strftime('%I:%M %p')} to {s[1].strftime('%I:%M %p')}" for s in alt_slots[:3]])
             return f"❌ That time is already booked.\nHere are some alternatives:\n{suggestion or 'No slots left today.'}"
 
-        event = create_event(summary or "Appointment", start_dt, end_dt)
         return f"✅ Your event '{summary or 'Appointment'}' is booked on {date_str} from {start_time} to {end_time}!"
 
     return "I'm not sure what you meant. Could you clarify whether you're checking, booking, or just chatting?" 
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+User availability profiles: working hours per weekday, holidays, and recurring blocks (RRULEs).
+
+Each local day is compiled once into a minute bitmap (a Python int, bit i set if minute i after
+local midnight is bookable) and cached. A date range is then one big int built from the cached
+days, and free time is `available & ~busy`: a handful of whole-int operations instead of a
+per-slot loop, so ranges of months cost milliseconds.
+
+A profile is configured per tenant ("availability" in TENANTS_FILE) or for every tenant without
+one in the JSON file named by AVAILABILITY_FILE:
+
+    {
+      "working_hours": {"mon": [["09:00", "12:30"], ["13:30", "18:00"]], "fri": [["09:00", "16:00"]]},
+      "holidays": ["2025-12-25", "2026-01-01"],
+      "blocks": [{"rrule": "FREQ=WEEKLY;BYDAY=MO,WE", "start": "10:00", "end": "10:30"}],
+      "slot_minutes": 60
+    }
+
+Weekdays missing from working_hours are days off. Times are wall-clock times in the user's zone.
+"""
+import datetime
+import json
+import os
+import re
+import threading
+import timeutils
+
+AVAILABILITY_FILE = os.getenv('AVAILABILITY_FILE', '')
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+MINUTES_PER_DAY = 24 * 60
+# Compiled days kept per profile (about ten years)
+MAX_CACHED_DAYS = 3660
+# RRULEs without a DTSTART are counted from here (it only matters for INTERVAL > 1)
+RRULE_EPOCH = datetime.datetime(2024, 1, 1)
+
+# What the assistant offered before profiles existed: every day 08:00-20:00, 1-hour slots
+DEFAULT_PROFILE = {'working_hours': {day: [['08:00', '20:00']] for day in WEEKDAYS}, 'slot_minutes': 60}
+
+_RUN_RE = re.compile('1+')
+
+
+def _minute(hhmm):
+    hours, minutes = hhmm.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def to_bits(runs, n):
+    """Bitmap of n bits with bits [a, b) set for every sorted, non-overlapping (a, b) in runs."""
+    parts = []
+    pos = 0
+    for a, b in runs:
+        a, b = max(a, pos, 0), min(b, n)
+        if b > a:
+            parts.append('0' * (a - pos))
+            parts.append('1' * (b - a))
+            pos = b
+    # Bit 0 is the first minute, i.e. the last character of the binary literal
+    return int(''.join(parts)[::-1] or '0', 2)
+
+
+def bit_runs(bits):
+    """Sorted (a, b) runs of set bits, the inverse of to_bits()."""
+    if bits <= 0:
+        return []
+    return [m.span() for m in _RUN_RE.finditer(bin(bits)[:1:-1])]
+
+
+class AvailabilityProfile:
+    """When a user can be booked, compiled per local day into cached minute bitmaps."""
+
+    def __init__(self, working_hours=None, holidays=(), blocks=(), slot_minutes=60):
+        self.slot_minutes = int(slot_minutes)
+        self.holidays = {datetime.date.fromisoformat(day) for day in holidays}
+        self._weekday_bits = [0] * 7
+        for day, spans in (working_hours or {}).items():
+            runs = sorted((_minute(start), _minute(end)) for start, end in spans)
+            self._weekday_bits[WEEKDAYS.index(day.lower()[:3])] = to_bits(runs, MINUTES_PER_DAY)
+        self._blocks = []
+        if blocks:
+            from dateutil.rrule import rrulestr
+        for block in blocks:
+            rule = rrulestr(block['rrule'], dtstart=RRULE_EPOCH, cache=True)
+            self._blocks.append((rule, _minute(block['start']), _minute(block['end'])))
+        self._days = {}  # date -> bitmap
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, conf):
+        return cls(conf.get('working_hours'), conf.get('holidays', ()), conf.get('blocks', ()),
+                   conf.get('slot_minutes', 60))
+
+    def _compile_day(self, day):
+        if day in self.holidays:
+            return 0
+        bits = self._weekday_bits[day.weekday()]
+        if bits and self._blocks:
+            midnight = datetime.datetime(day.year, day.month, day.day)
+            blocked = []
+            for rule, start, end in self._blocks:
+                occurrence = rule.after(midnight, inc=True)
+                if occurrence is not None and occurrence.date() == day:
+                    blocked.append((start, end))
+            bits &= ~to_bits(sorted(blocked), MINUTES_PER_DAY)
+        return bits
+
+    def day_bits(self, day):
+        """Bookable minutes of a local date (bit i = minute i after midnight)."""
+        bits = self._days.get(day)
+        if bits is None:
+            bits = self._compile_day(day)
+            with self._lock:
+                if len(self._days) >= MAX_CACHED_DAYS:
+                    self._days.clear()
+                self._days[day] = bits
+        return bits
+
+    def range_bits(self, start, end, tz):
+        """
+        Bookable minutes of [start, end) (epoch seconds, start on a minute boundary) in zone tz:
+        bit i covers [start + 60 * i, start + 60 * (i + 1)).
+        """
+        n = -(-(end - start) // 60)
+        bits = 0
+        for day in timeutils.local_dates(start, end, tz):
+            day_bits = self.day_bits(day)
+            if not day_bits:
+                continue
+            midnight = timeutils.local_epoch(day, tz)
+            next_midnight = timeutils.local_epoch(day + datetime.timedelta(days=1), tz)
+            if next_midnight - midnight == MINUTES_PER_DAY * 60:
+                offset = (midnight - start) // 60
+                bits |= day_bits << offset if offset >= 0 else day_bits >> -offset
+            else:
+                # DST change: wall-clock minutes don't map 1:1, so place each run by its local time
+                runs = []
+                for a, b in bit_runs(day_bits):
+                    a = timeutils.local_epoch(day, tz, *divmod(a, 60))
+                    b = next_midnight if b == MINUTES_PER_DAY else timeutils.local_epoch(day, tz, *divmod(b, 60))
+                    runs.append(((a - start) // 60, (b - start) // 60))
+                bits |= to_bits(runs, n)
+        return bits & ((1 << n) - 1)
+
+    def free_gaps(self, busy, start, end, tz, min_gap=0):
+        """
+        Free (start, end) epoch-second gaps of [start, end) that are bookable and not covered by
+        busy (sorted, merged epoch intervals). Busy time is rounded out to whole minutes.
+        """
+        base = start - start % 60
+        available = self.range_bits(base, end, tz)
+        busy_bits = to_bits([((s - base) // 60, -(-(e - base) // 60)) for s, e in busy if e > base],
+                            -(-(end - base) // 60))
+        gaps = []
+        for a, b in bit_runs(available & ~busy_bits):
+            gap = (max(base + a * 60, start), min(base + b * 60, end))
+            if gap[1] - gap[0] >= max(min_gap, 1):
+                gaps.append(gap)
+        return gaps
+
+
+_default_profile = None
+
+
+def default_profile():
+    """The profile from AVAILABILITY_FILE, or DEFAULT_PROFILE without one."""
+    global _default_profile
+    if _default_profile is None:
+        conf = DEFAULT_PROFILE
+        if AVAILABILITY_FILE:
+            with open(AVAILABILITY_FILE) as f:
+                conf = json.load(f)
+        _default_profile = AvailabilityProfile.from_config(conf)
+    return _default_profile
@@ -0,0 +1,93 @@
+"""
+Benchmark: free slots over months inside an availability profile.
+
+Run from the backend directory:
+    python benchmarks/bench_availability.py [--days 90] [--events 3000]
+
+Profile: weekday working hours with a lunch break, a weekly recurring block and a few holidays.
+Per-window: the working windows of every day are built through the timezone and each one is
+swept separately with intervals.free_slots. Bitmap: the profile's cached day bitmaps are joined
+into one int for the range, ANDed with the busy bitmap, and the free runs are read off it.
+Both must return the same slots.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import intervals
+import timeutils
+from availability import AvailabilityProfile
+
+START = datetime.date(2025, 7, 7)
+TZ = timeutils.get_tz('America/New_York')
+DURATION = 30 * 60
+PROFILE = {
+    'working_hours': {day: [['09:00', '12:30'], ['13:30', '18:00']] for day in ('mon', 'tue', 'wed', 'thu', 'fri')},
+    'holidays': ['2025-07-04', '2025-09-01', '2025-11-27'],
+    'blocks': [{'rrule': 'FREQ=WEEKLY;BYDAY=MO', 'start': '09:00', 'end': '10:00'}],
+}
+
+
+def synthetic_busy(n, start, end, seed=0):
+    rng = random.Random(seed)
+    starts = (rng.randrange(start, end, 15 * 60) for _ in range(n))
+    return intervals.merge_intervals((s, s + 60 * rng.choice([15, 30, 60, 90])) for s in starts)
+
+
+def per_window(busy, start, end):
+    slots = []
+    holidays = {datetime.date.fromisoformat(d) for d in PROFILE['holidays']}
+    for day in timeutils.local_dates(start, end, TZ):
+        if day.weekday() >= 5 or day in holidays:
+            continue
+        windows = [(9, 0, 12, 30), (13, 30, 18, 0)]
+        if day.weekday() == 0:
+            windows = [(10, 0, 12, 30), (13, 30, 18, 0)]
+        for h1, m1, h2, m2 in windows:
+            ws = max(timeutils.local_epoch(day, TZ, h1, m1), start)
+            we = min(timeutils.local_epoch(day, TZ, h2, m2), end)
+            if we > ws:
+                slots.extend(intervals.free_slots(busy, ws, we, DURATION))
+    return slots
+
+
+def bitmap(profile, busy, start, end):
+    return intervals.slots_in_gaps(profile.free_gaps(busy, start, end, TZ, DURATION), DURATION)
+
+
+def timed(fn, *args, repeat=1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return result, (time.perf_counter() - t0) * 1e3 / repeat
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--days', type=int, default=90)
+    ap.add_argument('--events', type=int, default=3000)
+    args = ap.parse_args()
+
+    start = timeutils.local_epoch(START, TZ)
+    end = timeutils.local_epoch(START + datetime.timedelta(days=args.days), TZ)
+    busy = synthetic_busy(args.events, start, end)
+    profile = AvailabilityProfile.from_config(PROFILE)
+
+    print(f"{args.days} days, {len(busy)} merged busy intervals, {DURATION // 60}-minute slots")
+    expected, t_windows = timed(per_window, busy, start, end, repeat=5)
+    cold, t_cold = timed(bitmap, profile, busy, start, end)
+    warm, t_warm = timed(bitmap, profile, busy, start, end, repeat=20)
+    assert expected == cold == warm, (len(expected), len(cold))
+    print(f"{'per-window sweeps':<28} {t_windows:>8.2f} ms")
+    print(f"{'bitmap, days compiled':<28} {t_cold:>8.2f} ms")
+    print(f"{'bitmap, days cached':<28} {t_warm:>8.2f} ms   ({t_windows / t_warm:.1f}x)")
+    print(f"{len(warm)} slots")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: duplicate and racing bookings.
+
+Run from the backend directory:
+    python benchmarks/bench_booking.py [--copies 20] [--rtt-ms 50]
+
+Against fakes.FakeCalendarService, with every call taking one RTT:
+- double submit: the same "book" intent sent `copies` times at once, then once more afterwards
+  (a Streamlit rerun);
+- race: `copies` different bookings for the same hour at once.
+Legacy is the old check-then-insert (is_busy, then create_event, with no lock). Current is
+reply_for_intent: singleflight + replay per idempotency key, a slot reservation around the check
+and insert, and deterministic event IDs.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ['CALENDAR_CACHE_TTL'] = '0'
+os.environ.setdefault('GEMINI_API_KEYS', 'benchmark-key')
+
+import agent
+import calendar_utils
+import fakes
+from tenants import get_tenant
+
+DAY = '2030-01-07'
+
+
+def intent(summary, hour=10):
+    return {'intent': 'book', 'summary': summary, 'date': DAY,
+            'start_time': f'{hour:02d}:00', 'end_time': f'{hour + 1:02d}:00'}
+
+
+async def legacy_book(parsed, tenant):
+    calendar = tenant.calendar
+    start = datetime.datetime.fromisoformat(f"{parsed['date']}T{parsed['start_time']}")
+    end = datetime.datetime.fromisoformat(f"{parsed['date']}T{parsed['end_time']}")
+    if await calendar.run(calendar_utils.is_busy, start, end, calendar=calendar):
+        return 'busy'
+    await calendar.run(calendar_utils.create_event, parsed['summary'], start, end, calendar=calendar)
+    return 'booked'
+
+
+async def current_book(parsed, tenant):
+    return await agent.reply_for_intent(parsed, tenant=tenant)
+
+
+def counts(service):
+    """(events created, Calendar API calls) so far."""
+    return len(service.busy(0, 2 ** 40)), sum(service.calls.values())
+
+
+async def scenario(name, book, tenant, copies, rtt):
+    service = fakes.FakeCalendarService(latency=rtt, tz=tenant.tz)
+    fakes.install(calendar=service, tenant=tenant)
+    agent.booking_calls = type(agent.booking_calls)()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(book(intent('Standup'), tenant) for _ in range(copies)))
+    await book(intent('Standup'), tenant)
+    double_ms = (time.perf_counter() - t0) * 1e3
+    double = counts(service)
+
+    service.reset()
+    service.calls.clear()
+    t0 = time.perf_counter()
+    await asyncio.gather(*(book(intent(f'Meeting {i}'), tenant) for i in range(copies)))
+    race_ms = (time.perf_counter() - t0) * 1e3
+    race = counts(service)
+    print(f"{name:<10} {double[0]:>14} {double[1]:>12} {double_ms:>9.0f} "
+          f"{race[0]:>12} {race[1]:>10} {race_ms:>9.0f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--copies', type=int, default=20)
+    ap.add_argument('--rtt-ms', type=float, default=50.0)
+    args = ap.parse_args()
+    tenant = get_tenant()
+
+    print(f"{args.copies} concurrent copies, {args.rtt_ms:.0f} ms per Calendar call")
+    print(f"{'':<10} {'double submit':>27} {'':>9} {'race for one hour':>23}")
+    print(f"{'':<10} {'events created':>14} {'API calls':>12} {'ms':>9} "
+          f"{'events':>12} {'API calls':>10} {'ms':>9}")
+
+    async def run_all():
+        for name, book in (('legacy', legacy_book), ('current', current_book)):
+            await scenario(name, book, tenant, args.copies, args.rtt_ms / 1e3)
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Microbenchmark: per-call overhead of get_calendar_service() before and after caching.
+
+Run from the backend directory:
+    python benchmarks/bench_calendar_service.py
+
+Uses a throwaway service-account key, so no Google credentials or network are needed.
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def fake_service_account_info():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    return {
+        "type": "service_account",
+        "project_id": "calpal-bench",
+        "private_key_id": "bench",
+        "private_key": pem,
+        "client_email": "bench@calpal-bench.iam.gserviceaccount.com",
+        "client_id": "0",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }
+
+
+os.environ["GOOGLE_SERVICE_ACCOUNT_JSON"] = json.dumps(fake_service_account_info())
+
+import calendar_utils
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+
+
+def legacy_get_calendar_service():
+    # The pre-cache implementation: parse, build credentials and build the service every call
+    service_account_info = json.loads(os.environ["GOOGLE_SERVICE_ACCOUNT_JSON"])
+    credentials = service_account.Credentials.from_service_account_info(
+        service_account_info, scopes=calendar_utils.SCOPES)
+    return build('calendar', 'v3', credentials=credentials)
+
+
+def bench(label, fn, number):
+    fn()  # warm up imports and the first build
+    total = timeit.timeit(fn, number=number)
+    print(f"{label:<34} {total / number * 1e6:>12.2f} us/call  ({number} calls)")
+    return total / number
+
+
+def main():
+    legacy = bench("legacy get_calendar_service", legacy_get_calendar_service, 50)
+    cached = bench("cached get_calendar_service", calendar_utils.get_calendar_service, 100000)
+
+    def cached_build_request():
+        calendar_utils.get_calendar_service().events().list(
+            calendarId=calendar_utils.TEST_CALENDAR_ID, singleEvents=True)
+
+    bench("cached service + events().list()", cached_build_request, 5000)
+    print(f"speedup (service acquisition): {legacy / cached:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: group availability search (find_common_slots) at 50 attendees over two weeks.
+
+Run from the backend directory:
+    python benchmarks/bench_common_slots.py [--attendees 50] [--days 14] [--rtt-ms 80]
+
+Each attendee gets a synthetic working-hours calendar. The naive search scores every candidate
+start against every attendee's events; the sweep counts conflicts once per busy-interval edge and
+keeps only the top k. Both must return the same slots. The end-to-end run goes through
+find_common_slots with fakes.FakeCalendarService serving each attendee's busy time; its latency
+adds one RTT, as the FreeBusy calls (one per 50 calendars) are issued concurrently.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ['CALENDAR_CACHE_TTL'] = '0'
+
+import calendar_utils
+import fakes
+import intervals
+import timeutils
+
+START = datetime.datetime(2025, 7, 7)  # a Monday, local time
+DURATION = 60 * 60
+ALIGN = 30 * 60
+TOP_K = 5
+
+
+def synthetic_busy(n_attendees, days, tz, seed=0):
+    """Per attendee: 2-6 meetings of 30-120 minutes on each weekday between 08:00 and 19:00."""
+    rng = random.Random(seed)
+    calendars = {}
+    for a in range(n_attendees):
+        busy = []
+        for d in range(days):
+            day = START + datetime.timedelta(days=d)
+            if day.weekday() >= 5:
+                continue
+            for _ in range(rng.randint(2, 6)):
+                s = timeutils.localize(day.replace(hour=8) + datetime.timedelta(minutes=rng.randrange(0, 660, 15)), tz)
+                busy.append((int(s.timestamp()), int(s.timestamp()) + 60 * rng.choice([30, 60, 90, 120])))
+        calendars[f'person{a}@example.com'] = sorted(busy)
+    return calendars
+
+
+def naive_rank(busy_by_attendee, start, end, preferred):
+    # Every candidate start, every attendee, every event
+    scored = []
+    t = start
+    while t + DURATION <= end:
+        conflicts = sum(any(s < t + DURATION and e > t for s, e in busy) for busy in busy_by_attendee)
+        in_hours = any(ws <= t and t + DURATION <= we for ws, we in preferred)
+        scored.append((not in_hours, conflicts, t))
+        t += ALIGN
+    scored.sort()
+    return [(t, t + DURATION, c, not outside) for outside, c, t in scored[:TOP_K]]
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - t0) * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--attendees', type=int, default=50)
+    ap.add_argument('--days', type=int, default=14)
+    ap.add_argument('--rtt-ms', type=float, default=80.0)
+    args = ap.parse_args()
+
+    ctx = calendar_utils.default_calendar()
+    tz = ctx.tz
+    calendars = synthetic_busy(args.attendees, args.days, tz)
+    start = timeutils.localize(START, tz)
+    end = timeutils.localize(START + datetime.timedelta(days=args.days), tz)
+    preferred = []
+    for d in range(args.days):
+        day = START + datetime.timedelta(days=d)
+        if day.weekday() < 5:
+            preferred.append((timeutils.local_epoch(day, tz, 9),
+                              timeutils.local_epoch(day, tz, 18)))
+    busy_lists = [intervals.merge_intervals(b) for b in calendars.values()]
+    s, e = int(start.timestamp()), int(end.timestamp())
+    events = sum(len(b) for b in calendars.values())
+
+    print(f"{args.attendees} attendees, {events} busy intervals, {args.days} days, "
+          f"{DURATION // 60}-minute meeting on a {ALIGN // 60}-minute grid, top {TOP_K}")
+    naive, t_naive = timed(naive_rank, busy_lists, s, e, preferred)
+    sweep, t_sweep = timed(intervals.rank_slots, busy_lists, s, e, DURATION, top_k=TOP_K,
+                           align=ALIGN, align_origin=s, preferred=preferred)
+    assert naive == sweep, (naive, sweep)
+    print(f"{'naive scan':<26} {t_naive:>9.2f} ms")
+    print(f"{'conflict sweep + top-k':<26} {t_sweep:>9.2f} ms   ({t_naive / t_sweep:.0f}x)")
+
+    service = fakes.FakeCalendarService(tz=tz, busy_by_calendar=calendars)
+    fakes.install(calendar=service)
+    slots, t_total = timed(calendar_utils.find_common_slots, list(calendars), start, end,
+                           DURATION // 60, top_k=TOP_K, calendar=ctx)
+    calls = service.calls['freebusy.query']
+    print(f"{'find_common_slots':<26} {t_total:>9.2f} ms client, {calls} concurrent FreeBusy "
+          f"call(s) = ~{t_total + args.rtt_ms:.0f} ms at {args.rtt_ms:.0f} ms RTT")
+    for slot in slots:
+        print(f"  {slot['start']:%a %d %b %H:%M}  busy: {slot['conflicts']:>2}  "
+              f"working hours: {slot['working_hours']}")
+
+
+if __name__ == "__main__":
+    main()
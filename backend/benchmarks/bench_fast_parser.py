@@ -0,0 +1,82 @@
+"""
+Fast-path parser coverage and latency on a sample chat corpus.
+
+Run from the backend directory:
+    python benchmarks/bench_fast_parser.py [--llm-latency 0.8] [-v]
+
+Reports the fraction of messages handled without Gemini, the local parse cost, and the
+latency saved assuming --llm-latency seconds per Gemini round trip.
+"""
+import argparse
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import fast_parser
+
+CORPUS = [
+    "hi",
+    "Hello there!",
+    "thanks",
+    "summary: discussion about pay date: 03-07-2025 start_time: 10:00 am end_time: 10:20 am",
+    "summary: 1:1 with Priya date: 2025-07-04 start_time: 15:00 end_time: 15:30",
+    "title: Dentist date: 12/07/2025 start: 9am end: 10am",
+    "Book me a meeting with John tomorrow at 2pm",
+    "Schedule a call about the project for Friday at 3pm",
+    "book a haircut on 2025-07-10 at 11:30 am",
+    "Set up a design review next Monday from 10am to 11:30am",
+    "schedule standup today 9:15am-9:30am",
+    "add dinner with Sam on 5 July at 8pm",
+    "Book a demo for Acme on July 8th 4pm-5pm",
+    "what slots are free tomorrow",
+    "show me available slots on Friday",
+    "any openings on 2025-07-07?",
+    "when am I free on Wednesday",
+    "is 3pm free tomorrow?",
+    "Am I available on Thursday at 11am?",
+    "is 2025-07-09 10:00 to 11:00 available",
+    "yes, book it",
+    "can you move that to 4pm instead",
+    "cancel my meeting tomorrow",
+    "find a time next week for everyone",
+    "what's the weather like",
+    "book something for me",
+    "how does this work?",
+    "I'd like to schedule lunch with Maria tomorrow at noon",
+    "Schedule a call with the vendor next Tuesday at 16:00",
+    "what slots do I have",
+]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--llm-latency', type=float, default=0.8,
+                    help='assumed Gemini round trip in seconds (for the latency-saved estimate)')
+    ap.add_argument('-v', '--verbose', action='store_true')
+    args = ap.parse_args()
+
+    now = datetime.datetime(2025, 7, 2, 9, 0)
+    handled = 0
+    for message in CORPUS:
+        info, confidence = fast_parser.parse_message(message, now)
+        local = confidence >= fast_parser.FAST_PATH_MIN_CONFIDENCE
+        handled += local
+        if args.verbose:
+            print(f"{'LOCAL' if local else 'LLM  '} {confidence:.1f}  {message!r}\n      {info}")
+
+    runs = 200
+    total = timeit.timeit(lambda: [fast_parser.parse_message(m, now) for m in CORPUS], number=runs)
+    per_message = total / runs / len(CORPUS)
+    fraction = handled / len(CORPUS)
+    print(f"messages:            {len(CORPUS)}")
+    print(f"handled locally:     {handled} ({fraction:.0%})")
+    print(f"local parse cost:    {per_message * 1e6:.1f} us/message")
+    print(f"mean latency saved:  {fraction * (args.llm_latency - per_message) * 1e3:.0f} ms/message "
+          f"(assuming {args.llm_latency * 1e3:.0f} ms per Gemini call)")
+
+
+if __name__ == "__main__":
+    main()
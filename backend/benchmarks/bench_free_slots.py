@@ -0,0 +1,90 @@
+"""
+Benchmark: legacy O(slots x busy) free-slot scan vs the intervals.py sweep.
+
+Run from the backend directory:
+    python benchmarks/bench_free_slots.py [--max-legacy-events 10000]
+
+Synthetic calendars of 10 to 100k events over a 4-week range, 5-minute slots.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import intervals
+
+RANGE_DAYS = 28
+SLOT_MINUTES = 5
+SIZES = [10, 100, 1000, 10000, 100000]
+
+
+def legacy_free_slots(busy, start_time, end_time, duration_minutes):
+    # The pre-sweep loop from calendar_utils.get_free_slots, minus the prints
+    free_slots = []
+    current = start_time
+    while current + datetime.timedelta(minutes=duration_minutes) <= end_time:
+        next_slot_end = current + datetime.timedelta(minutes=duration_minutes)
+        overlap = False
+        for b_start, b_end in busy:
+            if (current < b_end and next_slot_end > b_start):
+                overlap = True
+                if b_end > current:
+                    current = b_end
+                break
+        if not overlap:
+            free_slots.append((current, next_slot_end))
+            current = next_slot_end
+    return free_slots
+
+
+def synthetic_calendar(n_events, start, seed=0):
+    rng = random.Random(seed)
+    span = RANGE_DAYS * 24 * 60
+    busy = []
+    for _ in range(n_events):
+        offset = rng.randrange(0, span, 5)
+        length = rng.choice([15, 30, 45, 60, 90, 120])
+        s = start + datetime.timedelta(minutes=offset)
+        busy.append((s, s + datetime.timedelta(minutes=length)))
+    busy.sort()
+    return busy
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def sweep(busy, start, end):
+    epoch_busy = [(int(s.timestamp()), int(e.timestamp())) for s, e in busy]
+    return intervals.free_slots(epoch_busy, int(start.timestamp()), int(end.timestamp()), SLOT_MINUTES * 60)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--max-legacy-events', type=int, default=10000,
+                    help='skip the legacy scan above this many events (it is quadratic)')
+    args = ap.parse_args()
+
+    start = datetime.datetime(2025, 7, 1, tzinfo=datetime.timezone.utc)
+    end = start + datetime.timedelta(days=RANGE_DAYS)
+    print(f"{'events':>8} {'legacy ms':>12} {'sweep ms':>10} {'speedup':>9} {'slots':>7}")
+    for n in SIZES:
+        busy = synthetic_calendar(n, start)
+        new, t_new = timed(sweep, busy, start, end)
+        if n <= args.max_legacy_events:
+            old, t_old = timed(legacy_free_slots, busy, start, end, SLOT_MINUTES)
+            assert [(int(s.timestamp()), int(e.timestamp())) for s, e in old] == new
+            legacy_col, speedup_col = f"{t_old * 1e3:12.1f}", f"{t_old / t_new:8.0f}x"
+        else:
+            legacy_col, speedup_col = f"{'skipped':>12}", f"{'-':>9}"
+        print(f"{n:>8} {legacy_col} {t_new * 1e3:10.1f} {speedup_col} {len(new):>7}")
+
+
+if __name__ == "__main__":
+    main()
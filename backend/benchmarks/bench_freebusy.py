@@ -0,0 +1,167 @@
+"""
+Benchmark: events().list (singleEvents=True) vs freebusy().query for busy-time lookups, and what
+the local event store (CALENDAR_CACHE_TTL > 0) downloads for its first, full sync.
+
+Run from the backend directory:
+    python benchmarks/bench_freebusy.py [--days 30] [--rtt-ms 80] [--bandwidth-mbps 20]
+
+A synthetic calendar of daily/weekly recurring meetings is served through the real
+googleapiclient request path by an in-process fake HTTP transport. Payload bytes and
+client-side parse time are measured; latency adds an estimated network cost of one RTT per
+HTTP call plus transfer time at --bandwidth-mbps.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ['CALENDAR_CACHE_TTL'] = '0'
+
+import httplib2
+from googleapiclient.discovery import build
+
+import calendar_utils
+import event_store
+import timeutils
+import intervals
+
+START = datetime.datetime(2025, 7, 1, tzinfo=datetime.timezone.utc)
+PAGE_SIZE = 250  # events.list default maxResults
+
+
+def recurring_instances(days):
+    """Expanded instances of daily standups and weekly meetings, as events.list returns them."""
+    events = []
+    series = [(f'daily-{i}', 1, 9 + i % 8, 15 + 15 * (i % 3)) for i in range(6)]
+    series += [(f'weekly-{i}', 7, 10 + i % 7, 60) for i in range(20)]
+    for n, (series_id, every, hour, minutes) in enumerate(series):
+        for day in range(n % every, days, every):
+            start = START + datetime.timedelta(days=day, hours=hour)
+            end = start + datetime.timedelta(minutes=minutes)
+            stamp = start.strftime('%Y%m%dT%H%M%SZ')
+            events.append({
+                'kind': 'calendar#event',
+                'etag': '"3391234567890000"',
+                'id': f'{series_id}_{stamp}',
+                'status': 'confirmed',
+                'htmlLink': f'https://www.google.com/calendar/event?eid={series_id}{stamp}',
+                'created': '2025-01-10T08:00:00.000Z',
+                'updated': '2025-06-01T08:00:00.000Z',
+                'summary': f'Recurring sync {series_id}',
+                'description': 'Agenda: status updates, blockers, next steps. ' * 3,
+                'location': 'Meeting room 4 / https://meet.google.com/abc-defg-hij',
+                'creator': {'email': 'owner@example.com'},
+                'organizer': {'email': 'owner@example.com', 'self': True},
+                'start': {'dateTime': start.isoformat().replace('+00:00', 'Z'), 'timeZone': 'Asia/Kolkata'},
+                'end': {'dateTime': end.isoformat().replace('+00:00', 'Z'), 'timeZone': 'Asia/Kolkata'},
+                'recurringEventId': series_id,
+                'originalStartTime': {'dateTime': start.isoformat().replace('+00:00', 'Z')},
+                'iCalUID': f'{series_id}@google.com',
+                'sequence': 0,
+                'attendees': [{'email': f'person{n}@example.com', 'responseStatus': 'accepted'}
+                              for n in range(4)],
+                'reminders': {'useDefault': True},
+                'eventType': 'default',
+            })
+    events.sort(key=lambda e: e['start']['dateTime'])
+    return events
+
+
+class FakeCalendarHttp:
+    """httplib2-compatible transport answering events.list and freebusy.query from memory."""
+
+    def __init__(self, events):
+        self.events = events
+        self.calls = 0
+        self.bytes = 0
+        # Server-side work (expansion and merging) is precomputed so it doesn't count as client time
+        self.merged_busy = [
+            {'start': datetime.datetime.fromtimestamp(s, datetime.timezone.utc).isoformat().replace('+00:00', 'Z'),
+             'end': datetime.datetime.fromtimestamp(e, datetime.timezone.utc).isoformat().replace('+00:00', 'Z')}
+            for s, e in intervals.merge_intervals(
+                (int(datetime.datetime.fromisoformat(ev['start']['dateTime'].replace('Z', '+00:00')).timestamp()),
+                 int(datetime.datetime.fromisoformat(ev['end']['dateTime'].replace('Z', '+00:00')).timestamp()))
+                for ev in events)]
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        self.calls += 1
+        url = urlparse(uri)
+        if url.path.endswith('/freeBusy'):
+            request = json.loads(body)
+            payload = {
+                'kind': 'calendar#freeBusy',
+                'timeMin': request['timeMin'],
+                'timeMax': request['timeMax'],
+                'calendars': {item['id']: {'busy': self.merged_busy} for item in request['items']},
+            }
+        else:
+            query = parse_qs(url.query)
+            offset = int(query.get('pageToken', ['0'])[0])
+            page = self.events[offset:offset + PAGE_SIZE]
+            if 'fields' in query:
+                # Partial response, for the item fields the mask names (e.g. items(id,start,end))
+                kept = query['fields'][0].split('items(', 1)[1].split(')', 1)[0].split(',')
+                page = [{k: v for k, v in event.items() if k in kept} for event in page]
+            payload = {'kind': 'calendar#events', 'summary': 'primary', 'items': page}
+            if offset + PAGE_SIZE < len(self.events):
+                payload['nextPageToken'] = str(offset + PAGE_SIZE)
+        content = json.dumps(payload).encode()
+        self.bytes += len(content)
+        return httplib2.Response({'status': '200', 'content-type': 'application/json'}), content
+
+
+def legacy_busy(service, start, end):
+    # What get_busy_intervals used to do, plus following pages
+    tz = calendar_utils.default_calendar().tz
+    busy, page_token = [], None
+    while True:
+        result = service.events().list(calendarId='primary', timeMin=start.isoformat(),
+                                       timeMax=end.isoformat(), singleEvents=True,
+                                       orderBy='startTime', pageToken=page_token).execute()
+        for event in result.get('items', []):
+            busy.append((timeutils.event_epoch(event['start'], tz), timeutils.event_epoch(event['end'], tz)))
+        page_token = result.get('nextPageToken')
+        if not page_token:
+            return sorted(busy)
+
+
+def measure(label, http, fn, args):
+    http.calls = http.bytes = 0
+    t0 = time.perf_counter()
+    busy = fn()
+    client_ms = (time.perf_counter() - t0) * 1e3
+    network_ms = http.calls * args.rtt_ms + http.bytes * 8 / (args.bandwidth_mbps * 1e6) * 1e3
+    print(f"{label:<22} {http.calls:>6} {http.bytes / 1024:>10.1f} {client_ms:>10.1f} "
+          f"{client_ms + network_ms:>12.1f} {len(busy):>9}")
+    return busy
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--days', type=int, default=30)
+    ap.add_argument('--rtt-ms', type=float, default=80.0)
+    ap.add_argument('--bandwidth-mbps', type=float, default=20.0)
+    args = ap.parse_args()
+
+    events = recurring_instances(args.days)
+    http = FakeCalendarHttp(events)
+    service = build('calendar', 'v3', http=http, static_discovery=True, cache_discovery=False)
+    calendar_utils.set_calendar_service(service)
+    start, end = START, START + datetime.timedelta(days=args.days)
+
+    print(f"{len(events)} recurring instances over {args.days} days; "
+          f"network model {args.rtt_ms:.0f} ms RTT, {args.bandwidth_mbps:.0f} Mbit/s")
+    print(f"{'method':<22} {'calls':>6} {'KiB':>10} {'client ms':>10} {'est. total ms':>12} {'intervals':>9}")
+    measure('events().list', http, lambda: legacy_busy(service, start, end), args)
+    measure('freebusy().query', http, lambda: calendar_utils.get_busy_intervals(start, end), args)
+    store = event_store.EventStore('primary', lambda: service, tz=calendar_utils.default_calendar().tz)
+    measure('event store sync', http, lambda: (store.full_sync(), store.busy_intervals(
+        int(start.timestamp()), int(end.timestamp()), refresh=False))[1], args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: request-thread cost of diagnostics, old print() style vs the queued logging setup.
+
+Run from the backend directory:
+    python benchmarks/bench_logging.py [--slots 200] [--requests 200] [--write-us 50]
+
+Each simulated request reports --slots free slots and its busy list, like the old get_free_slots.
+Output goes to a sink that takes --write-us per write, as a slow stdout pipe would. Times are for
+the request thread only.
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import logging_setup
+
+
+class SlowSink(io.TextIOBase):
+    def __init__(self, write_us):
+        self.delay = write_us / 1e6
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        time.sleep(self.delay)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def run_print(sink, busy, slots):
+    # What get_free_slots used to do on every request
+    print("DEBUG: busy intervals:", busy, file=sink)
+    for s in slots:
+        print(f"DEBUG: free slot {s[0]} - {s[1]}", file=sink)
+
+
+def run_logging(log, busy, slots):
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("free slots: %d busy intervals %s, %d slots", len(busy), busy, len(slots))
+
+
+def timed(fn, requests, *args):
+    t0 = time.perf_counter()
+    for _ in range(requests):
+        fn(*args)
+    return (time.perf_counter() - t0) / requests * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--slots', type=int, default=200)
+    ap.add_argument('--requests', type=int, default=200)
+    ap.add_argument('--write-us', type=float, default=50.0)
+    args = ap.parse_args()
+
+    busy = [(f'2025-07-01T{h:02d}:00', f'2025-07-01T{h:02d}:30') for h in range(8, 20)]
+    slots = [(f'slot-{i}-start', f'slot-{i}-end') for i in range(args.slots)]
+    sink = SlowSink(args.write_us)
+    log = logging.getLogger('bench')
+
+    print(f"{args.slots} slots/request, {args.write_us:.0f} us per write; request-thread time:")
+    print(f"{'print() per slot':<34} {timed(run_print, args.requests, sink, busy, slots):>10.1f} us/request")
+
+    logging_setup.configure_logging(level='WARNING', stream=sink)
+    print(f"{'logging, LOG_LEVEL=WARNING':<34} {timed(run_logging, args.requests, log, busy, slots):>10.1f} us/request")
+    logging.getLogger().setLevel('DEBUG')
+    print(f"{'logging, LOG_LEVEL=DEBUG (queued)':<34} {timed(run_logging, args.requests, log, busy, slots):>10.1f} us/request")
+    logging_setup.stop_logging()
+
+
+if __name__ == "__main__":
+    main()
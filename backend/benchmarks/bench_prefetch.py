@@ -0,0 +1,80 @@
+"""
+Benchmark: chat turns with the calendar lookups run after vs alongside the Gemini call.
+
+Run from the backend directory:
+    python benchmarks/bench_prefetch.py [--llm-latency 0.4] [--calendar-latency 0.08]
+
+Gemini is fakes.FakeGemini, answering each turn with a fixed intent after --llm-latency seconds;
+Calendar is fakes.FakeCalendarService, where every call blocks for --calendar-latency seconds. Each intent is sent once with prefetching off
+(PREFETCH_DAYS=0: intent first, then the lookups) and once with it on (today's and tomorrow's
+busy time fetched while the stub "thinks"). Reports turn latency and Calendar calls per turn.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('GEMINI_API_KEYS', 'stub-key')
+os.environ['CALENDAR_CACHE_TTL'] = '0'
+
+import agent
+import fakes
+import timeutils
+from tenants import get_tenant
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--llm-latency', type=float, default=0.4)
+    ap.add_argument('--calendar-latency', type=float, default=0.08)
+    args = ap.parse_args()
+
+    tenant = get_tenant()
+    today = tenant.now().date()
+    tomorrow = today + datetime.timedelta(days=1)
+    # Busy 10:00-11:00 today, so booking 10:30 falls back to alternatives
+    busy = [{'id': 'busy1', 'status': 'confirmed',
+             'start': {'dateTime': timeutils.to_rfc3339(timeutils.local_epoch(today, tenant.tz, 10))},
+             'end': {'dateTime': timeutils.to_rfc3339(timeutils.local_epoch(today, tenant.tz, 11))}}]
+    intents = [
+        ('ask_slots today', {'intent': 'ask_slots', 'date': today.isoformat()}),
+        ('check tomorrow', {'intent': 'check_availability', 'date': tomorrow.isoformat(),
+                            'start_time': '15:00', 'end_time': '16:00'}),
+        ('book, conflict', {'intent': 'book', 'summary': 'Sync', 'date': today.isoformat(),
+                            'start_time': '10:30', 'end_time': '11:30'}),
+        ('book, free', {'intent': 'book', 'summary': 'Review', 'date': tomorrow.isoformat(),
+                        'start_time': '14:00', 'end_time': '15:00'}),
+    ]
+
+    blank = {'summary': None, 'date': None, 'start_time': None, 'end_time': None, 'attendees': []}
+    llm = fakes.FakeGemini({f'{name} {days}': json.dumps(dict(blank, **parsed))
+                            for name, parsed in intents for days in (0, 2)}, latency=args.llm_latency)
+    fakes.install(llm)
+
+    async def turn(name, parsed, prefetch_days):
+        agent.PREFETCH_DAYS = prefetch_days
+        agent.intent_cache.clear()
+        agent.booking_calls = type(agent.booking_calls)()
+        service = fakes.FakeCalendarService(busy, latency=args.calendar_latency, tz=tenant.tz)
+        fakes.install(calendar=service, tenant=tenant)
+        t0 = time.perf_counter()
+        await agent.chat_with_agent(f'{name} {prefetch_days}', tenant=tenant)
+        return (time.perf_counter() - t0) * 1e3, sum(service.calls.values())
+
+    async def run_all():
+        print(f"LLM {args.llm_latency * 1e3:.0f} ms, Calendar {args.calendar_latency * 1e3:.0f} ms per call")
+        print(f"{'intent':<18} {'sequential ms':>13} {'calls':>6} {'prefetch ms':>12} {'calls':>6}")
+        for name, parsed in intents:
+            seq_ms, seq_calls = await turn(name, parsed, 0)
+            pre_ms, pre_calls = await turn(name, parsed, 2)
+            print(f"{name:<18} {seq_ms:>13.0f} {seq_calls:>6} {pre_ms:>12.0f} {pre_calls:>6}")
+
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark: Streamlit frontend render cost against transcript length.
+
+Run from the backend directory:
+    python benchmarks/bench_render.py [--lengths 10 50 200 1000] [--runs 5] [--app PATH ...]
+
+Each --app (default ../frontend/app.py; pass an older copy, e.g. from `git show
+<rev>:frontend/app.py`, to compare) is run with streamlit.testing's AppTest, starting from a
+session that already holds that many messages:
+- rerun: a plain rerun (what any widget interaction costs): script time, markdown elements, and
+  the HTML sent to the browser, not counting elements of 10 kB or more that repeat the previous
+  run (Streamlit sends those by hash and the browser reuses its copy);
+- send: typing a message and pressing the rocket button, with a local stand-in for
+  /chat/stream that streams a short reply, through to the last rerun the click causes; reports
+  the total time and how many script runs that took.
+"""
+import argparse
+import http.server
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+DEFAULT_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'frontend', 'app.py')
+CACHED_SIZE = 10_000  # Streamlit's global.minCachedMessageSize
+
+
+class StreamHandler(http.server.BaseHTTPRequestHandler):
+    """POST -> the server-sent events /chat/stream sends for a short reply."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for event in ({'type': 'delta', 'text': 'You are free '}, {'type': 'delta', 'text': 'tomorrow at 3pm.'},
+                      {'type': 'done', 'session_id': 'bench'}):
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def transcript(length):
+    return [{'role': 'user' if n % 2 == 0 else 'assistant',
+             'content': f"Message {n}: is the afternoon of the {n % 28 + 1}th free for a planning session?"}
+            for n in range(length)]
+
+
+def new_app(path, length):
+    at = AppTest.from_file(path, default_timeout=60)
+    at.session_state['messages'] = transcript(length)
+    at.session_state['session_id'] = None
+    return at
+
+
+def count_script_runs():
+    """Count script executions, including those st.rerun() starts, by their set_page_config call."""
+    set_page_config = streamlit.set_page_config
+
+    def counted(*args, **kwargs):
+        count_script_runs.runs += 1
+        return set_page_config(*args, **kwargs)
+    count_script_runs.runs = 0
+    streamlit.set_page_config = counted
+
+
+def measure_rerun(path, length, runs):
+    at = new_app(path, length)
+    at.run()
+    times, sent, elements = [], [], 0
+    for _ in range(runs):
+        before = [m.value for m in at.markdown]
+        t0 = time.perf_counter()
+        at.run()
+        times.append((time.perf_counter() - t0) * 1e3)
+        bodies = [m.value for m in at.markdown]
+        elements = len(bodies)
+        sent.append(sum(len(b) for b in bodies if len(b) < CACHED_SIZE or b not in before))
+    return statistics.median(times), elements, statistics.median(sent)
+
+
+def measure_send(path, length, runs):
+    times, script_runs = [], []
+    for _ in range(runs):
+        at = new_app(path, length)
+        at.run()
+        before = len(at.session_state['messages'])
+        at.text_input(key='input_box').input('any time tomorrow afternoon?')
+        submit = next(b for b in at.button if b.label == '\U0001F680')
+        count_script_runs.runs = 0
+        t0 = time.perf_counter()
+        submit.click().run()
+        times.append((time.perf_counter() - t0) * 1e3)
+        script_runs.append(count_script_runs.runs)
+        if len(at.session_state['messages']) != before + 2:
+            raise RuntimeError(f'{path}: the turn did not finish')
+    return statistics.median(times), max(script_runs)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--app', action='append', help='Streamlit script to measure (repeatable)')
+    ap.add_argument('--lengths', type=int, nargs='+', default=[10, 50, 200, 1000])
+    ap.add_argument('--runs', type=int, default=5)
+    args = ap.parse_args()
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['BACKEND_STREAM_URL'] = f'http://127.0.0.1:{server.server_address[1]}/chat/stream'
+    count_script_runs()
+    # AppTest's "missing ScriptRunContext" warnings would drown the table
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').disabled = True
+
+    for path in args.app or [DEFAULT_APP]:
+        path = os.path.abspath(path)
+        print(path)
+        print(f"{'messages':>8} {'rerun ms':>9} {'elements':>9} {'KiB sent':>9} {'send ms':>8} {'runs':>5}")
+        for length in args.lengths:
+            rerun_ms, elements, sent = measure_rerun(path, length, args.runs)
+            send_ms, script_runs = measure_send(path, length, args.runs)
+            print(f"{length:>8} {rerun_ms:>9.1f} {elements:>9} {sent / 1024:>9.1f} {send_ms:>8.1f} {script_runs:>5}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Benchmark: replay recorded chat transcripts through the API against local Gemini and Calendar
+stand-ins (fakes.py), and report latency and throughput per intent.
+
+Run from the backend directory:
+    python benchmarks/bench_replay.py [--transcript benchmarks/transcripts/sample.jsonl]
+        [--rounds 20] [--concurrency 8] [--llm-latency 0.4] [--calendar-latency 0.08]
+        [--error-rate 0] [--json results.json] [--max-p95-ms 0]
+
+A transcript is JSON lines, one request each:
+    {"conversation": "c1", "endpoint": "/chat", "intent": "ask_slots",
+     "message": "what's open tomorrow?", "model": "<raw text Gemini returned for it>"}
+    {"conversation": "c2", "endpoint": "/book", "intent": "book", "body": {...}}
+"/chat/stream" turns are read to the end. "{day0}", "{day1}", ... are replaced with today's
+date plus that many days, so recorded dates stay in the future. Turns of one conversation run
+in order on one session; conversations run concurrently, --rounds times over. Before every
+round the calendar goes back to the same synthetic events and the intent and idempotency
+caches are emptied, so each round does the same work.
+
+--json writes the results for automated runs; with --max-p95-ms the exit status is 1 when any
+intent's p95 is over that many milliseconds.
+"""
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('GEMINI_API_KEYS', 'fake-key')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+os.environ.setdefault('STARTUP_WARMUP', 'off')
+
+import httpx
+
+import agent
+import fakes
+from main import app
+from tenants import get_tenant
+
+DEFAULT_TRANSCRIPT = os.path.join(os.path.dirname(__file__), 'transcripts', 'sample.jsonl')
+DAY_RE = re.compile(r'\{day(\d+)\}')
+
+
+def load_transcript(path, today):
+    def dates(text):
+        return DAY_RE.sub(lambda m: (today + datetime.timedelta(days=int(m.group(1)))).isoformat(), text)
+
+    conversations = collections.OrderedDict()
+    responses = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            turn = json.loads(dates(line))
+            conversations.setdefault(turn.get('conversation', 'default'), []).append(turn)
+            if 'model' in turn:
+                responses[turn['message']] = turn['model']
+    return list(conversations.values()), responses
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def replay(client, conversation, round_no, results):
+    session_id = None
+    for turn in conversation:
+        endpoint = turn['endpoint']
+        if endpoint == '/book':
+            body = turn['body']
+        else:
+            body = {'message': turn['message']}
+            if session_id:
+                body['session_id'] = session_id
+        t0 = time.perf_counter()
+        resp = await client.post(endpoint, json=body, headers={'X-Request-ID': f'replay-{round_no}'})
+        text = resp.text
+        elapsed = time.perf_counter() - t0
+        ok = resp.status_code < 400 and 'trouble processing' not in text
+        if endpoint == '/chat' and ok:
+            session_id = resp.json().get('session_id')
+        elif endpoint == '/chat/stream' and ok:
+            done = [json.loads(line[6:]) for line in text.splitlines() if line.startswith('data: ')][-1]
+            session_id = done.get('session_id')
+        results[turn.get('intent', 'unknown')].append((elapsed, ok))
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--transcript', default=DEFAULT_TRANSCRIPT)
+    ap.add_argument('--rounds', type=int, default=20)
+    ap.add_argument('--concurrency', type=int, default=8, help='conversations in flight at once')
+    ap.add_argument('--llm-latency', type=float, default=0.4)
+    ap.add_argument('--calendar-latency', type=float, default=0.08)
+    ap.add_argument('--jitter', type=float, default=0.0, help='extra random latency, up to this many seconds')
+    ap.add_argument('--error-rate', type=float, default=0.0, help='share of fake Gemini/Calendar calls that fail')
+    ap.add_argument('--events-per-day', type=int, default=4)
+    ap.add_argument('--json', help='write results here')
+    ap.add_argument('--max-p95-ms', type=float, default=0.0)
+    args = ap.parse_args()
+
+    tenant = get_tenant()
+    today = tenant.now().date()
+    conversations, responses = load_transcript(args.transcript, today)
+    events = fakes.synthetic_events(today, 14, tenant.tz, per_day=args.events_per_day)
+    llm = fakes.FakeGemini(responses, args.llm_latency, args.jitter, args.error_rate)
+    calendar = fakes.FakeCalendarService(events, args.calendar_latency, args.jitter, args.error_rate,
+                                         tz=tenant.tz)
+    fakes.install(llm, calendar, tenant)
+
+    results = collections.defaultdict(list)  # intent -> [(seconds, ok)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(client, conversation, round_no):
+        async with semaphore:
+            await replay(client, conversation, round_no, results)
+
+    # Unhandled errors come back as 500s and are counted, instead of stopping the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url='http://calpal', timeout=None) as client:
+        t0 = time.perf_counter()
+        for round_no in range(args.rounds):
+            calendar.reset(events)
+            agent.intent_cache.clear()
+            agent.booking_calls = type(agent.booking_calls)()
+            await asyncio.gather(*(one(client, c, round_no) for c in conversations))
+        elapsed = time.perf_counter() - t0
+
+    total = sum(len(v) for v in results.values())
+    report = {
+        'requests': total,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(total / elapsed, 1),
+        'llm_calls_per_request': round(llm.calls / total, 2),
+        'llm_replay_misses': llm.misses,
+        'calendar_calls_per_request': round(sum(calendar.calls.values()) / total, 2),
+        'intents': {},
+    }
+    print(f"{len(conversations)} conversations x {args.rounds} rounds, {args.concurrency} at once; "
+          f"LLM {args.llm_latency * 1e3:.0f} ms, Calendar {args.calendar_latency * 1e3:.0f} ms per call, "
+          f"error rate {args.error_rate:.0%}")
+    print(f"{'intent':<20} {'requests':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for intent, samples in sorted(results.items()):
+        latencies = [s * 1e3 for s, _ in samples]
+        row = {
+            'requests': len(samples),
+            'errors': sum(1 for _, ok in samples if not ok),
+            'p50_ms': round(statistics.median(latencies), 1),
+            'p95_ms': round(percentile(latencies, 95), 1),
+            'mean_ms': round(statistics.fmean(latencies), 1),
+        }
+        report['intents'][intent] = row
+        print(f"{intent:<20} {row['requests']:>8} {row['errors']:>7} {row['p50_ms']:>8.0f} "
+              f"{row['p95_ms']:>8.0f} {row['mean_ms']:>8.0f}")
+    print(f"{total} requests in {elapsed:.1f} s: {report['requests_per_second']} req/s, "
+          f"{report['llm_calls_per_request']} Gemini and {report['calendar_calls_per_request']} "
+          f"Calendar calls per request")
+    if llm.misses:
+        print(f"warning: {llm.misses} Gemini calls had no recorded response")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.max_p95_ms:
+        slow = [i for i, row in report['intents'].items() if row['p95_ms'] > args.max_p95_ms]
+        if slow:
+            print(f"p95 over {args.max_p95_ms:.0f} ms: {', '.join(slow)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+"""
+Benchmark: chat latency and outcomes while Gemini or Calendar misbehave, with and without the
+deadlines, retries and circuit breakers of resilience.py.
+
+Run from the backend directory:
+    python benchmarks/bench_resilience.py [--requests 60] [--concurrency 6] [--stall 8]
+        [--timeout 1.5] [--llm-latency 0.4] [--calendar-latency 0.08]
+
+Gemini and Calendar are the fakes.py stand-ins. Each scenario sends the same /chat requests
+(a day overview, a free/busy check and a booking, all needing Gemini to understand them) twice:
+- unbounded: one attempt per call, no deadlines and breakers that never open;
+- bounded: RETRY_ATTEMPTS, --timeout second deadlines for Gemini and Calendar, and breakers
+  that open after BREAKER_FAILURES failures in a row.
+Scenarios: healthy; Gemini stalls (--stall seconds per call); Gemini fails half its calls with
+503; Calendar down (every call 503, after one successful event store sync); Calendar stalls.
+Each request ends "answered" (a normal reply, possibly from the event store's last sync or the
+local parser), "apology" (one of the agent's can't-help-right-now replies) or "error" (5xx).
+"""
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('GEMINI_API_KEYS', 'fake-key')
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+os.environ.setdefault('STARTUP_WARMUP', 'off')
+
+import httpx
+
+import agent
+import fakes
+import resilience
+from intent_cache import IntentCache
+from main import app
+from tenants import get_tenant
+
+APOLOGIES = (agent.TROUBLE_REPLY, agent.GEMINI_DOWN_REPLY, agent.CALENDAR_DOWN_REPLY)
+RETRY_ATTEMPTS = resilience.RETRY_ATTEMPTS
+
+
+def messages(today):
+    tomorrow = (today + datetime.timedelta(days=1)).isoformat()
+    blank = {'summary': None, 'date': tomorrow, 'start_time': None, 'end_time': None, 'attendees': []}
+    return {
+        "what does my day look like tomorrow?": dict(blank, intent='ask_slots'),
+        "am I free tomorrow from 3 to 4?": dict(blank, intent='check_availability',
+                                                start_time='15:00', end_time='16:00'),
+        # The local parser gets this one too, at a confidence below the fast path's
+        "book a quarterly planning session with the whole product and design team tomorrow at 10am":
+            dict(blank, intent='book', summary='Quarterly planning', start_time='10:00', end_time='11:00'),
+    }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def configure(bounded, timeout, pool, calendar):
+    """Fresh breakers and the limits of one configuration."""
+    resilience.RETRY_ATTEMPTS = RETRY_ATTEMPTS if bounded else 1
+    resilience.CALENDAR_TIMEOUT = timeout if bounded else 1e9
+    pool.timeout = timeout if bounded else 1e9
+    threshold = resilience.BREAKER_FAILURES if bounded else 10 ** 9
+    resilience.gemini_breaker = pool.breaker = resilience.CircuitBreaker('gemini', threshold)
+    calendar.breaker = resilience.CircuitBreaker('calendar', threshold)
+
+
+async def run_scenario(name, client, args, texts, llm, calendar, events, tenant):
+    calendar.faults.latency, calendar.faults.error_rate = args.calendar_latency, 0.0
+    calendar.reset(events)
+    agent.booking_calls = type(agent.booking_calls)()
+    # Bring the event store up to date while Calendar is still healthy
+    tenant.calendar.get_event_store().busy_intervals(0, 1)
+    SCENARIOS[name](llm, calendar, args.stall)
+
+    samples = []  # (seconds, outcome)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(n):
+        async with semaphore:
+            t0 = time.perf_counter()
+            resp = await client.post('/chat', json={'message': texts[n % len(texts)]})
+            elapsed = time.perf_counter() - t0
+            if resp.status_code >= 500:
+                outcome = 'error'
+            elif resp.status_code < 400 and resp.json().get('response') not in APOLOGIES:
+                outcome = 'answered'
+            else:
+                outcome = 'apology'
+            samples.append((elapsed, outcome))
+
+    await asyncio.gather(*(one(n) for n in range(args.requests)))
+    return samples
+
+
+SCENARIOS = {
+    'healthy': lambda llm, calendar, stall: None,
+    'gemini stalls': lambda llm, calendar, stall: setattr(llm.faults, 'latency', stall),
+    'gemini 50% 503': lambda llm, calendar, stall: setattr(llm.faults, 'error_rate', 0.5),
+    'calendar down': lambda llm, calendar, stall: setattr(calendar.faults, 'error_rate', 1.0),
+    'calendar stalls': lambda llm, calendar, stall: setattr(calendar.faults, 'latency', stall),
+}
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--requests', type=int, default=60, help='per scenario and configuration')
+    ap.add_argument('--concurrency', type=int, default=6)
+    ap.add_argument('--stall', type=float, default=8.0, help='seconds a stalled call takes')
+    ap.add_argument('--timeout', type=float, default=1.5, help='bounded deadline per Gemini/Calendar call')
+    ap.add_argument('--llm-latency', type=float, default=0.4)
+    ap.add_argument('--calendar-latency', type=float, default=0.08)
+    ap.add_argument('--json', help='write results here')
+    args = ap.parse_args()
+
+    tenant = get_tenant()
+    today = tenant.now().date()
+    responses = {text: json.dumps(parsed) for text, parsed in messages(today).items()}
+    texts = list(responses)
+    events = fakes.synthetic_events(today, 14, tenant.tz)
+    llm = fakes.FakeGemini(responses)
+    calendar = fakes.FakeCalendarService(events, tz=tenant.tz)
+    fakes.install(llm, calendar, tenant)
+    # Every request asks Gemini, so the scenarios measure the failing call and not the cache
+    agent.intent_cache = IntentCache(ttl=0, db_path=None)
+    store = tenant.calendar.get_event_store()
+
+    report = {}
+    print(f"{args.requests} /chat requests per run, {args.concurrency} at once; stall {args.stall:.0f} s, "
+          f"bounded deadline {args.timeout:.1f} s")
+    print(f"{'scenario':<16} {'config':<10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'answered':>9} {'apology':>8} {'error':>6}")
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url='http://calpal', timeout=None) as client:
+        for name in SCENARIOS:
+            for config in ('unbounded', 'bounded'):
+                llm.faults.latency, llm.faults.error_rate = args.llm_latency, 0.0
+                store.max_staleness = 0  # every read tries Google first
+                configure(config == 'bounded', args.timeout, agent.gemini_pool, tenant.calendar)
+                samples = await run_scenario(name, client, args, texts, llm, calendar, events, tenant)
+                latencies = [s * 1e3 for s, _ in samples]
+                outcomes = collections.Counter(o for _, o in samples)
+                row = {
+                    'p50_ms': round(statistics.median(latencies), 1),
+                    'p99_ms': round(percentile(latencies, 99), 1),
+                    'max_ms': round(max(latencies), 1),
+                    'answered': outcomes['answered'],
+                    'apology': outcomes['apology'],
+                    'error': outcomes['error'],
+                }
+                report.setdefault(name, {})[config] = row
+                print(f"{name:<16} {config:<10} {row['p50_ms']:>8.0f} {row['p99_ms']:>8.0f} "
+                      f"{row['max_ms']:>8.0f} {row['answered']:>9} {row['apology']:>8} {row['error']:>6}")
+                # Let stalled calls left running in the calendar threads finish before the next run
+                calendar.faults.latency = llm.faults.latency = 0.0
+                await asyncio.sleep(args.stall if 'stalls' in name else 0)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
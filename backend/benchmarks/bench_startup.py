@@ -0,0 +1,99 @@
+"""
+Benchmark: backend cold start, import time and time to first request.
+
+Run from the backend directory:
+    python benchmarks/bench_startup.py [--runs 5] [--backend-dir PATH]
+
+- import: `python -X importtime -c "import main"` in a fresh interpreter; reports the wall time
+  and the slowest top-level imports.
+- first request: uvicorn is started on a free port and GET /metrics is polled until it answers;
+  reports the time from spawning the process, once per STARTUP_WARMUP mode.
+
+--backend-dir points at another checkout's backend (e.g. an older commit in a git worktree) to
+compare against. Gemini keys are a stub and no Google call is made, so a Calendar warm-up
+without credentials just logs a warning.
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+IMPORT_LINE_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def child_env(**extra):
+    env = dict(os.environ, GEMINI_API_KEYS='stub-key', LOG_LEVEL='ERROR', PYTHONDONTWRITEBYTECODE='1')
+    env.update(extra)
+    return env
+
+
+def measure_import(backend_dir):
+    """(wall ms, [(cumulative ms, module)] for modules imported directly by main)."""
+    code = "import time; t = time.perf_counter(); import main; print((time.perf_counter() - t) * 1e3)"
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=backend_dir,
+                         env=child_env(), capture_output=True, text=True, check=True)
+    top = []
+    for line in out.stderr.splitlines():
+        m = IMPORT_LINE_RE.match(line)
+        # Depth 1 below main: three spaces of indentation after the column separator
+        if m and len(m.group(3)) == 3:
+            top.append((int(m.group(2)) / 1e3, m.group(4)))
+    return float(out.stdout.strip().splitlines()[-1]), sorted(top, reverse=True)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def measure_first_request(backend_dir, warmup, timeout=60.0):
+    """ms from spawning uvicorn until GET /metrics succeeds."""
+    port = free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port),
+                             '--log-level', 'error'], cwd=backend_dir,
+                            env=child_env(STARTUP_WARMUP=warmup),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=1) as r:
+                    r.read()
+                return (time.perf_counter() - t0) * 1e3
+            except OSError:
+                if proc.poll() is not None:
+                    raise RuntimeError(f'uvicorn exited with {proc.returncode}')
+                time.sleep(0.005)
+        raise TimeoutError('server did not answer')
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--runs', type=int, default=5)
+    ap.add_argument('--backend-dir', default=BACKEND_DIR)
+    args = ap.parse_args()
+    backend_dir = os.path.abspath(args.backend_dir)
+
+    imports = [measure_import(backend_dir) for _ in range(args.runs)]
+    print(f"import main: {statistics.median(ms for ms, _ in imports):.0f} ms (median of {args.runs})")
+    for ms, module in imports[-1][1][:6]:
+        print(f"  {module:<28} {ms:>7.0f} ms")
+
+    print("time to first request:")
+    for warmup in ('off', 'background', 'blocking'):
+        runs = [measure_first_request(backend_dir, warmup) for _ in range(args.runs)]
+        print(f"  STARTUP_WARMUP={warmup:<11} {statistics.median(runs):>7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
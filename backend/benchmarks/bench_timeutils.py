@@ -0,0 +1,87 @@
+"""
+Benchmark: turning Google event times into busy intervals for the slot math.
+
+Run from the backend directory (the legacy run needs pytz, from benchmarks/requirements.txt):
+    python benchmarks/bench_timeutils.py [--events 10000]
+
+Legacy: pytz lookup per all-day event, aware datetimes kept in the store, then converted to epoch
+seconds on every free-slot query. Now: zoneinfo looked up once per name, epoch seconds parsed once
+when the event is stored, and queries work on those integers directly.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import timeutils
+
+START = datetime.datetime(2025, 7, 7, tzinfo=datetime.timezone.utc)
+QUERIES = 100
+
+
+def synthetic_events(n, seed=0):
+    rng = random.Random(seed)
+    events = []
+    for _ in range(n):
+        if rng.random() < 0.1:
+            day = (START + datetime.timedelta(days=rng.randrange(28))).date()
+            events.append(({'date': day.isoformat()}, {'date': (day + datetime.timedelta(days=1)).isoformat()}))
+            continue
+        s = START + datetime.timedelta(minutes=rng.randrange(0, 28 * 24 * 60, 15))
+        e = s + datetime.timedelta(minutes=rng.choice([30, 60, 90]))
+        events.append(({'dateTime': s.strftime('%Y-%m-%dT%H:%M:%SZ')},
+                       {'dateTime': e.strftime('%Y-%m-%dT%H:%M:%S+00:00')}))
+    return events
+
+
+def legacy(events, pytz):
+    def parse(value):
+        if 'dateTime' in value:
+            return datetime.datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        return pytz.timezone('Asia/Kolkata').localize(datetime.datetime.strptime(value['date'], '%Y-%m-%d'))
+
+    stored = [(parse(s), parse(e)) for s, e in events]
+    for _ in range(QUERIES):
+        [(int(s.timestamp()), int(e.timestamp())) for s, e in sorted(stored)]
+    return stored
+
+
+def current(events):
+    tz = timeutils.get_tz('Asia/Kolkata')
+    stored = [(timeutils.event_epoch(s, tz), timeutils.event_epoch(e, tz)) for s, e in events]
+    for _ in range(QUERIES):
+        sorted(stored)
+    return stored
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - t0) * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--events', type=int, default=10000)
+    args = ap.parse_args()
+    events = synthetic_events(args.events)
+
+    print(f"{args.events} events (10% all-day), stored once, then {QUERIES} free-slot queries")
+    now, t_now = timed(current, events)
+    try:
+        import pytz
+    except ImportError:
+        print(f"{'zoneinfo + epoch ints':<24} {t_now:>9.1f} ms   (pytz not installed: pip install -r benchmarks/requirements.txt)")
+        return
+    old, t_old = timed(legacy, events, pytz)
+    assert [(int(s.timestamp()), int(e.timestamp())) for s, e in old] == now
+    print(f"{'pytz + datetimes':<24} {t_old:>9.1f} ms")
+    print(f"{'zoneinfo + epoch ints':<24} {t_now:>9.1f} ms   ({t_old / t_now:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Load test for the async /chat path with the fakes.py Gemini and Calendar stand-ins.
+
+Run from the backend directory:
+    python benchmarks/load_test.py [--llm-latency 0.5] [--calendar-latency 0.1]
+
+FakeGemini answers after --llm-latency seconds; FakeCalendarService .execute() calls block for
+--calendar-latency seconds on the calendar executor. Requests go through the real
+FastAPI app in-process (httpx ASGI transport). Reports p50/p99 latency and peak thread count
+per concurrency level.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('GEMINI_API_KEYS', 'fake-key')
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+# Always hit the (stubbed) Calendar API instead of the local event store
+os.environ['CALENDAR_CACHE_TTL'] = '0'
+
+import httpx
+
+import agent
+import calendar_utils
+import fakes
+from intent_cache import IntentCache
+from main import app
+
+MESSAGES = [
+    ('{"intent": "check_availability", "summary": null, "date": "2025-07-03", '
+     '"start_time": "10:00", "end_time": "11:00"}'),
+    ('{"intent": "ask_slots", "summary": null, "date": "2025-07-03", '
+     '"start_time": null, "end_time": null}'),
+    ('{"intent": "smalltalk", "summary": null, "date": null, "start_time": null, "end_time": null, '
+     '"reply": "Hi! I am CalPal, how can I help with your calendar today?"}'),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_level(client, concurrency, requests_per_level):
+    latencies = []
+    peak_threads = threading.active_count()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal peak_threads
+        async with semaphore:
+            t0 = time.perf_counter()
+            resp = await client.post('/chat', json={'message': f'message {i}'})
+            resp.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+            peak_threads = max(peak_threads, threading.active_count())
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests_per_level)))
+    elapsed = time.perf_counter() - t0
+    return latencies, elapsed, peak_threads
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--llm-latency', type=float, default=0.5)
+    ap.add_argument('--calendar-latency', type=float, default=0.1)
+    ap.add_argument('--levels', default='1,10,50,100,200,500')
+    ap.add_argument('--requests', type=int, default=0,
+                    help='requests per level (default: 2x concurrency, at least 20)')
+    args = ap.parse_args()
+
+    levels = [int(x) for x in args.levels.split(',')]
+    most = max(args.requests or max(20, 2 * level) for level in levels)
+    llm = fakes.FakeGemini({f'message {i}': MESSAGES[i % len(MESSAGES)] for i in range(most)},
+                           latency=args.llm_latency)
+    fakes.install(llm, fakes.FakeCalendarService(latency=args.calendar_latency))
+    # Every request reaches Gemini, as the same messages are sent again at each level
+    agent.intent_cache = IntentCache(ttl=0, db_path=None)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://calpal', timeout=None) as client:
+        print(f"LLM {args.llm_latency * 1e3:.0f} ms, calendar {args.calendar_latency * 1e3:.0f} ms/call, "
+              f"calendar workers {calendar_utils.CALENDAR_MAX_WORKERS}")
+        print(f"{'concurrency':>11} {'requests':>8} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8} {'threads':>8}")
+        for level in levels:
+            n = args.requests or max(20, 2 * level)
+            latencies, elapsed, threads = await run_level(client, level, n)
+            print(f"{level:>11} {n:>8} {statistics.median(latencies) * 1e3:9.0f} "
+                  f"{percentile(latencies, 99) * 1e3:9.0f} {n / elapsed:8.1f} {threads:>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+"""
+Booking safety: idempotency keys, request coalescing and slot reservations.
+
+- booking_key() / event_id(): a booking's idempotency key and the Google event ID derived from
+  it. Inserting the same ID twice makes Google answer 409 instead of creating a duplicate, which
+  also holds across restarts and workers.
+- IdempotentCalls: concurrent calls with the same key share one execution (singleflight), and
+  successful results are replayed for IDEMPOTENCY_TTL seconds, so reruns and double submits
+  don't insert again. A replay is first checked (the event still exists), and keys include the
+  session, so one user's booking is never reported to another.
+- SlotReservations: per calendar, the intervals being booked right now. A booking holds its
+  interval across the conflict check and the insert, and overlapping bookings wait their turn,
+  so two of them can't both pass the check.
+"""
+import asyncio
+import collections
+import contextlib
+import hashlib
+import os
+import threading
+import time
+
+# Seconds a finished booking is replayed for the same key
+IDEMPOTENCY_TTL = float(os.getenv('IDEMPOTENCY_TTL', '600'))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv('IDEMPOTENCY_MAX_KEYS', '10000'))
+# Seconds a booking waits for an overlapping one to finish before giving up
+RESERVATION_TIMEOUT = float(os.getenv('RESERVATION_TIMEOUT', '30'))
+
+
+def booking_key(*parts):
+    """
+    Idempotency key from the parts that make two bookings the same (tenant, calendar, session,
+    summary, times).
+    """
+    return hashlib.sha256('\x00'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+
+def event_id(key):
+    """Google event ID for an idempotency key (base32hex characters, well within 5-1024 long)."""
+    return 'cp' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:40]
+
+
+class IdempotentCalls:
+    """Singleflight plus a short-lived result cache, keyed by idempotency key."""
+
+    def __init__(self, ttl=IDEMPOTENCY_TTL, max_keys=IDEMPOTENCY_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._results = collections.OrderedDict()  # key -> (expires_at, result)
+        self._inflight = {}  # key -> asyncio.Future
+        self.executed = 0
+        self.coalesced = 0
+        self.replayed = 0
+        self.stale = 0
+
+    async def run(self, key, fn, verify=None):
+        """
+        await fn() once per key: callers arriving while it runs get the same result (or error),
+        and so do callers within ttl after it succeeded, as long as `await verify(result)` (if
+        given) is still true; otherwise fn runs again. None results are not remembered.
+        """
+        hit = self._results.get(key)
+        if hit is not None and hit[0] <= time.monotonic():
+            del self._results[key]
+            hit = None
+        if hit is not None:
+            if verify is None or await verify(hit[1]):
+                self.replayed += 1
+                return hit[1]
+            # e.g. the event was deleted since: book it again
+            self.stale += 1
+            self._results.pop(key, None)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.executed += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark it retrieved; without waiters nobody else will
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        future.set_result(result)
+        if result is not None:
+            self._results[key] = (time.monotonic() + self.ttl, result)
+            while len(self._results) > self.max_keys:
+                self._results.popitem(last=False)
+        return result
+
+    def stats(self):
+        return {
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'replayed': self.replayed,
+            'stale': self.stale,
+            'in_flight': len(self._inflight),
+            'remembered': len(self._results),
+        }
+
+
+class SlotReservationTimeout(TimeoutError):
+    pass
+
+
+class SlotReservations:
+    """Intervals of one calendar that are being booked right now."""
+
+    def __init__(self, timeout=RESERVATION_TIMEOUT):
+        self.timeout = timeout
+        self._held = []  # (start, end) epoch seconds
+        self._cond = threading.Condition()
+
+    def _free(self, start, end):
+        return not any(s < end and e > start for s, e in self._held)
+
+    def hold(self, start, end):
+        """Reserve [start, end) for the block, first waiting for overlapping reservations to end."""
+        return self.hold_all([(start, end)])
+
+    @contextlib.contextmanager
+    def hold_all(self, spans):
+        """Reserve several (start, end) intervals at once (a batch); they must not overlap each other."""
+        spans = list(spans)
+        with self._cond:
+            if not self._cond.wait_for(lambda: all(self._free(s, e) for s, e in spans), self.timeout):
+                start, end = next((s, e) for s, e in spans if not self._free(s, e))
+                raise SlotReservationTimeout(f'slot {start}-{end} is still being booked')
+            self._held.extend(spans)
+        try:
+            yield
+        finally:
+            with self._cond:
+                for held in spans:
+                    self._held.remove(held)
+                self._cond.notify_all()
@@ -1,9 +1,21 @@
-import datetime
+import asyncio
+import bisect
+import contextvars
+import functools
 import os
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-import pytz
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from googleapiclient.errors import HttpError
 import json
+import logging
+from booking import SlotReservations
+from event_store import EventStore
+import intervals
+import resilience
+import timeutils
+from tracing import span, traced
+
+log = logging.getLogger(__name__)
 
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 SERVICE_ACCOUNT_FILE = os.path.join(os.path.dirname(__file__), '../service_account.json')
@@ -11,91 +23,627 @@ SERVICE_ACCOUNT_FILE = os.path.join(os.path.dirname(__file__), '../service_accou
 # Set your test calendar ID here (from Google Calendar settings)
 TEST_CALENDAR_ID = os.getenv('GOOGLE_CALENDAR_ID', 'primary')
 
-def get_calendar_service():
+# Socket timeout (seconds) for Calendar API connections
+HTTP_TIMEOUT = float(os.getenv('GOOGLE_HTTP_TIMEOUT', '10'))
+
+# How long (seconds) busy-time answers may be served from the local event store
+# before an incremental sync. 0 disables the store and always asks Google.
+CALENDAR_CACHE_TTL = float(os.getenv('CALENDAR_CACHE_TTL', '30'))
+
+# Max threads used to run blocking Calendar API calls from async code
+CALENDAR_MAX_WORKERS = int(os.getenv('CALENDAR_MAX_WORKERS', '16'))
+
+# Per-tenant concurrent calendar calls. The default lets a single tenant (the usual setup) use
+# every executor thread; with several tenants per worker, set it lower so one busy tenant
+# can't take them all.
+TENANT_MAX_CONCURRENCY = int(os.getenv('TENANT_MAX_CONCURRENCY', '0')) or CALENDAR_MAX_WORKERS
+
+DEFAULT_TIMEZONE = 'Asia/Kolkata'
+
+def _load_service_account_info():
     json_env = os.environ.get("GOOGLE_SERVICE_ACCOUNT_JSON")
     if json_env:
-        service_account_info = json.loads(json_env)
+        return json.loads(json_env)
+    with open(SERVICE_ACCOUNT_FILE) as f:
+        return json.load(f)
+
+class CalendarContext:
+    """
+    Everything calendar-related for one tenant: calendar IDs, timezone, credentials,
+    the cached service with per-thread HTTP connections, and the local event store.
+    Built lazily; safe to share between threads.
+    """
+
+    def __init__(self, calendar_ids=None, timezone=DEFAULT_TIMEZONE,
+                 service_account_loader=_load_service_account_info,
+                 cache_ttl=None, max_concurrency=None):
+        self.calendar_ids = list(calendar_ids or [TEST_CALENDAR_ID])
+        self.calendar_id = self.calendar_ids[0]
+        self.timezone = timezone
+        self.tz = timeutils.get_tz(timezone)
+        self.service_account_loader = service_account_loader
+        self.cache_ttl = CALENDAR_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.max_concurrency = max_concurrency or TENANT_MAX_CONCURRENCY
+        self._credentials = None
+        self._service = None
+        self._event_store = None
+        self._lock = threading.RLock()
+        self._generation = 0
+        # httplib2.Http is not thread-safe, so every thread gets its own authorized connection
+        self._thread_local = threading.local()
+        self._semaphore = None
+        # Intervals of the primary calendar being booked right now (see book_if_free)
+        self.reservations = SlotReservations()
+        # Bumped on every event we insert, so BusySnapshots taken before it are not trusted
+        self.writes = 0
+        # Google trouble on one tenant's calendars must not fail fast for the others
+        self.breaker = resilience.CircuitBreaker('calendar')
+
+    def get_credentials(self):
+        if self._credentials is None:
+            with self._lock:
+                if self._credentials is None:
+                    from google.oauth2 import service_account
+                    self._credentials = service_account.Credentials.from_service_account_info(
+                        self.service_account_loader(), scopes=SCOPES)
+        return self._credentials
+
+    def _thread_http(self):
+        local = self._thread_local
+        http = getattr(local, 'http', None)
+        if http is None or local.generation != self._generation:
+            # AuthorizedHttp refreshes the access token when it expires or on a 401
+            import google_auth_httplib2
+            import httplib2
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.get_credentials(), http=httplib2.Http(timeout=HTTP_TIMEOUT))
+            local.http = http
+            local.generation = self._generation
+        return http
+
+    def _build_request(self, http, *args, **kwargs):
+        # Ignore the http the service was built with and use the calling thread's connection
+        from googleapiclient.http import HttpRequest
+        return HttpRequest(self._thread_http(), *args, **kwargs)
+
+    def get_service(self):
+        """
+        The cached Calendar service.
+        Built once from the bundled (static) discovery document, so no call ever fetches discovery.
+        The client libraries are imported here rather than at startup.
+        """
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    from googleapiclient.discovery import build
+                    with span('calendar.build_service'):
+                        self._service = build('calendar', 'v3', http=self._thread_http(),
+                                              requestBuilder=self._build_request,
+                                              static_discovery=True, cache_discovery=False)
+        return self._service
+
+    def set_service(self, service):
+        """Use an already-built service object (e.g. a stand-in for benchmarks)."""
+        with self._lock:
+            self._service = service
+            # The event store's copy came from the previous service
+            self._event_store = None
+
+    def reset(self):
+        """Drop the cached credentials and service, e.g. after rotating the service account."""
+        with self._lock:
+            self._credentials = None
+            self._service = None
+            self._generation += 1
+
+    def get_event_store(self):
+        if self._event_store is None:
+            with self._lock:
+                if self._event_store is None:
+                    self._event_store = EventStore(self.calendar_id, self.get_service, self.tz,
+                                                   max_staleness=self.cache_ttl, execute=self.execute)
+        return self._event_store
+
+    def localize(self, dt):
+        return timeutils.localize(dt, self.tz)
+
+    def record_write(self):
+        with self._lock:
+            self.writes += 1
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        run_calendar() limited to max_concurrency in-flight calls for this tenant. Gives up with
+        resilience.DeadlineExceeded after CALENDAR_TIMEOUT seconds, queueing included; the
+        thread then finishes on its own (socket timeouts bound it) and keeps this tenant's slot
+        until it does, so a stalled tenant never holds more than its share of the pool.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def limited():
+            await self._semaphore.acquire()
+            try:
+                future = submit_calendar(fn, *args, **kwargs)
+            except BaseException:
+                self._semaphore.release()
+                raise
+            future.add_done_callback(lambda _: self._semaphore.release())
+            # Shielded: giving up on the call must not release the slot before the thread is free
+            return await asyncio.shield(future)
+        try:
+            return await resilience.with_deadline(limited(), resilience.CALENDAR_TIMEOUT, 'calendar call')
+        except resilience.DeadlineExceeded:
+            # The stalled call itself may still succeed later, too late to count
+            self.breaker.failure()
+            raise
+
+    def execute(self, request, retry=True):
+        """request.execute() through this calendar's breaker (see resilience.execute)."""
+        return resilience.execute(request, self.breaker, retry)
+
+_default_calendar = None
+_default_lock = threading.Lock()
+
+def default_calendar():
+    """The CalendarContext for the single-tenant setup (GOOGLE_CALENDAR_ID, service_account.json)."""
+    global _default_calendar
+    if _default_calendar is None:
+        with _default_lock:
+            if _default_calendar is None:
+                _default_calendar = CalendarContext()
+    return _default_calendar
+
+def get_calendar_service(calendar=None):
+    return (calendar or default_calendar()).get_service()
+
+def set_calendar_service(service, calendar=None):
+    (calendar or default_calendar()).set_service(service)
+
+def reset_calendar_service(calendar=None):
+    (calendar or default_calendar()).reset()
+
+def get_event_store(calendar=None):
+    return (calendar or default_calendar()).get_event_store()
+
+_executor = None
+
+def get_calendar_executor():
+    global _executor
+    if _executor is None:
+        with _default_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=CALENDAR_MAX_WORKERS,
+                                               thread_name_prefix='calendar')
+    return _executor
+
+def submit_calendar(fn, *args, **kwargs):
+    """Start a blocking calendar function on the bounded calendar executor; returns its future."""
+    loop = asyncio.get_running_loop()
+    # run_in_executor doesn't carry contextvars over; copy them so spans keep the request ID
+    context = contextvars.copy_context()
+    return loop.run_in_executor(get_calendar_executor(), functools.partial(context.run, fn, *args, **kwargs))
+
+async def run_calendar(fn, *args, **kwargs):
+    """
+    Run a blocking calendar function on the bounded calendar executor.
+    Excess calls queue here instead of each holding a thread of their own.
+    """
+    return await submit_calendar(fn, *args, **kwargs)
+
+# freebusy().query accepts at most 50 calendars per call
+FREEBUSY_MAX_CALENDARS = 50
+
+# Separate from the calendar executor: fan-out runs from inside calendar executor threads,
+# and waiting on the same pool from there could starve it
+_fanout_executor = None
+
+def _get_fanout_executor():
+    global _fanout_executor
+    if _fanout_executor is None:
+        with _default_lock:
+            if _fanout_executor is None:
+                _fanout_executor = ThreadPoolExecutor(max_workers=CALENDAR_MAX_WORKERS,
+                                                      thread_name_prefix='calendar-fanout')
+    return _fanout_executor
+
+def query_freebusy(start, end, calendar_ids=None, calendar=None):
+    """
+    Busy intervals per calendar over [start, end) (epoch seconds) from freebusy().query: one call
+    per 50 calendars. Google expands recurring events and merges busy time server-side and returns
+    only intervals. Returns {calendar_id: sorted [(start, end) epoch seconds, ...]}.
+    """
+    ctx = calendar or default_calendar()
+    calendar_ids = list(calendar_ids or ctx.calendar_ids)
+    service = ctx.get_service()
+    chunks = [calendar_ids[i:i + FREEBUSY_MAX_CALENDARS]
+              for i in range(0, len(calendar_ids), FREEBUSY_MAX_CALENDARS)]
+
+    def fetch(chunk):
+        with span('calendar.freebusy', calendars=len(chunk)):
+            return ctx.execute(service.freebusy().query(body={
+                'timeMin': timeutils.to_rfc3339(start),
+                'timeMax': timeutils.to_rfc3339(end),
+                'items': [{'id': cal_id} for cal_id in chunk],
+                'calendarExpansionMax': FREEBUSY_MAX_CALENDARS,
+            }))
+
+    if len(chunks) > 1:
+        # Large attendee lists: all chunks in flight at once
+        context = contextvars.copy_context()
+        results = list(_get_fanout_executor().map(
+            lambda chunk: context.copy().run(fetch, chunk), chunks))
+    else:
+        results = [fetch(chunk) for chunk in chunks]
+    busy = {}
+    for chunk, result in zip(chunks, results):
+        for cal_id in chunk:
+            entry = result.get('calendars', {}).get(cal_id, {})
+            if entry.get('errors'):
+                raise RuntimeError(f"freebusy failed for {cal_id}: {entry['errors']}")
+            busy[cal_id] = sorted(
+                (timeutils.parse_rfc3339(b['start']), timeutils.parse_rfc3339(b['end']))
+                for b in entry.get('busy', []))
+    return busy
+
+class BusySnapshot:
+    """
+    Busy intervals of a tenant's calendars over [start, end), fetched once (e.g. while Gemini is
+    still working out the intent) and shared by every lookup of one chat turn.
+    Only used while no event has been inserted through the same CalendarContext since.
+    A stale snapshot came from the event store while Google was unreachable; it answers
+    availability questions but never a booking's conflict check.
+    """
+
+    def __init__(self, start, end, busy, writes, stale=False):
+        self.start = start
+        self.end = end
+        self.busy = busy
+        self.writes = writes
+        self.stale = stale
+
+    def covers(self, start, end, ctx):
+        return self.start <= start and end <= self.end and self.writes == ctx.writes
+
+    def between(self, start, end):
+        return [(s, e) for s, e in self.busy if s < end and e > start]
+
+def _stale_busy(store, start, end, error):
+    """The event store's last copy of [start, end) if error means Google is unreachable, else re-raise."""
+    if not store.has_synced() or not (isinstance(error, resilience.CircuitOpen) or resilience.is_transient(error)):
+        raise error
+    log.warning("Calendar unavailable (%s); answering from the event store synced %.0fs ago",
+                error, store.age())
+    return store.busy_intervals(start, end, refresh=False)
+
+@traced('calendar.fetch_busy_snapshot')
+def fetch_busy_snapshot(start, end, calendar=None):
+    """BusySnapshot of the tenant's calendars over [start, end) (epoch seconds)."""
+    ctx = calendar or default_calendar()
+    writes = ctx.writes
+    try:
+        return BusySnapshot(start, end, busy_epochs(start, end, calendar=ctx, stale_ok=False), writes)
+    except Exception as e:
+        if ctx.cache_ttl <= 0 or ctx.calendar_ids != [ctx.calendar_id]:
+            raise
+        return BusySnapshot(start, end, _stale_busy(ctx.get_event_store(), start, end, e), writes, stale=True)
+
+def busy_epochs(start, end, calendar_ids=None, calendar=None, snapshot=None, stale_ok=True):
+    """
+    Sorted busy (start, end) epoch-second intervals overlapping [start, end), across calendar_ids
+    (default: all of the tenant's calendars). Answered from snapshot when it covers the range; a
+    lone primary calendar is answered from the local event store when it is enabled (from its
+    last sync, however old, while Google is unreachable, unless stale_ok is False); everything
+    else comes from the FreeBusy API.
+    """
+    ctx = calendar or default_calendar()
+    if snapshot is not None and not calendar_ids and snapshot.covers(start, end, ctx):
+        if not (snapshot.stale and not stale_ok):
+            return snapshot.between(start, end)
+    calendar_ids = list(calendar_ids or ctx.calendar_ids)
+    if ctx.cache_ttl > 0 and calendar_ids == [ctx.calendar_id]:
+        store = ctx.get_event_store()
+        try:
+            return store.busy_intervals(start, end)
+        except Exception as e:
+            if not stale_ok:
+                raise
+            return _stale_busy(store, start, end, e)
+    per_calendar = query_freebusy(start, end, calendar_ids, ctx)
+    return sorted(b for cal_busy in per_calendar.values() for b in cal_busy)
+
+@traced('calendar.get_busy_intervals')
+def get_busy_intervals(start_time, end_time, calendar_ids=None, calendar=None, tz=None):
+    """
+    busy_epochs() for datetimes: sorted busy (start, end) datetimes in tz (default: the calendar's
+    timezone, which naive start_time/end_time are also taken to be in).
+    """
+    ctx = calendar or default_calendar()
+    tz = tz or ctx.tz
+    busy = busy_epochs(timeutils.to_epoch(start_time, tz), timeutils.to_epoch(end_time, tz),
+                       calendar_ids, ctx)
+    return [(timeutils.from_epoch(s, tz), timeutils.from_epoch(e, tz)) for s, e in busy]
+
+@traced('calendar.is_busy')
+def is_busy(start_time, end_time, calendar_ids=None, calendar=None, tz=None, snapshot=None):
+    """True if any of the calendars is busy during [start_time, end_time)."""
+    ctx = calendar or default_calendar()
+    tz = tz or ctx.tz
+    return bool(busy_epochs(timeutils.to_epoch(start_time, tz), timeutils.to_epoch(end_time, tz),
+                            calendar_ids, ctx, snapshot))
+
+@traced('calendar.get_free_slots')
+def get_free_slots(start_time, end_time, duration_minutes=30, align_minutes=None,
+                   min_gap_minutes=0, buffer_before_minutes=0, buffer_after_minutes=0,
+                   calendar_ids=None, calendar=None, tz=None, profile=None, snapshot=None):
+    """
+    Free (start, end) slots of duration_minutes between start_time and end_time
+    (free on every calendar in calendar_ids, default all of the tenant's calendars).
+    align_minutes snaps each free gap's first slot to the local clock (e.g. 30 -> :00/:30),
+    min_gap_minutes ignores shorter gaps, and the buffers keep slots clear of events on either side.
+    tz is the user's zone: naive inputs are read in it, the clock alignment follows it, and the
+    slots come back in it (default: the calendar's timezone).
+    With an availability.AvailabilityProfile, slots are also limited to the profile's bookable
+    time (working hours, minus holidays and recurring blocks). A BusySnapshot covering the
+    range saves fetching busy time again.
+    """
+    ctx = calendar or default_calendar()
+    tz = tz or ctx.tz
+    start = timeutils.to_epoch(start_time, tz)
+    end = timeutils.to_epoch(end_time, tz)
+    busy = busy_epochs(start, end, calendar_ids, ctx, snapshot)
+
+    duration = duration_minutes * 60
+    align = align_minutes * 60 if align_minutes else None
+    align_origin = timeutils.local_midnight(start, tz)
+    if profile is not None:
+        merged = intervals.merge_intervals(busy, buffer_before_minutes * 60, buffer_after_minutes * 60)
+        gaps = profile.free_gaps(merged, start, end, tz, max(min_gap_minutes * 60, duration))
+        slots = intervals.slots_in_gaps(gaps, duration, align, align_origin)
+    else:
+        slots = intervals.free_slots(
+            busy,
+            start,
+            end,
+            duration,
+            align=align,
+            align_origin=align_origin,
+            min_gap=min_gap_minutes * 60,
+            buffer_before=buffer_before_minutes * 60,
+            buffer_after=buffer_after_minutes * 60,
+        )
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("free slots %s..%s: %d busy intervals %s, %d slots of %d min",
+                  start_time, end_time, len(busy), busy, len(slots), duration_minutes)
+    return [(timeutils.from_epoch(s, tz), timeutils.from_epoch(e, tz)) for s, e in slots]
+
+@traced('calendar.find_common_slots')
+def find_common_slots(attendees, start_time, end_time, duration_minutes=30, top_k=5,
+                      align_minutes=30, working_hours=(9, 18), working_days=(0, 1, 2, 3, 4),
+                      max_conflicts=None, calendar=None, tz=None, profile=None):
+    """
+    Best top_k meeting times for a group, across the attendees' calendars (IDs or emails the
+    service account can read) plus the tenant's own primary calendar.
+    Busy time for everyone comes from FreeBusy in one round of concurrent calls. Slots inside
+    working_hours (local hours, on working_days) rank first, then those with the fewest busy
+    attendees, then the earliest; max_conflicts=0 only returns times everyone is free. With a
+    profile (availability.AvailabilityProfile), its bookable time replaces working_hours/working_days.
+    Working hours, naive inputs and the returned times are in tz (default: the calendar's timezone).
+    Returns [{"start", "end", "conflicts", "unavailable": [ids], "working_hours": bool}, ...].
+    """
+    ctx = calendar or default_calendar()
+    tz = tz or ctx.tz
+    start = timeutils.to_epoch(start_time, tz)
+    end = timeutils.to_epoch(end_time, tz)
+    calendar_ids = list(dict.fromkeys([ctx.calendar_id] + list(attendees)))
+    per_calendar = query_freebusy(start, end, calendar_ids, ctx)
+    busy = {cal_id: intervals.merge_intervals(per_calendar.get(cal_id, [])) for cal_id in calendar_ids}
+
+    # Working-hours windows per local day, built through the timezone so DST is handled
+    if profile is not None:
+        preferred = profile.free_gaps([], start, end, tz)
     else:
-        with open(os.path.join(os.path.dirname(__file__), '../service_account.json')) as f:
-            service_account_info = json.load(f)
-    credentials = service_account.Credentials.from_service_account_info(
-        service_account_info, scopes=SCOPES)
-    service = build('calendar', 'v3', credentials=credentials)
-    return service
-
-def get_free_slots(start_time, end_time, duration_minutes=30):
-    service = get_calendar_service()
-    # Ensure start_time and end_time are timezone-aware
-    local_tz = pytz.timezone('Asia/Kolkata')
-    if start_time.tzinfo is None:
-        start_time = local_tz.localize(start_time)
-    if end_time.tzinfo is None:
-        end_time = local_tz.localize(end_time)
-    # Convert to UTC and remove tzinfo for ISO format, then add 'Z' for Google API
-    start_utc = start_time.astimezone(datetime.timezone.utc).replace(tzinfo=None)
-    end_utc = end_time.astimezone(datetime.timezone.utc).replace(tzinfo=None)
-    print("DEBUG: calendarId:", TEST_CALENDAR_ID)
-    print("DEBUG: timeMin:", start_utc.isoformat() + 'Z')
-    print("DEBUG: timeMax:", end_utc.isoformat() + 'Z')
-    events_result = service.events().list(
-        calendarId=TEST_CALENDAR_ID,
-        timeMin=start_utc.isoformat() + 'Z',
-        timeMax=end_utc.isoformat() + 'Z',
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute()
-    events = events_result.get('items', [])
-
-    # Build a list of busy intervals
-    busy = []
-    for event in events:
-        ev_start = event['start'].get('dateTime', event['start'].get('date'))
-        ev_end = event['end'].get('dateTime', event['end'].get('date'))
-        if ev_start and ev_end:
-            busy.append((datetime.datetime.fromisoformat(ev_start.replace('Z','+00:00')),
-                         datetime.datetime.fromisoformat(ev_end.replace('Z','+00:00'))))
-    busy.sort()
-    print(f"Busy intervals: {busy}")  # Debug print
-
-    # Find free slots between busy intervals
-    free_slots = []
-    current = start_time
-    while current + datetime.timedelta(minutes=duration_minutes) <= end_time:
-        next_slot_end = current + datetime.timedelta(minutes=duration_minutes)
-        # Ensure current and next_slot_end are timezone-aware
-        if current.tzinfo is None:
-            current = local_tz.localize(current)
-        if next_slot_end.tzinfo is None:
-            next_slot_end = local_tz.localize(next_slot_end)
-        overlap = False
-        for b_start, b_end in busy:
-            if (current < b_end and next_slot_end > b_start):
-                overlap = True
-                # Move current to the end of this busy interval (skip all overlapping slots)
-                if b_end > current:
-                    current = b_end
-                break
-        if not overlap:
-            free_slots.append((current, next_slot_end))
-            print(f"Free slot found: {current} to {next_slot_end}")  # Debug print
-            current = next_slot_end
-    return free_slots
-
-def create_event(summary, start_time, end_time, description=None):
-    service = get_calendar_service()
-    local_tz = pytz.timezone('Asia/Kolkata')  # Asia/NewDelhi is not a valid tz, use Asia/Kolkata
-
-    # If start_time/end_time are naive, localize them
-    if start_time.tzinfo is None:
-        start_time = local_tz.localize(start_time)
-    if end_time.tzinfo is None:
-        end_time = local_tz.localize(end_time)
-
-    event = {
+        preferred = [(timeutils.local_epoch(day, tz, working_hours[0]), timeutils.local_epoch(day, tz, working_hours[1]))
+                     for day in timeutils.local_dates(start, end, tz) if day.weekday() in working_days]
+
+    duration = duration_minutes * 60
+    ranked = intervals.rank_slots(
+        list(busy.values()),
+        start,
+        end,
+        duration,
+        top_k=top_k,
+        align=align_minutes * 60 if align_minutes else None,
+        align_origin=timeutils.local_midnight(start, tz),
+        preferred=preferred,
+        max_conflicts=max_conflicts,
+    )
+    slots = []
+    for s, e, conflicts, in_hours in ranked:
+        unavailable = []
+        if conflicts:
+            for cal_id, cal_busy in busy.items():
+                i = bisect.bisect_left(cal_busy, (e,))
+                if i > 0 and cal_busy[i - 1][1] > s:
+                    unavailable.append(cal_id)
+        slots.append({
+            'start': timeutils.from_epoch(s, tz),
+            'end': timeutils.from_epoch(e, tz),
+            'conflicts': conflicts,
+            'unavailable': unavailable,
+            'working_hours': in_hours,
+        })
+    return slots
+
+def _event_body(tz, summary, start, end, description=None):
+    # Instants go to Google in UTC; timeZone tells it which zone to show and repeat the event in
+    return {
         'summary': summary,
-        'start': {'dateTime': start_time.isoformat(), 'timeZone': 'Asia/Kolkata'},
-        'end': {'dateTime': end_time.isoformat(), 'timeZone': 'Asia/Kolkata'},
+        'start': {'dateTime': timeutils.to_rfc3339(start), 'timeZone': tz.key},
+        'end': {'dateTime': timeutils.to_rfc3339(end), 'timeZone': tz.key},
         'description': description or '',
     }
-    created_event = service.events().insert(calendarId=TEST_CALENDAR_ID, body=event).execute()
-    return created_event 
\ No newline at end of file
+
+def _existing_event(ctx, event_id):
+    """The live event with this ID, or None if there is none (or it was deleted)."""
+    try:
+        with span('calendar.events.get'):
+            event = ctx.execute(ctx.get_service().events().get(calendarId=ctx.calendar_id, eventId=event_id))
+    except HttpError as e:
+        if e.resp.status in (404, 410):
+            return None
+        raise
+    if event.get('status') == 'cancelled':
+        if ctx.cache_ttl > 0:
+            # Deleted since the event store's last sync; don't wait for the next one to free its time
+            ctx.get_event_store().apply(event)
+        return None
+    return event
+
+def get_event(event_id, calendar=None):
+    """The live event with this ID on the calendar, or None if it doesn't exist or was deleted."""
+    return _existing_event(calendar or default_calendar(), event_id)
+
+def create_event(summary, start_time, end_time, description=None, calendar=None, tz=None, event_id=None):
+    """
+    Insert one event. Naive start_time/end_time are in tz (default: the calendar's timezone).
+    With an event_id (booking.event_id()), a repeated insert returns the event created the
+    first time instead of a duplicate.
+    """
+    ctx = calendar or default_calendar()
+    tz = tz or ctx.tz
+    service = ctx.get_service()
+    event = _event_body(tz, summary, timeutils.to_epoch(start_time, tz), timeutils.to_epoch(end_time, tz),
+                        description)
+    if event_id:
+        event['id'] = event_id
+    try:
+        with span('calendar.events.insert'):
+            # Only inserts with our own ID are retried: a retry of one Google acknowledged is a 409
+            created_event = ctx.execute(service.events().insert(calendarId=ctx.calendar_id, body=event),
+                                        retry=bool(event_id))
+    except HttpError as e:
+        if not event_id or e.resp.status != 409:
+            raise
+        # Already inserted by an earlier attempt
+        created_event = _existing_event(ctx, event_id)
+        if created_event is None:
+            # The earlier event was deleted, and Google never reuses an ID: book it afresh
+            del event['id']
+            with span('calendar.events.insert'):
+                created_event = ctx.execute(service.events().insert(calendarId=ctx.calendar_id, body=event),
+                                            retry=False)
+    ctx.record_write()
+    if ctx.cache_ttl > 0:
+        # Write-through so the next availability check sees this booking without a sync
+        ctx.get_event_store().apply(created_event)
+    return created_event
+
+@traced('calendar.book_if_free')
+def book_if_free(summary, start_time, end_time, description=None, calendar=None, tz=None, event_id=None,
+                 snapshot=None):
+    """
+    Insert the event unless the tenant's calendars are busy then. Returns the event, or None
+    when the time is taken.
+    The conflict check and the insert run while holding a reservation on the interval, so two
+    overlapping bookings in this process can't both pass the check. If the time is busy because
+    of this very booking (same event_id, e.g. a retried request), that event is returned.
+    A snapshot is only trusted if no booking went through this context since it was taken.
+    """
+    ctx = calendar or default_calendar()
+    tz = tz or ctx.tz
+    start, end = timeutils.to_epoch(start_time, tz), timeutils.to_epoch(end_time, tz)
+    with ctx.reservations.hold(start, end):
+        # Never book against a copy of the calendar that may be out of date
+        busy = busy_epochs(start, end, calendar=ctx, snapshot=snapshot, stale_ok=False)
+        if busy:
+            # Only a busy block spanning the whole slot can be this booking's own event
+            if event_id and any(s <= start and end <= e for s, e in busy):
+                return _existing_event(ctx, event_id)
+            return None
+        return create_event(summary, start_time, end_time, description, ctx, tz, event_id)
+
+# Google accepts at most 50 calls per batch HTTP request
+BATCH_CHUNK_SIZE = 50
+
+@traced('calendar.create_events_batch')
+def create_events_batch(items, calendar=None, tz=None):
+    """
+    Validate and insert many events with few round trips.
+    items: list of dicts with summary, start_time, end_time (datetimes or ISO strings; naive ones
+    are in tz, default the calendar's timezone) and an optional description.
+    Items are checked against each other (earlier items win) and against existing busy time from
+    a single freebusy query, then inserted via batch HTTP requests of BATCH_CHUNK_SIZE. Like
+    book_if_free, the check and the inserts run while holding reservations on the items' times.
+    Returns one {"index", "status": "created" | "error", "event" | "error"} dict per item.
+    """
+    ctx = calendar or default_calendar()
+    tz = tz or ctx.tz
+    results = [None] * len(items)
+    accepted = []  # (index, start epoch, end epoch, body)
+    taken = []     # sorted (start, end) epochs of accepted items
+
+    for i, item in enumerate(items):
+        try:
+            s, e = (timeutils.to_epoch(timeutils.parse_iso(t) if isinstance(t, str) else t, tz)
+                    for t in (item['start_time'], item['end_time']))
+        except ValueError as e:
+            results[i] = {'index': i, 'status': 'error', 'error': f'invalid time: {e}'}
+            continue
+        if e <= s:
+            results[i] = {'index': i, 'status': 'error', 'error': 'end_time must be after start_time'}
+            continue
+        pos = bisect.bisect_left(taken, (s, e))
+        if (pos > 0 and taken[pos - 1][1] > s) or (pos < len(taken) and taken[pos][0] < e):
+            results[i] = {'index': i, 'status': 'error', 'error': 'overlaps another event in this batch'}
+            continue
+        taken.insert(pos, (s, e))
+        accepted.append((i, s, e, _event_body(tz, item['summary'], s, e, item.get('description'))))
+
+    with ctx.reservations.hold_all((s, e) for _, s, e, _ in accepted):
+        _insert_batch(ctx, accepted, results)
+    return results
+
+def _insert_batch(ctx, accepted, results):
+    """Drop accepted items that conflict with existing busy time and insert the rest into results."""
+    if accepted:
+        window_start = min(a[1] for a in accepted)
+        window_end = max(a[2] for a in accepted)
+        busy = intervals.merge_intervals(
+            b for cal_busy in query_freebusy(window_start, window_end, calendar=ctx).values() for b in cal_busy)
+        busy_starts = [b[0] for b in busy]
+        free = []
+        for i, s, e, body in accepted:
+            pos = bisect.bisect_left(busy_starts, e)
+            if pos > 0 and busy[pos - 1][1] > s:
+                results[i] = {'index': i, 'status': 'error', 'error': 'conflicts with an existing event'}
+            else:
+                free.append((i, body))
+        accepted = free
+
+    service = ctx.get_service()
+    store = ctx.get_event_store() if ctx.cache_ttl > 0 else None
+
+    def on_response(request_id, response, exception):
+        i = int(request_id)
+        if exception is not None:
+            results[i] = {'index': i, 'status': 'error', 'error': str(exception)}
+            return
+        results[i] = {'index': i, 'status': 'created', 'event': response}
+        ctx.record_write()
+        if store is not None:
+            store.apply(response)
+
+    for chunk_start in range(0, len(accepted), BATCH_CHUNK_SIZE):
+        chunk = accepted[chunk_start:chunk_start + BATCH_CHUNK_SIZE]
+        batch = service.new_batch_http_request(callback=on_response)
+        for i, body in chunk:
+            batch.add(service.events().insert(calendarId=ctx.calendar_id, body=body), request_id=str(i))
+        try:
+            with span('calendar.batch', size=len(chunk)):
+                ctx.execute(batch, retry=False)
+        except Exception as e:
+            # The whole batch request failed; items without a callback result get the error
+            for i, _ in chunk:
+                if results[i] is None:
+                    results[i] = {'index': i, 'status': 'error', 'error': str(e)}
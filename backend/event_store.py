@@ -0,0 +1,118 @@
+import threading
+import time
+from googleapiclient.errors import HttpError
+from timeutils import event_epoch
+from tracing import span
+
+# Partial response: only what busy time needs, not titles, descriptions, attendees and the rest
+LIST_FIELDS = 'items(id,status,start,end,transparency),nextPageToken,nextSyncToken'
+
+
+class EventStore:
+    """
+    Local copy of one calendar's busy intervals, as epoch seconds.
+    Loads every event once, then stays current with syncToken incremental syncs. Only the fields
+    in LIST_FIELDS are downloaded.
+    Reads are answered from memory while the last sync is younger than max_staleness seconds.
+    """
+
+    def __init__(self, calendar_id, service_factory, tz, max_staleness=30.0, execute=None):
+        self.calendar_id = calendar_id
+        self.tz = tz  # the calendar's timezone, for all-day events
+        self.service_factory = service_factory
+        # How requests are sent: the owning CalendarContext's execute (its breaker and retries)
+        self.execute = execute or (lambda request: request.execute())
+        self.max_staleness = max_staleness
+        self._events = {}  # event id -> (start, end) epoch seconds
+        self._sync_token = None
+        self._last_sync = None
+        self._lock = threading.RLock()
+
+    def _list(self, **params):
+        service = self.service_factory()
+        items = []
+        page_token = None
+        while True:
+            with span('calendar.events.list', sync='incremental' if 'syncToken' in params else 'full'):
+                result = self.execute(service.events().list(
+                    calendarId=self.calendar_id,
+                    singleEvents=True,
+                    maxResults=2500,
+                    pageToken=page_token,
+                    fields=LIST_FIELDS,
+                    **params
+                ))
+            items.extend(result.get('items', []))
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return items, result.get('nextSyncToken')
+
+    def full_sync(self):
+        with self._lock:
+            items, sync_token = self._list()
+            self._events = {}
+            for event in items:
+                self.apply(event)
+            self._sync_token = sync_token
+            self._last_sync = time.monotonic()
+
+    def incremental_sync(self):
+        with self._lock:
+            if self._sync_token is None:
+                return self.full_sync()
+            try:
+                items, sync_token = self._list(syncToken=self._sync_token)
+            except HttpError as e:
+                if e.resp.status == 410:
+                    # Sync token expired: Google wants a fresh full sync
+                    return self.full_sync()
+                raise
+            for event in items:
+                self.apply(event)
+            self._sync_token = sync_token
+            self._last_sync = time.monotonic()
+
+    def is_stale(self):
+        return self._last_sync is None or time.monotonic() - self._last_sync > self.max_staleness
+
+    def refresh(self, force=False):
+        if not force and not self.is_stale():
+            return
+        with self._lock:
+            # Another thread may have synced while we waited for the lock
+            if force or self.is_stale():
+                self.incremental_sync()
+
+    def apply(self, event):
+        """Insert, update or remove one event (also used for write-through of our own inserts)."""
+        with self._lock:
+            # Events marked "free" don't block time, as in FreeBusy
+            if event.get('status') == 'cancelled' or event.get('transparency') == 'transparent':
+                self._events.pop(event['id'], None)
+                return
+            start = event_epoch(event.get('start', {}), self.tz)
+            end = event_epoch(event.get('end', {}), self.tz)
+            if start is not None and end is not None:
+                self._events[event['id']] = (start, end)
+
+    def has_synced(self):
+        return self._last_sync is not None
+
+    def age(self):
+        """Seconds since the last successful sync (None before the first)."""
+        return None if self._last_sync is None else time.monotonic() - self._last_sync
+
+    def busy_intervals(self, start, end, refresh=True):
+        """
+        Sorted (start, end) epoch-second intervals overlapping [start, end).
+        refresh=False answers from memory however old it is (for when Google is unreachable).
+        """
+        if refresh:
+            self.refresh()
+        with self._lock:
+            busy = [(s, e) for s, e in self._events.values() if s < end and e > start]
+        busy.sort()
+        return busy
+
+    def __len__(self):
+        return len(self._events)
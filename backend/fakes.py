@@ -0,0 +1,375 @@
+"""
+In-process stand-ins for Gemini and Google Calendar, so the backend can be run and measured
+without Google services.
+
+The providers plug in where the real clients do:
+- LLM: GeminiKeyPool(model_factory=...). A model factory is called as
+  factory(api_key, system_instruction=...) and returns an object with generate_content(prompt,
+  **kwargs) and async generate_content_async(prompt, stream=False, **kwargs); responses have
+  .text, .parts and .usage_metadata, and stream=True returns an async iterator of such chunks.
+  FakeGemini.model_factory replays recorded model output for each user message.
+- Calendar: CalendarContext.set_service(service). The service is the subset of the Calendar v3
+  client that calendar_utils and event_store use: events().list/insert/get, freebusy().query
+  and new_batch_http_request, each returning a request with .execute().
+  FakeCalendarService serves them from an in-memory event list (see synthetic_events()).
+
+Both take a latency (seconds per call, plus up to `jitter` more) and an error_rate (share of
+calls that fail the way the real service would: HTTP 503 for Calendar, ServiceUnavailable for
+Gemini). Runs are repeatable for a given seed.
+
+    llm = FakeGemini({"what's free tomorrow?": '{"intent": "ask_slots", ...}'}, latency=0.4)
+    calendar = FakeCalendarService(synthetic_events(date.today(), 14, tz), latency=0.08)
+    install(llm, calendar)
+"""
+import asyncio
+import collections
+import datetime
+import json
+import random
+import threading
+import time
+import timeutils
+
+DEFAULT_REPLY = json.dumps({'intent': 'smalltalk', 'summary': None, 'date': None, 'start_time': None,
+                            'end_time': None, 'attendees': [],
+                            'reply': "I'm CalPal. I can check your calendar or book a meeting."})
+
+
+class Faults:
+    """Latency and error injection shared by the fakes."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """(seconds to wait, whether the call fails) for one call."""
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            return delay, self.error_rate > 0 and self._random.random() < self.error_rate
+
+
+def _http_error(status, reason):
+    import httplib2
+    from googleapiclient.errors import HttpError
+    return HttpError(httplib2.Response({'status': status, 'reason': reason}), reason.encode('utf-8'))
+
+
+# --- Calendar ---------------------------------------------------------------------------------
+
+def synthetic_events(first_day, days, tz, per_day=4, seed=0):
+    """
+    Calendar API event dicts: per_day meetings of 30-120 minutes on each of `days` local days
+    from first_day, starting between 08:00 and 18:00 on the quarter hour (overlaps allowed).
+    """
+    rng = random.Random(seed)
+    events = []
+    for offset in range(days):
+        day = first_day + datetime.timedelta(days=offset)
+        for n in range(per_day):
+            start = timeutils.local_epoch(day, tz, rng.randrange(8, 18), rng.choice((0, 15, 30, 45)))
+            end = start + 60 * rng.choice((30, 45, 60, 90, 120))
+            events.append({
+                'id': f'syn{offset:04d}x{n}',
+                'status': 'confirmed',
+                'summary': f'Meeting {offset}.{n}',
+                'start': {'dateTime': timeutils.to_rfc3339(start), 'timeZone': tz.key},
+                'end': {'dateTime': timeutils.to_rfc3339(end), 'timeZone': tz.key},
+            })
+    return events
+
+
+class _FakeRequest:
+    def __init__(self, service, method, fn):
+        self.service = service
+        self.method = method
+        self.fn = fn
+
+    def execute(self):
+        delay, fail = self.service.faults.draw()
+        if delay:
+            time.sleep(delay)
+        self.service.count(self.method)
+        if fail:
+            raise _http_error(503, 'Backend Error')
+        return self.fn()
+
+
+class _FakeEvents:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, calendarId, syncToken=None, pageToken=None, maxResults=250, **kwargs):
+        return _FakeRequest(self.service, 'events.list',
+                            lambda: self.service._list(syncToken, pageToken, maxResults))
+
+    def insert(self, calendarId, body):
+        return _FakeRequest(self.service, 'events.insert', lambda: self.service._insert(body))
+
+    def get(self, calendarId, eventId):
+        return _FakeRequest(self.service, 'events.get', lambda: self.service._get(eventId))
+
+
+class _FakeFreeBusy:
+    def __init__(self, service):
+        self.service = service
+
+    def query(self, body):
+        def run():
+            start = timeutils.parse_rfc3339(body['timeMin'])
+            end = timeutils.parse_rfc3339(body['timeMax'])
+            calendars = {}
+            for item in body['items']:
+                busy = self.service.busy(start, end, item['id'])
+                calendars[item['id']] = {
+                    'busy': [{'start': timeutils.to_rfc3339(s), 'end': timeutils.to_rfc3339(e)} for s, e in busy]}
+            return {'calendars': calendars}
+        return _FakeRequest(self.service, 'freebusy.query', run)
+
+
+class _FakeBatch:
+    """One HTTP round trip for all added requests; each gets its own callback, as in googleapiclient."""
+
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None, callback=None):
+        self.requests.append((request, request_id or str(len(self.requests)), callback or self.callback))
+
+    def execute(self):
+        def run():
+            for request, request_id, callback in self.requests:
+                try:
+                    response, error = request.fn(), None
+                except Exception as e:
+                    response, error = None, e
+                callback(request_id, response, error)
+        _FakeRequest(self.service, 'batch', run).execute()
+
+
+class FakeCalendarService:
+    """
+    Calendar v3 service over an in-memory event list, shared by every calendar ID except those
+    in `busy_by_calendar` (calendar ID -> (start, end) epoch intervals, e.g. other attendees'
+    calendars), which FreeBusy answers from that fixed busy time instead.
+    Inserts keep Google's semantics for client-chosen IDs (409 on a duplicate) and show up in
+    later freebusy queries and incremental (syncToken) lists.
+    """
+
+    def __init__(self, events=(), latency=0.0, jitter=0.0, error_rate=0.0, seed=0, tz=timeutils.UTC,
+                 busy_by_calendar=None):
+        self.faults = Faults(latency, jitter, error_rate, seed)
+        self.tz = tz  # for all-day events
+        self.busy_by_calendar = dict(busy_by_calendar or {})
+        self.calls = collections.Counter()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.reset(events)
+
+    def reset(self, events=()):
+        """Replace every event. Sync tokens issued before are answered with 410, as Google does."""
+        with self._lock:
+            self._generation += 1
+            self._version = 0
+            self._events = {}  # id -> (version, event)
+            for event in events:
+                self._version += 1
+                self._events[event['id']] = (self._version, dict(event))
+
+    def count(self, method):
+        with self._lock:
+            self.calls[method] += 1
+
+    def events(self):
+        return _FakeEvents(self)
+
+    def freebusy(self):
+        return _FakeFreeBusy(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _FakeBatch(self, callback)
+
+    def busy(self, start, end, calendar_id=None):
+        """Sorted (start, end) epoch intervals of confirmed, opaque events overlapping [start, end)."""
+        if calendar_id in self.busy_by_calendar:
+            return sorted((s, e) for s, e in self.busy_by_calendar[calendar_id] if s < end and e > start)
+        with self._lock:
+            events = [event for _, event in self._events.values()
+                      if event.get('status') != 'cancelled' and event.get('transparency') != 'transparent']
+        busy = []
+        for event in events:
+            s = timeutils.event_epoch(event['start'], self.tz)
+            e = timeutils.event_epoch(event['end'], self.tz)
+            if s < end and e > start:
+                busy.append((s, e))
+        return sorted(busy)
+
+    def cancel(self, event_id):
+        """Delete an event the way Google does: it stays, as cancelled, and its ID can't be reused."""
+        with self._lock:
+            self._version += 1
+            self._events[event_id] = (self._version, dict(self._events[event_id][1], status='cancelled'))
+
+    def _list(self, sync_token, page_token, max_results):
+        with self._lock:
+            since = 0
+            if sync_token is not None:
+                generation, since = (int(x) for x in sync_token.split(':'))
+                if generation != self._generation:
+                    raise _http_error(410, 'Sync token is no longer valid')
+            changed = sorted((v, e) for v, e in self._events.values() if v > since)
+            offset = int(page_token or 0)
+            page = [dict(event) for _, event in changed[offset:offset + max_results]]
+            result = {'items': page}
+            if offset + max_results < len(changed):
+                result['nextPageToken'] = str(offset + max_results)
+            else:
+                result['nextSyncToken'] = f'{self._generation}:{self._version}'
+            return result
+
+    def _insert(self, body):
+        with self._lock:
+            event_id = body.get('id') or f'fake{self._version + 1}'
+            if event_id in self._events:
+                raise _http_error(409, 'The requested identifier already exists.')
+            self._version += 1
+            event = dict(body, id=event_id, status='confirmed')
+            self._events[event_id] = (self._version, event)
+            return dict(event)
+
+    def _get(self, event_id):
+        with self._lock:
+            if event_id not in self._events:
+                raise _http_error(404, 'Not Found')
+            return dict(self._events[event_id][1])
+
+
+# --- Gemini -----------------------------------------------------------------------------------
+
+class _Usage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.cached_content_token_count = 0
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class FakeResponse:
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.parts = [text] if text else []
+        self.usage_metadata = usage
+
+
+class FakeStream:
+    """What generate_content_async(stream=True) returns: chunks, then the totals."""
+
+    def __init__(self, text, usage, chunk_chars=24):
+        self.text = text
+        self.usage_metadata = usage
+        self._chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self._chunks:
+            await asyncio.sleep(0)
+            yield FakeResponse(chunk)
+
+
+def user_message(prompt):
+    """The latest user message in a chat prompt (the text after the last "User: ")."""
+    if not isinstance(prompt, str):
+        return None
+    pos = prompt.rfind('User: ')
+    if pos == -1:
+        return prompt.strip()
+    return prompt[pos + len('User: '):].split('\nBot:', 1)[0].strip()
+
+
+class _FakeModel:
+    def __init__(self, llm, system_instruction):
+        self.llm = llm
+        self.system_instruction = system_instruction
+
+    def _respond(self, prompt, stream):
+        text = self.llm.reply_for(prompt)
+        # Same rough estimate gemini_pool uses before a call
+        usage = _Usage(max(1, len(str(prompt)) // 4 + len(self.system_instruction or '') // 4),
+                       max(1, len(text) // 4))
+        return FakeStream(text, usage) if stream else FakeResponse(text, usage)
+
+    def _fail(self):
+        from google.api_core import exceptions as google_exceptions
+        return google_exceptions.ServiceUnavailable('fake Gemini outage')
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        delay, fail = self.llm.faults.draw()
+        if delay:
+            time.sleep(delay)
+        self.llm.count()
+        if fail:
+            raise self._fail()
+        return self._respond(prompt, stream)
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        delay, fail = self.llm.faults.draw()
+        if delay:
+            await asyncio.sleep(delay)
+        self.llm.count()
+        if fail:
+            raise self._fail()
+        return self._respond(prompt, stream)
+
+
+class FakeGemini:
+    """
+    Replays recorded model output: responses maps a user message to the raw text the model
+    returned for it. Unknown messages get `default` (a smalltalk reply).
+    """
+
+    def __init__(self, responses=None, latency=0.0, jitter=0.0, error_rate=0.0, seed=0,
+                 default=DEFAULT_REPLY):
+        self.responses = dict(responses or {})
+        self.default = default
+        self.faults = Faults(latency, jitter, error_rate, seed)
+        self.calls = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def count(self):
+        with self._lock:
+            self.calls += 1
+
+    def reply_for(self, prompt):
+        text = self.responses.get(user_message(prompt))
+        if text is None:
+            with self._lock:
+                self.misses += 1
+            return self.default
+        return text
+
+    def model_factory(self, api_key, system_instruction=None, **kwargs):
+        return _FakeModel(self, system_instruction)
+
+
+def install(llm=None, calendar=None, tenant=None):
+    """
+    Route Gemini calls (the shared key pool) to llm and the tenant's Calendar calls (default
+    tenant if None) to calendar. Either can be left out.
+    """
+    import agent
+    from gemini_pool import GeminiKeyPool
+    from tenants import get_tenant
+    if llm is not None:
+        # No quota limits: the fake has none, and waiting on them would skew timings
+        agent.gemini_pool = GeminiKeyPool(['fake-key'], model_factory=llm.model_factory,
+                                          rpm_limit=10 ** 9, tpm_limit=10 ** 12)
+    if calendar is not None:
+        (tenant or get_tenant()).calendar.set_service(calendar)
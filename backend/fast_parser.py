@@ -0,0 +1,303 @@
+"""
+Rule-based intent and slot parser for messages that don't need the LLM.
+Handles explicit key/value bookings, ISO and numeric dates, relative dates and clock times,
+and returns the same dict shape chat_with_agent parses from Gemini plus a confidence score.
+"""
+import datetime
+import os
+import re
+
+# Messages parsed with at least this confidence skip Gemini (set above 1 to disable)
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv('FAST_PATH_MIN_CONFIDENCE', '0.85'))
+
+WEEKDAYS = {
+    'monday': 0, 'mon': 0, 'tuesday': 1, 'tue': 1, 'tues': 1, 'wednesday': 2, 'wed': 2,
+    'thursday': 3, 'thu': 3, 'thurs': 3, 'friday': 4, 'fri': 4, 'saturday': 5, 'sat': 5,
+    'sunday': 6, 'sun': 6,
+}
+MONTHS = (r'jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|'
+          r'sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?')
+
+KV_RE = re.compile(r'\b(summary|title|date|start[ _]?time|start|end[ _]?time|end)\s*[:=]\s*', re.I)
+KV_KEYS = {'summary': 'summary', 'title': 'summary', 'date': 'date', 'start': 'start_time',
+           'end': 'end_time'}
+
+ISO_DATE_RE = re.compile(r'\b(\d{4})-(\d{1,2})-(\d{1,2})\b')
+NUMERIC_DATE_RE = re.compile(r'\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{2}|\d{4})\b')
+DAY_MONTH_RE = re.compile(rf'\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({MONTHS})\b(?:,?\s+(\d{{4}}))?')
+MONTH_DAY_RE = re.compile(rf'\b({MONTHS})\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(\d{{4}}))?')
+RELATIVE_RE = re.compile(r'\b(day after tomorrow|today|tomorrow|tmrw|tmr)\b')
+WEEKDAY_RE = re.compile(r'\b(?:(next|this|coming)\s+)?(' + '|'.join(sorted(WEEKDAYS, key=len, reverse=True)) + r')\b')
+DATE_PREFIX_RE = re.compile(r'\b(?:on|for|by)\s*$')
+
+CLOCK = r'\d{1,2}(?::\d{2})?\s*(?:am|pm|a\.m\.|p\.m\.)?'
+TIME_RANGE_RE = re.compile(rf'\b(?:from\s+|between\s+)?({CLOCK})\s*(?:-|–|to|until|till|and)\s*({CLOCK})(?![\d/.-])')
+TIME_RE = re.compile(r'\b(?:at\s+|@\s*)?(\d{1,2}(?::\d{2})?\s*(?:am|pm|a\.m\.|p\.m\.)|\d{1,2}:\d{2}|noon)(?![\d/.-])')
+
+GREETING_RE = re.compile(
+    r"^(hi+|hello|hey+|hiya|yo|good (?:morning|afternoon|evening))"
+    r"(?:\s+(?:there|calpal|bot))?[\s!.,]*$")
+# "for 30 minutes", "2 hour", "90-min", "an hour", "half an hour"
+DURATION_RE = re.compile(
+    r'\b(?:for\s+)?(?:(half)\s+an?|(an?|one|two|three|\d+(?:\.\d+)?))\s*-?\s*(hours?|hrs?|minutes?|mins?)\b(\s+and\s+a\s+half\b)?')
+DURATION_WORDS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3}
+SLOTS_RE = re.compile(r'\b(?:slots?|openings?|free time|gaps?)\b|\bwhen am i free\b|\bwhat(?:\'s| is)? (?:free|open|available)\b')
+AVAILABILITY_RE = re.compile(r'\b(?:free|available|availability|busy|open)\b')
+BOOK_RE = re.compile(r'\b(book|schedule|set up|arrange|add|create|put|reserve|plan)\b')
+# Words that depend on conversation context or on phrasing this parser doesn't model
+AMBIGUOUS_RE = re.compile(
+    r"\b(it|that|this one|those|yes|yeah|yep|no|nope|same|instead|reschedule|move|cancel|delete|"
+    r"confirm|not|don't|dont|can't|won't|week|weekend|month|morning|afternoon|evening|tonight|"
+    r"night|midnight|later|soon|asap|every|each|daily|weekly|recurring|everyone|attendees|"
+    # Acknowledgements answer the bot's last message (e.g. accept a suggested time)
+    r"ok|okay|sure|cool|great|perfect|thanks|thank you|thx|sounds good)\b")
+# Questions ("did you book...?", "should I schedule...") are about bookings, not requests for one.
+# "can you ..." / "could you ..." without a question mark are taken as polite requests.
+QUESTION_RE = re.compile(
+    r"\?\s*$|^(?:what|what's|whats|when|where|which|who|whom|whose|why|how|did|didn't|do|does|"
+    r"should|shall|is|isn't|are|aren't|was|were|have|has|had|may|might|must|"
+    r"(?:can|could|would|will)\s+(?:i|we))\b")
+# A summary opening like this is the rest of a sentence, not an event title
+SUMMARY_START_RE = re.compile(
+    r"^(?:i|you|we|he|she|they|it|me|my|our|your|his|her|their|did|do|does|can|could|should|would|"
+    r"will|shall|is|are|was|were|what|when|where|why|how)\b", re.I)
+# Other people's addresses mean a group request (find_common_slot), which is left to Gemini
+EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+FILLER_RE = re.compile(
+    r"^(?:(?:please|pls|can you|could you|would you|will you|i want to|i'd like to|i need to|"
+    r"i wanna|let's|lets|me|us|a|an|the|new|to|for|on|at|of)\s+)+", re.I)
+TRAILING_FILLER_RE = re.compile(r'(?:\s+(?:on|at|for|from|by|please|pls|and))+$', re.I)
+
+
+def empty_info():
+    return {"intent": None, "summary": None, "date": None, "start_time": None, "end_time": None}
+
+
+def parse_clock(text):
+    """'2pm', '2:30 pm', '14:00', 'noon' -> 'HH:MM' (None if not a valid time)."""
+    text = text.strip().lower().replace('.', '')
+    if text == 'noon':
+        return '12:00'
+    m = re.fullmatch(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)?', text)
+    if not m:
+        return None
+    hour, minute, meridiem = int(m.group(1)), int(m.group(2) or 0), m.group(3)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == 'pm' else 0)
+    elif m.group(2) is None:
+        # A bare hour like "3" is ambiguous without am/pm
+        return None
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+def _add_minutes(hhmm, minutes):
+    """hhmm plus minutes, or None if that runs past midnight."""
+    hour, minute = (int(x) for x in hhmm.split(':'))
+    total = hour * 60 + minute + minutes
+    if total >= 24 * 60:
+        return None
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+def find_duration(text):
+    """Return (minutes or None, matched span or None) for "for 30 minutes", "2 hour", ..."""
+    m = DURATION_RE.search(text)
+    if not m:
+        return None, None
+    amount = 0.5 if m.group(1) else DURATION_WORDS.get(m.group(2)) or float(m.group(2))
+    if m.group(4):
+        amount += 0.5
+    minutes = amount * (60 if m.group(3).startswith('h') else 1)
+    if minutes <= 0 or minutes != int(minutes):
+        return None, m.span()
+    return int(minutes), m.span()
+
+
+def _meridiem(text):
+    text = text.lower().replace('.', '')
+    return 'pm' if 'pm' in text else 'am' if 'am' in text else ''
+
+
+def _safe_date(year, month, day):
+    try:
+        return datetime.date(year, month, day)
+    except ValueError:
+        return None
+
+
+def find_date(text, today):
+    """Return (date or None, (start, end) span of the match in text)."""
+    m = ISO_DATE_RE.search(text)
+    if m:
+        return _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3))), m.span()
+    m = NUMERIC_DATE_RE.search(text)
+    if m:
+        year = int(m.group(3))
+        year += 2000 if year < 100 else 0
+        # Day first (DD-MM-YYYY), as in "date: 03-07-2025" -> 2025-07-03
+        return _safe_date(year, int(m.group(2)), int(m.group(1))), m.span()
+    for regex in (DAY_MONTH_RE, MONTH_DAY_RE):
+        m = regex.search(text)
+        if m:
+            # Imported on first use: most messages never get here
+            from dateutil import parser as dateparser
+            try:
+                parsed = dateparser.parse(m.group(0), default=datetime.datetime(today.year, 1, 1)).date()
+            except (ValueError, OverflowError):
+                return None, m.span()
+            if not m.group(3) and parsed < today:
+                parsed = _safe_date(parsed.year + 1, parsed.month, parsed.day)
+            return parsed, m.span()
+    m = RELATIVE_RE.search(text)
+    if m:
+        word = m.group(1)
+        days = 0 if word == 'today' else 2 if word == 'day after tomorrow' else 1
+        return today + datetime.timedelta(days=days), m.span()
+    m = WEEKDAY_RE.search(text)
+    if m:
+        target = WEEKDAYS[m.group(2)]
+        ahead = (target - today.weekday()) % 7
+        if ahead == 0 and m.group(1) != 'this':
+            ahead = 7
+        return today + datetime.timedelta(days=ahead), m.span()
+    return None, None
+
+
+def find_times(text):
+    """Return (start 'HH:MM' or None, end 'HH:MM' or None, list of matched spans)."""
+    m = TIME_RANGE_RE.search(text)
+    if m:
+        first, second = m.group(1), m.group(2)
+        # "10-11am": the first time borrows the second one's am/pm
+        if not _meridiem(first) and _meridiem(second) and ':' not in first:
+            first = f"{first} {_meridiem(second)}"
+        start, end = parse_clock(first), parse_clock(second)
+        # "9am to 10", "11am to 1": the second time borrows the first one's, or the next, am/pm
+        if start and end is None and _meridiem(first) and not _meridiem(second) and ':' not in second:
+            end = parse_clock(f"{second} {_meridiem(first)}")
+            if end and end <= start and _meridiem(first) == 'am':
+                end = parse_clock(f"{second} pm")
+        if start and end and end > start:
+            return start, end, [m.span()]
+    m = TIME_RE.search(text)
+    if m:
+        start = parse_clock(m.group(1))
+        if start:
+            return start, None, [m.span()]
+    return None, None, []
+
+
+def _strip_spans(text, spans):
+    for s, e in sorted(spans, reverse=True):
+        before = DATE_PREFIX_RE.sub('', text[:s])
+        text = before + ' ' + text[e:]
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _summary_from(text, spans, verb_match):
+    if verb_match:
+        spans = spans + [verb_match.span()]
+    rest = _strip_spans(text, spans)
+    rest = FILLER_RE.sub('', rest)
+    rest = TRAILING_FILLER_RE.sub('', rest).strip(' ,.!?')
+    if not rest:
+        return None
+    return rest[0].upper() + rest[1:]
+
+
+def _parse_key_values(message, today):
+    matches = list(KV_RE.finditer(message))
+    keys = {KV_KEYS[re.sub(r'[ _]?time$', '', m.group(1).lower())] for m in matches}
+    if not {'date', 'start_time'} <= keys:
+        return None
+    info = empty_info()
+    info['intent'] = 'book'
+    for i, m in enumerate(matches):
+        key = KV_KEYS[re.sub(r'[ _]?time$', '', m.group(1).lower())]
+        value_end = matches[i + 1].start() if i + 1 < len(matches) else len(message)
+        value = message[m.end():value_end].strip(' ,;')
+        if key == 'summary':
+            info['summary'] = value or None
+        elif key == 'date':
+            day, _ = find_date(value.lower(), today)
+            if day is None:
+                return None
+            info['date'] = day.strftime('%Y-%m-%d')
+        else:
+            clock = parse_clock(value)
+            if clock is None:
+                return None
+            info[key] = clock
+    if info['end_time'] and info['end_time'] <= info['start_time']:
+        return None
+    return info
+
+
+def parse_message(message, now=None):
+    """
+    Parse a chat message locally.
+    Returns (info, confidence): info has the keys intent, summary, date, start_time, end_time;
+    confidence is 0..1, and callers should fall back to Gemini below FAST_PATH_MIN_CONFIDENCE.
+    """
+    today = (now or datetime.datetime.now()).date()
+    text = message.strip()
+    lowered = text.lower()
+    info = empty_info()
+
+    if GREETING_RE.match(lowered):
+        info['intent'] = 'smalltalk'
+        return info, 1.0
+
+    kv = _parse_key_values(text, today)
+    if kv:
+        return kv, 1.0
+
+    if AMBIGUOUS_RE.search(lowered) or EMAIL_RE.search(lowered):
+        return info, 0.2
+
+    day, date_span = find_date(lowered, today)
+    start, end, time_spans = find_times(lowered if date_span is None else
+                                        lowered[:date_span[0]] + ' ' * (date_span[1] - date_span[0]) + lowered[date_span[1]:])
+    if day:
+        info['date'] = day.strftime('%Y-%m-%d')
+    info['start_time'], info['end_time'] = start, end
+    spans = time_spans + ([date_span] if date_span else [])
+
+    duration, duration_span = find_duration(lowered)
+    if duration_span:
+        spans.append(duration_span)
+        if duration is None:
+            # A length this parser can't turn into whole minutes
+            return info, 0.3
+
+    book = BOOK_RE.search(lowered)
+    if book and day and start:
+        info['intent'] = 'book'
+        if QUESTION_RE.search(lowered):
+            return info, 0.3
+        if end and duration and _add_minutes(start, duration) != end:
+            # "3-4pm for 30 minutes": conflicting, let Gemini sort it out
+            return info, 0.3
+        info['end_time'] = end or _add_minutes(start, duration or 60)
+        if info['end_time'] is None:
+            # Runs past midnight: the date of the end is not this parser's call
+            return info, 0.3
+        info['summary'] = _summary_from(text, spans, book)
+        words = len(info['summary'].split()) if info['summary'] else 0
+        # Digits left in the summary are times or amounts this parser didn't understand
+        clean = (0 < words <= 8 and not re.search(r'\d', info['summary'])
+                 and not SUMMARY_START_RE.match(info['summary']))
+        return info, 0.9 if clean else 0.6
+    if SLOTS_RE.search(lowered) and not book:
+        info['intent'] = 'ask_slots'
+        info['start_time'] = info['end_time'] = None
+        return info, 0.9 if day else 0.4
+    if AVAILABILITY_RE.search(lowered) and not book and day and start:
+        info['intent'] = 'check_availability'
+        info['end_time'] = end or _add_minutes(start, duration or 60)
+        return info, 0.9 if info['end_time'] else 0.3
+    return info, 0.3
@@ -0,0 +1,275 @@
+import asyncio
+import collections
+import functools
+import os
+import threading
+import time
+import resilience
+from tracing import span
+
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'models/gemini-1.5-flash')
+# Per-key quotas (free tier gemini-1.5-flash defaults); override in .env for paid keys
+GEMINI_RPM_LIMIT = int(os.getenv('GEMINI_RPM_LIMIT', '15'))
+GEMINI_TPM_LIMIT = int(os.getenv('GEMINI_TPM_LIMIT', '1000000'))
+# How long (seconds) a key that hit its quota is left alone
+GEMINI_KEY_COOLDOWN = float(os.getenv('GEMINI_KEY_COOLDOWN', '60'))
+# Longest a call waits for a key with free quota before giving up
+GEMINI_MAX_WAIT = float(os.getenv('GEMINI_MAX_WAIT', '10'))
+
+WINDOW_SECONDS = 60.0
+
+
+class NoKeyAvailable(RuntimeError):
+    pass
+
+
+@functools.cache
+def _keyed_model_class():
+    # google.generativeai takes most of a second to import, so it is loaded on first use
+    import google.generativeai as genai
+    from google.generativeai.client import _ClientManager
+
+    class KeyedGenerativeModel(genai.GenerativeModel):
+        """
+        GenerativeModel bound to one API key instead of the global genai.configure() key.
+        Uses the SDK's client manager, so each key gets its own sync and async clients.
+        """
+
+        def __init__(self, api_key, model_name=GEMINI_MODEL, **kwargs):
+            super().__init__(model_name, **kwargs)
+            self._clients = _ClientManager()
+            self._clients.configure(api_key=api_key)
+            self._client = self._clients.get_default_client('generative')
+
+        async def generate_content_async(self, *args, **kwargs):
+            # The async (grpc.aio) client must be created inside the running event loop
+            if self._async_client is None:
+                self._async_client = self._clients.get_default_client('generative_async')
+            return await super().generate_content_async(*args, **kwargs)
+
+    return KeyedGenerativeModel
+
+
+def keyed_model(api_key, model_name=GEMINI_MODEL, **kwargs):
+    """A Gemini model bound to api_key (the default model_factory)."""
+    return _keyed_model_class()(api_key, model_name, **kwargs)
+
+
+def is_quota_error(e):
+    # By type and status code (RESOURCE_EXHAUSTED / 429), not by message text
+    return resilience.is_rate_limited(e)
+
+
+def estimate_tokens(prompt):
+    # Rough pre-call estimate (~4 characters per token); corrected from usage_metadata afterwards
+    return max(1, len(str(prompt)) // 4)
+
+
+def response_tokens(response):
+    usage = getattr(response, 'usage_metadata', None)
+    return getattr(usage, 'total_token_count', 0) or 0
+
+
+class KeyState:
+    def __init__(self, index, api_key):
+        self.index = index
+        self.api_key = api_key
+        self.models = {}  # system instruction (None for none) -> model for this key
+        self.request_times = collections.deque()
+        self.token_usage = collections.deque()  # (time, tokens)
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.quota_errors = 0
+        self.tokens = 0
+
+    def _trim(self, now):
+        cutoff = now - WINDOW_SECONDS
+        while self.request_times and self.request_times[0] <= cutoff:
+            self.request_times.popleft()
+        while self.token_usage and self.token_usage[0][0] <= cutoff:
+            self.token_usage.popleft()
+
+    def window_tokens(self):
+        return sum(tokens for _, tokens in self.token_usage)
+
+    def ready_at(self, now, rpm_limit, tpm_limit, tokens):
+        """Earliest time this key can take a request of `tokens` tokens."""
+        self._trim(now)
+        ready = max(now, self.cooldown_until)
+        if len(self.request_times) >= rpm_limit:
+            ready = max(ready, self.request_times[0] + WINDOW_SECONDS)
+        if self.token_usage and self.window_tokens() + tokens > tpm_limit:
+            ready = max(ready, self.token_usage[0][0] + WINDOW_SECONDS)
+        return ready
+
+    def masked_key(self):
+        return '...' + self.api_key[-4:]
+
+
+class GeminiKeyPool:
+    """
+    Spreads Gemini calls across several API keys.
+    Tracks requests and tokens per key over a sliding minute, routes each call to the key with
+    the most headroom, and parks keys that hit a quota error for GEMINI_KEY_COOLDOWN seconds.
+    Whole calls have a deadline (GEMINI_TIMEOUT), are retried with backoff on transient errors
+    and go through the Gemini circuit breaker (see resilience.py).
+    A single lock guards the bookkeeping, so the pool is safe from threads and from asyncio.
+    """
+
+    def __init__(self, api_keys, model_factory=None, rpm_limit=GEMINI_RPM_LIMIT,
+                 tpm_limit=GEMINI_TPM_LIMIT, cooldown=GEMINI_KEY_COOLDOWN, max_wait=GEMINI_MAX_WAIT,
+                 timeout=resilience.GEMINI_TIMEOUT, breaker=None):
+        if not api_keys:
+            raise ValueError('GeminiKeyPool needs at least one API key')
+        self.model_factory = model_factory or keyed_model
+        # Models are built on first use, so a pool costs nothing until a call needs Gemini
+        self.keys = [KeyState(i, key) for i, key in enumerate(api_keys)]
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.cooldown = cooldown
+        self.max_wait = max_wait
+        self.timeout = timeout
+        # Shared by every pool: the keys differ, the service behind them doesn't
+        self.breaker = breaker or resilience.gemini_breaker
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens):
+        """Reserve quota on the best key. Returns (key, 0) or (None, seconds to wait)."""
+        now = time.monotonic()
+        with self._lock:
+            best, best_ready = None, None
+            for state in self.keys:
+                ready = state.ready_at(now, self.rpm_limit, self.tpm_limit, tokens)
+                load = (ready, len(state.request_times) + state.in_flight, state.window_tokens())
+                if best is None or load < best_ready:
+                    best, best_ready = state, load
+            if best_ready[0] > now:
+                return None, best_ready[0] - now
+            best.request_times.append(now)
+            best.token_usage.append((now, tokens))
+            best.in_flight += 1
+            best.requests += 1
+            return best, 0.0
+
+    def _release(self, state, estimated, response=None, error=None):
+        now = time.monotonic()
+        with self._lock:
+            state.in_flight -= 1
+            if response is not None:
+                used = response_tokens(response) or estimated
+                state.tokens += used
+                # Swap the estimate for the real count
+                state.token_usage.append((now, used - estimated))
+            if error is not None:
+                state.failures += 1
+                if is_quota_error(error):
+                    state.quota_errors += 1
+                    state.cooldown_until = now + self.cooldown
+
+    def _model(self, state, system_instruction):
+        # Models are per (key, system instruction): the instruction is fixed when a model is built
+        model = state.models.get(system_instruction)
+        if model is None:
+            # Built outside the lock (the first one imports the SDK); a racing duplicate is dropped
+            if system_instruction is None:
+                model = self.model_factory(state.api_key)
+            else:
+                model = self.model_factory(state.api_key, system_instruction=system_instruction)
+            with self._lock:
+                model = state.models.setdefault(system_instruction, model)
+        return model
+
+    def warm_up(self, system_instructions=(None,)):
+        """Build the models for every key ahead of the first call (this imports the SDK)."""
+        for state in self.keys:
+            for system_instruction in system_instructions:
+                self._model(state, system_instruction)
+
+    def generate_content(self, prompt, system_instruction=None, **kwargs):
+        # The SDK's own per-request timeout bounds each attempt
+        kwargs.setdefault('request_options', {'timeout': self.timeout})
+        return resilience.call(lambda: self._generate(prompt, system_instruction, **kwargs),
+                               self.breaker, self.timeout)
+
+    async def generate_content_async(self, prompt, system_instruction=None, **kwargs):
+        return await resilience.acall(lambda: self._generate_async(prompt, system_instruction, **kwargs),
+                                      self.breaker, self.timeout)
+
+    def _generate(self, prompt, system_instruction=None, **kwargs):
+        tokens = estimate_tokens(prompt) + (estimate_tokens(system_instruction) if system_instruction else 0)
+        deadline = time.monotonic() + self.max_wait
+        last_error = None
+        for _ in range(len(self.keys) + 1):
+            state, wait = self._reserve(tokens)
+            if state is None:
+                with span('gemini.quota_wait'):
+                    while state is None:
+                        if time.monotonic() + wait > deadline:
+                            raise NoKeyAvailable('All Gemini API keys are over quota') from last_error
+                        time.sleep(wait)
+                        state, wait = self._reserve(tokens)
+            try:
+                with span('gemini.generate', key=state.index):
+                    response = self._model(state, system_instruction).generate_content(prompt, **kwargs)
+            except Exception as e:
+                self._release(state, tokens, error=e)
+                if not is_quota_error(e):
+                    raise
+                last_error = e
+                continue
+            self._release(state, tokens, response=response)
+            return response
+        raise NoKeyAvailable('All Gemini API keys are over quota') from last_error
+
+    async def _generate_async(self, prompt, system_instruction=None, **kwargs):
+        tokens = estimate_tokens(prompt) + (estimate_tokens(system_instruction) if system_instruction else 0)
+        deadline = time.monotonic() + self.max_wait
+        last_error = None
+        for _ in range(len(self.keys) + 1):
+            state, wait = self._reserve(tokens)
+            if state is None:
+                with span('gemini.quota_wait'):
+                    while state is None:
+                        if time.monotonic() + wait > deadline:
+                            raise NoKeyAvailable('All Gemini API keys are over quota') from last_error
+                        await asyncio.sleep(wait)
+                        state, wait = self._reserve(tokens)
+            try:
+                # With stream=True this times the call up to the first chunk
+                with span('gemini.generate', key=state.index, stream=bool(kwargs.get('stream'))):
+                    response = await self._model(state, system_instruction).generate_content_async(prompt, **kwargs)
+            except asyncio.CancelledError:
+                # Deadline passed (or the client went away): hand the key's slot back
+                self._release(state, tokens)
+                raise
+            except Exception as e:
+                self._release(state, tokens, error=e)
+                if not is_quota_error(e):
+                    raise
+                last_error = e
+                continue
+            self._release(state, tokens, response=response)
+            return response
+        raise NoKeyAvailable('All Gemini API keys are over quota') from last_error
+
+    def stats(self):
+        """Per-key counters. Keys are masked to their last four characters."""
+        now = time.monotonic()
+        with self._lock:
+            result = []
+            for state in self.keys:
+                state._trim(now)
+                result.append({
+                    'key': state.masked_key(),
+                    'requests': state.requests,
+                    'failures': state.failures,
+                    'quota_errors': state.quota_errors,
+                    'tokens': state.tokens,
+                    'in_flight': state.in_flight,
+                    'requests_last_minute': len(state.request_times),
+                    'tokens_last_minute': state.window_tokens(),
+                    'cooldown_remaining': round(max(0.0, state.cooldown_until - now), 1),
+                })
+            return result
@@ -0,0 +1,117 @@
+import collections
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+INTENT_CACHE_SIZE = int(os.getenv('INTENT_CACHE_SIZE', '1024'))
+INTENT_CACHE_TTL = float(os.getenv('INTENT_CACHE_TTL', '86400'))
+# Optional SQLite file so cached intents survive restarts (empty = memory only)
+INTENT_CACHE_DB = os.getenv('INTENT_CACHE_DB', '')
+
+_PUNCT_RE = re.compile(r"[^\w\s:/-]")
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_message(message):
+    """Lowercase, drop punctuation that doesn't change meaning, collapse whitespace."""
+    return _SPACE_RE.sub(' ', _PUNCT_RE.sub(' ', message.lower())).strip()
+
+
+class IntentCache:
+    """
+    LRU + TTL cache of parsed intent dicts, keyed on the normalized message, the date it was
+    asked on (relative dates resolve differently each day) and the conversation context.
+    Only the model's intent JSON is stored; replies that depend on calendar state never are.
+    """
+
+    def __init__(self, max_entries=INTENT_CACHE_SIZE, ttl=INTENT_CACHE_TTL, db_path=INTENT_CACHE_DB):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path or None
+        self._entries = collections.OrderedDict()  # key -> (expires_at, json text)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        if self.db_path:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS intent_cache '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)')
+            self._db.execute('DELETE FROM intent_cache WHERE expires_at < ?', (time.time(),))
+            self._db.commit()
+
+    @staticmethod
+    def make_key(message, day, context=''):
+        raw = '\x00'.join([day, normalize_message(message), context])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _store(self, key, expires_at, text):
+        old = self._entries.pop(key, None)
+        if old:
+            self._bytes -= len(key) + len(old[1])
+        self._entries[key] = (expires_at, text)
+        self._bytes += len(key) + len(text)
+        while len(self._entries) > self.max_entries:
+            evicted_key, (_, evicted_text) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted_key) + len(evicted_text)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] < now:
+                self._entries.pop(key)
+                self._bytes -= len(key) + len(entry[1])
+                entry = None
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    'SELECT expires_at, value FROM intent_cache WHERE key = ? AND expires_at >= ?',
+                    (key, now)).fetchone()
+                if row:
+                    entry = (row[0], row[1])
+                    self._store(key, *entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return json.loads(entry[1])
+
+    def put(self, key, value):
+        text = json.dumps(value, separators=(',', ':'))
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, expires_at, text)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO intent_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                    (key, text, expires_at))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute('DELETE FROM intent_cache')
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            result = {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'memory_bytes': self._bytes,
+            }
+        if self.db_path and os.path.exists(self.db_path):
+            result['disk_bytes'] = os.path.getsize(self.db_path)
+        return result
@@ -0,0 +1,163 @@
+"""
+Response schemas for Gemini's JSON mode and strict validators for what comes back.
+Validated dicts always have every field, with dates as YYYY-MM-DD and times as 24h HH:MM.
+"""
+import json
+import re
+import threading
+
+INTENTS = ("book", "check_availability", "ask_slots", "confirm_booking", "find_common_slot",
+           "smalltalk", "unknown")
+
+_NULLABLE_STRING = {'type': 'string', 'nullable': True}
+
+BOOKING_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'summary': _NULLABLE_STRING,
+        'date': _NULLABLE_STRING,
+        'start_time': _NULLABLE_STRING,
+        'end_time': _NULLABLE_STRING,
+    },
+    'required': ['summary', 'date', 'start_time', 'end_time'],
+}
+
+INTENT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'intent': {'type': 'string', 'enum': list(INTENTS)},
+        'summary': _NULLABLE_STRING,
+        'date': _NULLABLE_STRING,
+        'start_time': _NULLABLE_STRING,
+        'end_time': _NULLABLE_STRING,
+        'attendees': {'type': 'array', 'items': {'type': 'string'}},
+        'reply': _NULLABLE_STRING,
+    },
+    'required': ['intent'],
+}
+
+
+def json_config(schema):
+    """generation_config for a JSON-mode call constrained to schema."""
+    return {'response_mime_type': 'application/json', 'response_schema': schema}
+
+
+class InvalidModelOutput(ValueError):
+    pass
+
+
+_DATE_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})$')
+_TIME_RE = re.compile(r'^([01]?\d|2[0-3]):([0-5]\d)$')
+_DAYS_IN_MONTH = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _optional_str(data, key):
+    value = data.get(key)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise InvalidModelOutput(f'{key} must be a string or null')
+    return value.strip() or None
+
+
+def _date(data, key='date'):
+    value = _optional_str(data, key)
+    if value is None:
+        return None
+    match = _DATE_RE.match(value)
+    if not match:
+        raise InvalidModelOutput(f'{key} must be YYYY-MM-DD, got {value!r}')
+    year, month, day = (int(g) for g in match.groups())
+    if not 1 <= month <= 12 or not 1 <= day <= _DAYS_IN_MONTH[month - 1] or \
+            (month == 2 and day == 29 and not (year % 4 == 0 and (year % 100 or year % 400 == 0))):
+        raise InvalidModelOutput(f'{key} is not a real date: {value!r}')
+    return value
+
+
+def _time(data, key):
+    value = _optional_str(data, key)
+    if value is None:
+        return None
+    match = _TIME_RE.match(value)
+    if not match:
+        raise InvalidModelOutput(f'{key} must be 24h HH:MM, got {value!r}')
+    return f'{int(match.group(1)):02d}:{match.group(2)}'
+
+
+def _times(data):
+    start, end = _time(data, 'start_time'), _time(data, 'end_time')
+    if start and end and end <= start:
+        raise InvalidModelOutput('end_time must be after start_time')
+    return start, end
+
+
+def _object(data):
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError as e:
+            raise InvalidModelOutput(f'not valid JSON: {e}')
+    if not isinstance(data, dict):
+        raise InvalidModelOutput('expected a JSON object')
+    return data
+
+
+def validate_booking(data):
+    """Booking fields (summary, date, start_time, end_time) from JSON text or a dict."""
+    data = _object(data)
+    start, end = _times(data)
+    return {'summary': _optional_str(data, 'summary'), 'date': _date(data),
+            'start_time': start, 'end_time': end}
+
+
+def validate_intent(data):
+    """Intent dict (intent, summary, date, start_time, end_time, attendees, reply) from JSON text or a dict."""
+    data = _object(data)
+    intent = data.get('intent')
+    if intent not in INTENTS:
+        raise InvalidModelOutput(f'intent must be one of {", ".join(INTENTS)}, got {intent!r}')
+    attendees = data.get('attendees') or []
+    if not isinstance(attendees, list) or not all(isinstance(a, str) for a in attendees):
+        raise InvalidModelOutput('attendees must be a list of strings')
+    start, end = _times(data)
+    return {'intent': intent, 'summary': _optional_str(data, 'summary'), 'date': _date(data),
+            'start_time': start, 'end_time': end, 'attendees': [a.strip() for a in attendees],
+            'reply': _optional_str(data, 'reply')}
+
+
+def repair_contents(prompt, raw, error):
+    """Follow-up conversation asking the model to fix an answer that failed validation."""
+    return [
+        {'role': 'user', 'parts': [prompt]},
+        {'role': 'model', 'parts': [raw or '(empty)']},
+        {'role': 'user', 'parts': [f'That answer could not be used: {error}. '
+                                   'Reply again with only the corrected JSON object.']},
+    ]
+
+
+class ParseStats:
+    """How often model output validates first time, after the repair retry, or not at all."""
+
+    def __init__(self):
+        self._counts = {}  # template -> [ok, repaired, failed]
+        self._lock = threading.Lock()
+
+    def record(self, template, outcome):
+        with self._lock:
+            counts = self._counts.setdefault(template, [0, 0, 0])
+            counts[('ok', 'repaired', 'failed').index(outcome)] += 1
+
+    def stats(self):
+        with self._lock:
+            result = {}
+            for template, (ok, repaired, failed) in self._counts.items():
+                calls = ok + repaired + failed
+                result[template] = {
+                    'calls': calls,
+                    'ok': ok,
+                    'repaired': repaired,
+                    'failed': failed,
+                    'first_try_failure_rate': round((repaired + failed) / calls, 4),
+                    'failure_rate': round(failed / calls, 4),
+                }
+            return result
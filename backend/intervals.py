@@ -0,0 +1,143 @@
+"""
+Interval engine for free/busy math.
+All times are integer epoch seconds; callers convert datetimes once at the boundary.
+"""
+import bisect
+import heapq
+
+
+def merge_intervals(intervals, buffer_before=0, buffer_after=0):
+    """
+    Sort and merge (start, end) intervals, padding each one by the given buffers.
+    Touching intervals are merged too. Returns a new list.
+    """
+    padded = sorted((s - buffer_before, e + buffer_after) for s, e in intervals if e > s)
+    merged = []
+    for s, e in padded:
+        if merged and s <= merged[-1][1]:
+            if e > merged[-1][1]:
+                merged[-1][1] = e
+        else:
+            merged.append([s, e])
+    return [(s, e) for s, e in merged]
+
+
+def free_gaps(busy, start, end, min_gap=0, buffer_before=0, buffer_after=0, merged=False):
+    """
+    Free gaps in [start, end) not covered by busy, in one linear sweep.
+    Gaps shorter than min_gap are dropped. Pass merged=True if busy is already merge_intervals() output
+    (buffers are then assumed to be applied already).
+    """
+    if not merged:
+        busy = merge_intervals(busy, buffer_before, buffer_after)
+    gaps = []
+    current = start
+    for s, e in busy:
+        if e <= current:
+            continue
+        if s >= end:
+            break
+        if s > current and s - current >= max(min_gap, 1):
+            gaps.append((current, s))
+        current = max(current, e)
+        if current >= end:
+            break
+    if end > current and end - current >= max(min_gap, 1):
+        gaps.append((current, end))
+    return gaps
+
+
+def _align_up(t, align, origin):
+    offset = (t - origin) % align
+    return t if offset == 0 else t + align - offset
+
+
+def free_slots(busy, start, end, duration, align=None, align_origin=None,
+               min_gap=0, buffer_before=0, buffer_after=0):
+    """
+    Back-to-back slots of `duration` seconds inside the free gaps of [start, end).
+    With align set, each gap's first slot starts on the next multiple of align after align_origin
+    (default: start), e.g. align=1800 with a local-midnight origin gives :00/:30 starts.
+    """
+    if duration <= 0:
+        raise ValueError("duration must be positive")
+    gaps = free_gaps(busy, start, end, max(min_gap, duration), buffer_before, buffer_after)
+    return slots_in_gaps(gaps, duration, align, start if align_origin is None else align_origin)
+
+
+def slots_in_gaps(gaps, duration, align=None, align_origin=0):
+    """Back-to-back slots of `duration` seconds inside each sorted (start, end) free gap."""
+    slots = []
+    for gap_start, gap_end in gaps:
+        current = _align_up(gap_start, align, align_origin) if align else gap_start
+        while current + duration <= gap_end:
+            slots.append((current, current + duration))
+            current += duration
+    return slots
+
+
+def conflict_counts(busy_by_attendee, start, end, duration):
+    """
+    How many attendees are busy at some point of a `duration` meeting starting at t, for every
+    t in [start, end - duration]. Returns (t_from, t_to, count) runs covering that range in order.
+    One sweep over all attendees' busy intervals; the count only changes at their edges.
+    """
+    last_start = end - duration
+    if last_start < start:
+        return []
+    edges = []
+    for busy in busy_by_attendee:
+        # A busy (s, e) rules out meeting starts in (s - duration, e). Merging per attendee
+        # first means each attendee adds at most 1 to the count at any t.
+        for s, e in merge_intervals(busy, buffer_before=duration - 1):
+            edges.append((s, 1))
+            edges.append((e, -1))
+    edges.sort()
+    runs = []
+    count = 0
+    current = start
+    for t, delta in edges:
+        if t > current:
+            t_to = min(t, last_start + 1)
+            if t_to > current:
+                runs.append((current, t_to, count))
+            current = max(current, t_to)
+        count += delta
+    if current <= last_start:
+        runs.append((current, last_start + 1, count))
+    return runs
+
+
+def rank_slots(busy_by_attendee, start, end, duration, top_k=5, align=None, align_origin=None,
+               preferred=None, max_conflicts=None):
+    """
+    The top_k meeting slots of `duration` seconds in [start, end) across several attendees.
+    Candidates start every `align` seconds (default: duration) from align_origin and are ranked:
+    inside a `preferred` window first (sorted, non-overlapping (start, end) pairs such as working
+    hours), then fewest busy attendees, then earliest. Candidates with more than max_conflicts busy
+    attendees are skipped without being scored.
+    Returns [(slot_start, slot_end, conflicts, preferred), ...] best first (preferred is always
+    True when no windows are given).
+    """
+    if duration <= 0:
+        raise ValueError("duration must be positive")
+    step = align or duration
+    origin = start if align_origin is None else align_origin
+    preferred = preferred or []
+    preferred_starts = [s for s, _ in preferred]
+
+    def in_preferred(t):
+        i = bisect.bisect_right(preferred_starts, t) - 1
+        return i >= 0 and t + duration <= preferred[i][1]
+
+    def candidates():
+        for run_start, run_end, count in conflict_counts(busy_by_attendee, start, end, duration):
+            if max_conflicts is not None and count > max_conflicts:
+                continue
+            t = _align_up(run_start, step, origin)
+            while t < run_end:
+                yield not in_preferred(t) if preferred else False, count, t
+                t += step
+
+    return [(t, t + duration, count, not outside)
+            for outside, count, t in heapq.nsmallest(top_k, candidates())]
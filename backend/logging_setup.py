@@ -0,0 +1,135 @@
+"""
+Logging setup. Records are handed to a queue on the calling thread and formatted and written
+by a background listener thread, so a slow stdout/stderr pipe never blocks a request.
+Messages use %-style arguments, which are only formatted if the record is actually emitted.
+JsonlWriter does the same for the JSONL files (token ledger, trace spans), so appending to
+them never blocks the event loop on disk.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+# DEBUG adds per-call detail (raw model output, busy lists); WARNING is the quiet production mode
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# "json" (one object per line) or "text"
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+# Records queued beyond this are dropped rather than blocking the caller
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, tagged with the request ID."""
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+    The stock handler formats every record on the caller's thread before queueing it; the
+    listener and the caller share a process here, so the record can be queued as is.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonlWriter:
+    """
+    Appends one JSON object per line to path from a background listener thread. The caller only
+    queues the object; serialization and the write happen on the listener. Objects queued beyond
+    queue_size are dropped (counted in .dropped) rather than blocking the caller.
+    """
+
+    def __init__(self, path, queue_size=LOG_QUEUE_SIZE):
+        self.path = path
+        self._handler = DeferredQueueHandler(queue.Queue(queue_size))
+        output = logging.FileHandler(path, delay=True, encoding='utf-8')
+        output.setFormatter(_JsonLineFormatter())
+        self._listener = logging.handlers.QueueListener(self._handler.queue, output)
+        self._listener.start()
+        atexit.register(self.close)
+
+    @property
+    def dropped(self):
+        return self._handler.dropped
+
+    def write(self, obj):
+        self._handler.enqueue(logging.makeLogRecord({'msg': obj}))
+
+    def flush(self):
+        """Wait until every object queued so far has been written."""
+        self._handler.queue.join()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+class _JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, default=str)
+
+
+_listener = None
+
+
+def configure_logging(level=None, fmt=None, stream=None):
+    """Install the queue handler on the root logger. Safe to call more than once."""
+    from tracing import RequestIdFilter
+    global _listener
+    if _listener is not None:
+        return _listener
+    output = logging.StreamHandler(stream or sys.stderr)
+    if (fmt or LOG_FORMAT) == 'text':
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+    else:
+        output.setFormatter(JsonFormatter())
+
+    handler = DeferredQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    # The request ID lives in a contextvar, so it must be read on the caller's thread
+    handler.addFilter(RequestIdFilter())
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level or LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,11 +1,49 @@
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from agent import chat_with_agent
-from calendar_utils import create_event
-import datetime
+from agent import (chat_with_agent, stream_chat_with_agent, booking_calls, gemini_pool, intent_cache,
+                   parse_stats, token_ledger, warm_up)
+from booking import SlotReservationTimeout, booking_key, event_id
+from googleapiclient.errors import HttpError
+from resilience import CircuitOpen, DeadlineExceeded
+import resilience
+from calendar_utils import create_event, create_events_batch, find_common_slots, get_event, get_free_slots
+from sessions import SessionStore, new_session_id
+from tenants import UnknownTenant, get_tenant, loaded_tenants
+from logging_setup import configure_logging
+from timeutils import UnknownTimezone, parse_iso, to_epoch
+from tracing import TracingMiddleware, render_metrics
+import asyncio
+import contextlib
+import functools
+import json
+import logging
+import os
 
-app = FastAPI()
+configure_logging()
+
+log = logging.getLogger(__name__)
+
+# When the Gemini SDK and the Calendar service are set up: "background" (default) starts serving
+# at once and loads them in a thread, "blocking" finishes loading before the first request,
+# "off" leaves it to the first request that needs them
+STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', 'background')
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    if not gemini_pool:
+        log.warning("No Gemini API keys found (GEMINI_API_KEYS); only locally parsed messages get answers")
+    task = None
+    if STARTUP_WARMUP == "blocking":
+        await asyncio.to_thread(warm_up)
+    elif STARTUP_WARMUP == "background":
+        task = asyncio.create_task(asyncio.to_thread(warm_up))
+    yield
+    if task is not None:
+        await task
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,25 +51,213 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+# Outermost, so request latency includes every other middleware
+app.add_middleware(TracingMiddleware)
+
+@app.exception_handler(SlotReservationTimeout)
+async def slot_reservation_timeout_handler(request, exc):
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+@app.exception_handler(CircuitOpen)
+async def circuit_open_handler(request, exc):
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(int(exc.retry_after + 0.5))})
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request, exc):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.exception_handler(HttpError)
+async def google_error_handler(request, exc):
+    # Still failing after retries: 503 if Google is struggling, 502 for anything else it refused
+    status = 503 if resilience.is_transient(exc) else 502
+    return JSONResponse(status_code=status, content={"detail": f"Google Calendar returned {exc.resp.status}"})
+
+def resolve_tenant(x_tenant_id: str = Header(None), x_timezone: str = Header(None)):
+    """
+    Tenant from the X-Tenant-ID header; requests without one use the default tenant.
+    X-Timezone (an IANA name like "Europe/Berlin") sets the user's zone for dates, times and
+    replies; without it the tenant's calendar timezone is used.
+    """
+    try:
+        return get_tenant(x_tenant_id).with_timezone(x_timezone)
+    except UnknownTenant:
+        raise HTTPException(status_code=404, detail=f"Unknown tenant: {x_tenant_id}")
+    except UnknownTimezone:
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {x_timezone}")
+
+# Conversation state lives here, so clients only send the new message
+sessions = SessionStore()
 
 class ChatRequest(BaseModel):
     message: str
+    session_id: str = None  # omitted on the first turn; the response carries a new one
+    history: list[dict] = None  # for clients that still send the transcript; bypasses the session store
 
 class BookingRequest(BaseModel):
     summary: str
-    start_time: str  # ISO format
+    start_time: str  # ISO format; without an offset, in the X-Timezone / calendar timezone
     end_time: str    # ISO format
     description: str = None
+    session_id: str = None  # without an Idempotency-Key, repeats are only deduplicated within a session
+
+class BatchBookingRequest(BaseModel):
+    events: list[BookingRequest]
+
+class FreeSlotsRequest(BaseModel):
+    start_time: str  # ISO format; without an offset, in the X-Timezone / calendar timezone
+    end_time: str    # ISO format
+    duration_minutes: int = None  # default: the availability profile's slot length
+    align_minutes: int = None
+
+class CommonSlotsRequest(BaseModel):
+    attendees: list[str]  # calendar IDs / emails
+    start_time: str  # ISO format; without an offset, in the X-Timezone / calendar timezone
+    end_time: str    # ISO format
+    duration_minutes: int = 30
+    top_k: int = 5
+    max_conflicts: int = None
+
+def load_session(req, tenant):
+    session_id = req.session_id or new_session_id()
+    # Session IDs are client-chosen, so they are scoped to the tenant
+    key = f"{tenant.tenant_id}:{session_id}"
+    if req.history is not None:
+        return session_id, key, req.history, ""
+    history, summary = sessions.get(key)
+    return session_id, key, history, summary
 
 @app.post("/chat")
-def chat_endpoint(req: ChatRequest):
-    response = chat_with_agent(req.message)
-    return {"response": response}
+async def chat_endpoint(req: ChatRequest, tenant=Depends(resolve_tenant)):
+    session_id, key, history, summary = load_session(req, tenant)
+    response = await chat_with_agent(req.message, history, tenant=tenant, summary=summary, session=key)
+    sessions.append(key, req.message, response)
+    return {"response": response, "session_id": session_id}
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest, tenant=Depends(resolve_tenant)):
+    """
+    Server-sent events: one `data: {"type": ..., "text": ...}` line per delta/status/reply,
+    then a done event carrying the session_id.
+    """
+    session_id, key, history, summary = load_session(req, tenant)
+
+    async def events():
+        reply = ""
+        async for kind, text in stream_chat_with_agent(req.message, history, tenant=tenant, summary=summary,
+                                                       session=key):
+            if kind == "delta":
+                reply += text
+            elif kind == "reply":
+                reply = text
+            yield f"data: {json.dumps({'type': kind, 'text': text})}\n\n"
+        sessions.append(key, req.message, reply)
+        yield f"data: {json.dumps({'type': 'done', 'session_id': session_id})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.post("/book")
-def book_endpoint(req: BookingRequest):
-    start = datetime.datetime.fromisoformat(req.start_time)
-    end = datetime.datetime.fromisoformat(req.end_time)
-    event = create_event(req.summary, start, end, req.description)
-    return {"event": event} 
\ No newline at end of file
+async def book_endpoint(req: BookingRequest, tenant=Depends(resolve_tenant),
+                        idempotency_key: str = Header(None)):
+    """
+    Create an event. Retrying with the same Idempotency-Key header (or, without one, sending the
+    same summary and times again with the same session_id) returns the first event instead of
+    inserting another, unless that event has been deleted since. Without either, every request
+    inserts.
+    """
+    start = parse_iso(req.start_time)
+    end = parse_iso(req.end_time)
+    calendar = tenant.calendar
+    book = functools.partial(calendar.run, create_event, req.summary, start, end, req.description,
+                             calendar=calendar, tz=tenant.tz)
+    if idempotency_key:
+        key = booking_key(tenant.tenant_id, "key", idempotency_key)
+    elif req.session_id:
+        key = booking_key(tenant.tenant_id, calendar.calendar_id, req.session_id, req.summary,
+                          to_epoch(start, tenant.tz), to_epoch(end, tenant.tz))
+    else:
+        return {"event": await book()}
+
+    async def still_booked(event):
+        return await calendar.run(get_event, event["id"], calendar=calendar) is not None
+
+    event = await booking_calls.run(key, functools.partial(book, event_id=event_id(key)), verify=still_booked)
+    return {"event": event}
+
+@app.post("/book/batch")
+async def book_batch_endpoint(req: BatchBookingRequest, tenant=Depends(resolve_tenant)):
+    # Times stay ISO strings here so a bad one fails only its own item
+    items = [ev.model_dump() for ev in req.events]
+    results = await tenant.calendar.run(create_events_batch, items, calendar=tenant.calendar,
+                                        tz=tenant.tz)
+    created = sum(1 for r in results if r["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+@app.post("/slots/free")
+async def free_slots_endpoint(req: FreeSlotsRequest, tenant=Depends(resolve_tenant)):
+    """Free slots within the tenant's availability profile; ranges of months are fine."""
+    profile = tenant.availability
+    slots = await tenant.calendar.run(
+        get_free_slots, parse_iso(req.start_time), parse_iso(req.end_time),
+        req.duration_minutes or profile.slot_minutes, req.align_minutes,
+        calendar=tenant.calendar, tz=tenant.tz, profile=profile)
+    return {"slots": [{"start": s.isoformat(), "end": e.isoformat()} for s, e in slots]}
+
+@app.post("/slots/common")
+async def common_slots_endpoint(req: CommonSlotsRequest, tenant=Depends(resolve_tenant)):
+    slots = await tenant.calendar.run(
+        find_common_slots, req.attendees,
+        parse_iso(req.start_time), parse_iso(req.end_time), req.duration_minutes, top_k=req.top_k,
+        max_conflicts=req.max_conflicts, calendar=tenant.calendar, tz=tenant.tz, profile=tenant.availability)
+    return {"slots": [dict(slot, start=slot["start"].isoformat(), end=slot["end"].isoformat()) for slot in slots]}
+
+@app.get("/health")
+def health_endpoint():
+    """
+    Circuit breaker state per dependency (Gemini, and each tenant's calendars seen so far);
+    "degraded" while any of them is not closed.
+    """
+    breakers = {"gemini": resilience.gemini_breaker.stats()}
+    for tenant in loaded_tenants():
+        breakers[f"calendar:{tenant.tenant_id}"] = tenant.calendar.breaker.stats()
+    degraded = any(b["state"] != "closed" for b in breakers.values())
+    return {"status": "degraded" if degraded else "ok", "dependencies": breakers}
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text format: request latency per path/intent and span latency per dependency."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/gemini/keys")
+def gemini_keys_endpoint(tenant=Depends(resolve_tenant)):
+    pool = tenant.gemini_pool or gemini_pool
+    return {"keys": pool.stats() if pool else []}
+
+
+@app.get("/gemini/tokens")
+def gemini_tokens_endpoint():
+    return {"usage": token_ledger.stats()}
+
+@app.get("/gemini/parse")
+def gemini_parse_endpoint():
+    return parse_stats.stats()
+
+@app.get("/sessions")
+def sessions_endpoint():
+    return sessions.stats()
+
+@app.delete("/sessions/{session_id}")
+def clear_session_endpoint(session_id: str, tenant=Depends(resolve_tenant)):
+    sessions.clear(f"{tenant.tenant_id}:{session_id}")
+    return {"cleared": session_id}
+
+@app.get("/bookings/idempotency")
+def booking_idempotency_endpoint():
+    return booking_calls.stats()
+
+@app.get("/cache/intents")
+def intent_cache_endpoint():
+    return intent_cache.stats()
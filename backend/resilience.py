@@ -0,0 +1,242 @@
+"""
+Timeouts, retries and circuit breakers for calls to Google (Gemini and Calendar).
+
+- Errors are sorted into rate limits (429 / RESOURCE_EXHAUSTED / Calendar's 403 rateLimitExceeded),
+  transient failures (5xx, timeouts, dropped connections) and everything else, from exception
+  types and status codes rather than message text. Only the first two are retried.
+- Retries wait a jittered exponential backoff ("full jitter": uniform in [0, base * 2**n], capped)
+  and never past the call's deadline, so a degraded upstream costs a bounded amount of time.
+- One CircuitBreaker per dependency (Gemini, and each tenant's calendar): after BREAKER_FAILURES failures in a row, calls fail fast
+  with CircuitOpen for BREAKER_RESET_TIMEOUT seconds, then a single trial call decides whether to
+  close it again. Callers catch CircuitOpen to degrade (stale cached availability, the local
+  parser) instead of waiting on Google.
+"""
+import asyncio
+import os
+import random
+import socket
+import threading
+import time
+from googleapiclient.errors import HttpError
+
+# Whole-call budgets (seconds), retries included
+GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT', '20'))
+CALENDAR_TIMEOUT = float(os.getenv('CALENDAR_TIMEOUT', '15'))
+# Attempts per call, and the backoff between them
+RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', '3'))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '0.2'))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '2'))
+# Consecutive failures that open a breaker, and how long it stays open
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', '5'))
+BREAKER_RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', '30'))
+
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+_RATE_LIMIT_REASONS = (b'rateLimitExceeded', b'userRateLimitExceeded')
+
+_random = random.Random()
+
+
+class CircuitOpen(RuntimeError):
+    """A dependency's breaker is open; the call was not attempted."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'{name} is unavailable, retry in {retry_after:.0f}s')
+        self.name = name
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def status_code(e):
+    """HTTP status of a Google API error (googleapiclient or google.api_core), else None."""
+    if isinstance(e, HttpError):
+        return e.resp.status
+    code = getattr(e, 'code', None)
+    return code if isinstance(code, int) else None
+
+
+def is_rate_limited(e):
+    status = status_code(e)
+    if status == 429:
+        return True
+    if status == 403 and isinstance(e, HttpError):
+        # Calendar reports per-user rate limits as 403 with a reason
+        return any(reason in (e.content or b'') for reason in _RATE_LIMIT_REASONS)
+    return type(e).__name__ in ('ResourceExhausted', 'TooManyRequests')
+
+
+def is_transient(e):
+    """Worth retrying: rate limits, 5xx, timeouts and connection failures."""
+    if is_rate_limited(e):
+        return True
+    if isinstance(e, (TimeoutError, socket.timeout, ConnectionError, asyncio.TimeoutError)):
+        return True
+    status = status_code(e)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(e).__name__ in ('ServiceUnavailable', 'InternalServerError', 'DeadlineExceeded',
+                                'GatewayTimeout', 'BadGateway')
+
+
+def backoff(attempt):
+    """Seconds to wait before retry number attempt (0-based), with full jitter."""
+    return _random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Closed -> open after `failures` consecutive failures -> half-open after reset_timeout."""
+
+    def __init__(self, name, failures=BREAKER_FAILURES, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failures
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self.opened = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Raise CircuitOpen unless a call may go ahead now. Returns True if the call is the
+        half-open trial, which must then report success(), failure() or abandon().
+        """
+        with self._lock:
+            if self.state == 'closed':
+                return False
+            wait = self._opened_at + self.reset_timeout - time.monotonic()
+            if wait <= 0 and not self._trial:
+                # Half-open: exactly one trial call; the rest keep failing fast until it reports
+                self.state = 'half_open'
+                self._trial = True
+                return True
+            self.rejected += 1
+            raise CircuitOpen(self.name, max(wait, 1.0))
+
+    def is_open(self):
+        return self.state != 'closed'
+
+    def success(self):
+        with self._lock:
+            if self.state == 'open':
+                # A straggler that started before the breaker opened; only the trial call closes it
+                return
+            self.state = 'closed'
+            self._failures = 0
+            self._trial = False
+
+    def abandon(self):
+        """
+        The trial call ended without an answer (cancelled, e.g. the client went away): give the
+        trial to the next call instead of leaving the breaker half-open for good.
+        """
+        with self._lock:
+            if self._trial:
+                self.state = 'open'
+                self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                if self.state == 'closed':
+                    self.opened += 1
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+    def stats(self):
+        return {'state': self.state, 'consecutive_failures': self._failures,
+                'times_opened': self.opened, 'rejected': self.rejected}
+
+
+gemini_breaker = CircuitBreaker('gemini')
+
+
+def _settle(breaker, e):
+    # A 4xx other than a rate limit is still an answer: the dependency is up
+    if is_transient(e):
+        breaker.failure()
+    else:
+        breaker.success()
+
+
+def call(fn, breaker, timeout, attempts=None, retry=is_transient):
+    """
+    fn() through breaker, up to attempts (default RETRY_ATTEMPTS) times with backoff on errors
+    retry(e) accepts, within timeout seconds in total. fn should bound its own attempts (e.g. a
+    socket timeout).
+    """
+    attempts = attempts or RETRY_ATTEMPTS
+    deadline = time.monotonic() + timeout
+    for attempt in range(attempts):
+        trial = breaker.allow()
+        try:
+            result = fn()
+        except Exception as e:
+            _settle(breaker, e)
+            delay = backoff(attempt)
+            if attempt + 1 >= attempts or not retry(e) or time.monotonic() + delay >= deadline:
+                raise
+            time.sleep(delay)
+            continue
+        except BaseException:
+            if trial:
+                breaker.abandon()
+            raise
+        breaker.success()
+        return result
+
+
+async def with_deadline(awaitable, timeout, what):
+    """
+    await awaitable, cancelling it and raising DeadlineExceeded after timeout seconds. Unlike
+    asyncio.wait_for, a TimeoutError raised by the awaitable itself passes through unchanged.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=max(timeout, 0))
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if not done:
+        task.cancel()
+        raise DeadlineExceeded(f'{what} took over {timeout:.1f}s')
+    return task.result()
+
+
+async def acall(fn, breaker, timeout, attempts=None, retry=is_transient):
+    """call() for coroutine functions; each attempt is cancelled when the deadline passes."""
+    attempts = attempts or RETRY_ATTEMPTS
+    deadline = time.monotonic() + timeout
+    for attempt in range(attempts):
+        trial = breaker.allow()
+        try:
+            result = await with_deadline(fn(), deadline - time.monotonic(), f'{breaker.name} call')
+        except Exception as e:
+            _settle(breaker, e)
+            delay = backoff(attempt)
+            if attempt + 1 >= attempts or not retry(e) or time.monotonic() + delay >= deadline:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # Cancelled (or interrupted) mid-call: no verdict on the dependency
+            if trial:
+                breaker.abandon()
+            raise
+        breaker.success()
+        return result
+
+
+def execute(request, breaker, retry=True):
+    """
+    A Calendar API request's .execute() through call() with the calendar's breaker and
+    CALENDAR_TIMEOUT. Pass retry=False for requests that are not safe to repeat (inserts
+    without a client-chosen event ID).
+    """
+    return call(request.execute, breaker, CALENDAR_TIMEOUT, attempts=None if retry else 1)
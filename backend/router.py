@@ -0,0 +1,59 @@
+"""
+Tenant router: forwards each request to the worker that owns its X-Tenant-ID, chosen by
+consistent hashing, so a tenant's credentials, event store and caches stay warm on one worker.
+
+Run with WORKER_URLS set to the workers' base URLs:
+    WORKER_URLS=http://10.0.0.1:8000,http://10.0.0.2:8000 uvicorn router:app --port 8080
+"""
+import os
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
+from sharding import HashRing
+from tenants import DEFAULT_TENANT_ID
+
+WORKER_URLS = [u.strip().rstrip('/') for u in os.getenv('WORKER_URLS', '').split(',') if u.strip()]
+ROUTER_TIMEOUT = float(os.getenv('ROUTER_TIMEOUT', '60'))
+
+# Hop-by-hop headers are not forwarded
+_SKIP_HEADERS = {'host', 'content-length', 'connection', 'keep-alive', 'transfer-encoding'}
+
+app = FastAPI()
+ring = HashRing(WORKER_URLS)
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=ROUTER_TIMEOUT)
+    return _client
+
+
+def worker_for(tenant_id):
+    return ring.get(tenant_id or DEFAULT_TENANT_ID)
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+async def proxy(path: str, request: Request):
+    worker = worker_for(request.headers.get('x-tenant-id'))
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in _SKIP_HEADERS}
+    upstream = get_client().build_request(
+        request.method, f"{worker}/{path}", params=request.query_params,
+        headers=headers, content=await request.body())
+    response = await get_client().send(upstream, stream=True)
+    response_headers = {k: v for k, v in response.headers.items() if k.lower() not in _SKIP_HEADERS}
+
+    # Streamed through chunk by chunk so /chat/stream events reach the client as they arrive
+    async def body():
+        try:
+            async for chunk in response.aiter_raw():
+                yield chunk
+        finally:
+            await response.aclose()
+
+    if response.headers.get('content-type', '').startswith('text/event-stream'):
+        return StreamingResponse(body(), status_code=response.status_code, headers=response_headers)
+    # Raw bytes, so any content-encoding header forwarded above still matches
+    content = b"".join([chunk async for chunk in body()])
+    return Response(content, status_code=response.status_code, headers=response_headers)
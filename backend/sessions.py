@@ -0,0 +1,162 @@
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# Turns kept verbatim per session (chat_with_agent only reads the last 6 messages)
+SESSION_HISTORY_TURNS = int(os.getenv('SESSION_HISTORY_TURNS', '6'))
+# Characters of older conversation kept as a rolling summary
+SESSION_SUMMARY_CHARS = int(os.getenv('SESSION_SUMMARY_CHARS', '600'))
+SESSION_TTL = float(os.getenv('SESSION_TTL', '3600'))
+SESSION_MAX_SESSIONS = int(os.getenv('SESSION_MAX_SESSIONS', '10000'))
+SESSION_MAX_BYTES = int(os.getenv('SESSION_MAX_BYTES', str(32 * 1024 * 1024)))
+# Optional SQLite file that sessions evicted for space spill to (empty = memory only)
+SESSION_DB = os.getenv('SESSION_DB', '')
+
+# Longest piece of one message carried into the summary
+_SUMMARY_SNIPPET = 120
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+class Session:
+    __slots__ = ('history', 'summary', 'last_used')
+
+    def __init__(self, history=None, summary='', last_used=None):
+        self.history = history or []
+        self.summary = summary
+        self.last_used = last_used or time.time()
+
+    def size(self):
+        return len(self.summary) + sum(len(m['content']) + len(m['role']) for m in self.history)
+
+    def to_json(self):
+        return json.dumps({'history': self.history, 'summary': self.summary}, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text, last_used):
+        data = json.loads(text)
+        return cls(data['history'], data['summary'], last_used)
+
+
+class SessionStore:
+    """
+    Conversation state per session ID, so clients send only the new message each turn.
+    Each session keeps the last `turns` messages verbatim and folds older ones into a short
+    rolling summary, so its size is bounded. Sessions idle longer than ttl are dropped. Past
+    max_sessions or max_bytes the least recently used are evicted (to SQLite when db_path is set).
+    """
+
+    def __init__(self, turns=SESSION_HISTORY_TURNS, summary_chars=SESSION_SUMMARY_CHARS,
+                 ttl=SESSION_TTL, max_sessions=SESSION_MAX_SESSIONS, max_bytes=SESSION_MAX_BYTES,
+                 db_path=SESSION_DB):
+        self.turns = turns
+        self.summary_chars = summary_chars
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.db_path = db_path or None
+        self._sessions = collections.OrderedDict()  # session id -> Session, least recent first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self._db = None
+        if self.db_path:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS sessions '
+                '(id TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)')
+            self._db.execute('DELETE FROM sessions WHERE last_used < ?', (time.time() - self.ttl,))
+            self._db.commit()
+
+    def _load(self, session_id, now):
+        session = self._sessions.get(session_id)
+        if session is not None and now - session.last_used > self.ttl:
+            self._drop(session_id)
+            session = None
+        if session is None and self._db is not None:
+            row = self._db.execute('SELECT value, last_used FROM sessions WHERE id = ?',
+                                   (session_id,)).fetchone()
+            if row:
+                self._db.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+                self._db.commit()
+                if now - row[1] <= self.ttl:
+                    session = Session.from_json(row[0], row[1])
+                    self._sessions[session_id] = session
+                    self._bytes += session.size()
+        return session
+
+    def _drop(self, session_id):
+        session = self._sessions.pop(session_id)
+        self._bytes -= session.size()
+
+    def _evict(self, now):
+        # Idle sessions first (oldest at the front), then least recently used while over limits
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            expired = now - session.last_used > self.ttl
+            if not expired and len(self._sessions) <= self.max_sessions and self._bytes <= self.max_bytes:
+                break
+            self._drop(session_id)
+            self.evicted += 1
+            if not expired and self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO sessions (id, value, last_used) VALUES (?, ?, ?)',
+                                 (session_id, session.to_json(), session.last_used))
+                self._db.commit()
+
+    def get(self, session_id):
+        """(history, summary) for the session; an unknown or expired session is empty."""
+        with self._lock:
+            session = self._load(session_id, time.time())
+            if session is None:
+                return [], ''
+            return list(session.history), session.summary
+
+    def append(self, session_id, user_message, reply):
+        """Record one user/bot exchange, folding messages past the window into the summary."""
+        now = time.time()
+        with self._lock:
+            session = self._load(session_id, now)
+            if session is None:
+                session = Session()
+                self._sessions[session_id] = session
+            self._bytes -= session.size()
+            session.history.append({'role': 'user', 'content': user_message})
+            session.history.append({'role': 'assistant', 'content': reply})
+            overflow = session.history[:-self.turns] if self.turns else session.history
+            if overflow:
+                del session.history[:len(overflow)]
+                folded = ' '.join(f"{'User' if m['role'] == 'user' else 'Bot'}: {m['content'][:_SUMMARY_SNIPPET]}"
+                                  for m in overflow)
+                # Keep the most recent part; the start of a long conversation matters least
+                session.summary = f"{session.summary} {folded}".strip()[-self.summary_chars:]
+            session.last_used = now
+            self._bytes += session.size()
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+
+    def clear(self, session_id):
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+            if self._db is not None:
+                self._db.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            self._evict(time.time())
+            result = {
+                'sessions': len(self._sessions),
+                'memory_bytes': self._bytes,
+                'evicted': self.evicted,
+            }
+        if self._db is not None:
+            with self._lock:
+                result['spilled'] = self._db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        return result
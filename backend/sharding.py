@@ -0,0 +1,40 @@
+import bisect
+import hashlib
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Consistent-hash ring of worker nodes. Each node gets `replicas` virtual points so keys
+    spread evenly, and adding or removing a node only moves the keys that node owned.
+    """
+
+    def __init__(self, nodes=(), replicas=100):
+        self.replicas = replicas
+        self._points = []  # sorted hashes
+        self._owners = {}  # hash -> node
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for i in range(self.replicas):
+            point = _hash(f'{node}#{i}')
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+            self._owners[point] = node
+
+    def remove(self, node):
+        for i in range(self.replicas):
+            point = _hash(f'{node}#{i}')
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.pop(bisect.bisect_left(self._points, point))
+
+    def get(self, key):
+        if not self._points:
+            raise LookupError('hash ring is empty')
+        i = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[i]]
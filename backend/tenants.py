@@ -0,0 +1,132 @@
+"""
+Tenant registry. Each tenant has its own calendars, credentials, timezone and cached
+calendar state (CalendarContext), and optionally its own Gemini API keys.
+
+Tenants are read from the JSON file named by TENANTS_FILE:
+
+    {
+      "acme": {
+        "calendar_ids": ["team@acme.example", "rooms@acme.example"],
+        "timezone": "America/New_York",
+        "service_account_file": "/secrets/acme.json",
+        "gemini_api_keys": ["..."],
+        "max_concurrency": 8,
+        "availability": {"working_hours": {"mon": [["09:00", "17:00"]], ...}}
+      }
+    }
+
+The "default" tenant always exists and uses the single-tenant settings
+(GOOGLE_CALENDAR_ID, service_account.json / GOOGLE_SERVICE_ACCOUNT_JSON).
+Tenants without an "availability" profile (see availability.py) use availability.default_profile().
+"""
+import json
+import os
+import threading
+from availability import AvailabilityProfile, default_profile
+from calendar_utils import CalendarContext, DEFAULT_TIMEZONE, default_calendar
+import timeutils
+
+TENANTS_FILE = os.getenv('TENANTS_FILE', '')
+DEFAULT_TENANT_ID = 'default'
+
+
+class UnknownTenant(KeyError):
+    pass
+
+
+class Tenant:
+    def __init__(self, tenant_id, calendar, gemini_pool=None, timezone=None, availability=None):
+        self.tenant_id = tenant_id
+        self.calendar = calendar
+        # None means the shared, process-wide key pool
+        self.gemini_pool = gemini_pool
+        # When the user can be booked (working hours, holidays, recurring blocks)
+        self.availability = availability or default_profile()
+        # Zone that dates and times from (and to) the user are in; the calendar's unless overridden
+        self.timezone = timezone or calendar.timezone
+        self.tz = timeutils.get_tz(self.timezone)
+
+    def with_timezone(self, timezone):
+        """
+        This tenant for a user in another timezone (same calendars and keys).
+        Raises timeutils.UnknownTimezone for names zoneinfo doesn't know.
+        """
+        if not timezone or timezone == self.timezone:
+            return self
+        return Tenant(self.tenant_id, self.calendar, self.gemini_pool, timezone, self.availability)
+
+    def now(self):
+        """Current wall-clock time in the user's timezone (naive, like datetime.now())."""
+        return timeutils.now(self.tz)
+
+
+def _service_account_loader(conf):
+    if 'service_account_json' in conf:
+        info = conf['service_account_json']
+        return lambda: json.loads(info) if isinstance(info, str) else info
+    if 'service_account_file' in conf:
+        path = conf['service_account_file']
+
+        def load():
+            with open(path) as f:
+                return json.load(f)
+        return load
+    raise ValueError('tenant config needs service_account_file or service_account_json')
+
+
+def _build_tenant(tenant_id, conf):
+    calendar = CalendarContext(
+        calendar_ids=conf['calendar_ids'],
+        timezone=conf.get('timezone', DEFAULT_TIMEZONE),
+        service_account_loader=_service_account_loader(conf),
+        cache_ttl=conf.get('cache_ttl'),
+        max_concurrency=conf.get('max_concurrency'),
+    )
+    pool = None
+    if conf.get('gemini_api_keys'):
+        from gemini_pool import GeminiKeyPool
+        pool = GeminiKeyPool(conf['gemini_api_keys'])
+    availability = None
+    if conf.get('availability'):
+        availability = AvailabilityProfile.from_config(conf['availability'])
+    return Tenant(tenant_id, calendar, pool, availability=availability)
+
+
+_configs = None
+_tenants = {}
+_lock = threading.Lock()
+
+
+def tenant_configs():
+    global _configs
+    if _configs is None:
+        configs = {}
+        if TENANTS_FILE:
+            with open(TENANTS_FILE) as f:
+                configs = json.load(f)
+        _configs = configs
+    return _configs
+
+
+def loaded_tenants():
+    """Tenants built so far (get_tenant builds them on first use)."""
+    return list(_tenants.values())
+
+
+def get_tenant(tenant_id=None):
+    """The Tenant for tenant_id (default tenant if None). Raises UnknownTenant."""
+    tenant_id = tenant_id or DEFAULT_TENANT_ID
+    tenant = _tenants.get(tenant_id)
+    if tenant is not None:
+        return tenant
+    with _lock:
+        tenant = _tenants.get(tenant_id)
+        if tenant is None:
+            if tenant_id == DEFAULT_TENANT_ID and tenant_id not in tenant_configs():
+                tenant = Tenant(DEFAULT_TENANT_ID, default_calendar())
+            elif tenant_id in tenant_configs():
+                tenant = _build_tenant(tenant_id, tenant_configs()[tenant_id])
+            else:
+                raise UnknownTenant(tenant_id)
+            _tenants[tenant_id] = tenant
+    return tenant
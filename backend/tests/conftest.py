@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('GEMINI_API_KEYS', 'test-key')
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+os.environ.setdefault('STARTUP_WARMUP', 'off')
+
+import pytest
+
+
+@pytest.fixture
+def services():
+    """The default tenant on fresh fakes.py Gemini and Calendar stand-ins."""
+    import agent
+    import fakes
+    from tenants import get_tenant
+    tenant = get_tenant()
+    llm = fakes.FakeGemini()
+    calendar = fakes.FakeCalendarService(tz=tenant.tz)
+    fakes.install(llm, calendar, tenant)
+    agent.intent_cache.clear()
+    agent.booking_calls = type(agent.booking_calls)()
+    return tenant, llm, calendar
@@ -0,0 +1,92 @@
+import asyncio
+import datetime
+import threading
+
+import pytest
+
+import agent
+import booking
+import timeutils
+from calendar_utils import create_events_batch
+
+
+def book_intent(tenant, summary='Standup', hour=15):
+    day = (tenant.now().date() + datetime.timedelta(days=1)).isoformat()
+    return {'intent': 'book', 'summary': summary, 'date': day, 'start_time': f'{hour}:00',
+            'end_time': f'{hour}:30', 'attendees': []}
+
+
+def book(tenant, session):
+    return asyncio.run(agent.reply_for_intent(book_intent(tenant), tenant=tenant, session=session))
+
+
+def test_same_booking_in_one_session_inserts_once(services):
+    tenant, _, calendar = services
+    assert book(tenant, 'a').startswith('✅')
+    assert book(tenant, 'a').startswith('✅')
+    assert calendar.calls['events.insert'] == 1
+    assert agent.booking_calls.replayed == 1
+
+
+def test_same_booking_from_another_session_is_a_conflict(services):
+    tenant, _, calendar = services
+    assert book(tenant, 'a').startswith('✅')
+    assert book(tenant, 'b').startswith('❌')
+    assert calendar.calls['events.insert'] == 1
+
+
+def test_replay_of_a_deleted_event_books_again(services):
+    tenant, _, calendar = services
+    book(tenant, 'a')
+    (start, _), = calendar.busy(0, 2 ** 40)
+    calendar.cancel(next(iter(calendar._events)))
+    assert book(tenant, 'a').startswith('✅')
+    assert calendar.busy(0, 2 ** 40) == [(start, start + 1800)]
+    assert agent.booking_calls.stale == 1
+
+
+def test_batch_waits_for_slot_reservations(services, monkeypatch):
+    tenant, _, calendar = services
+    ctx = tenant.calendar
+    monkeypatch.setattr(ctx.reservations, 'timeout', 0.1)
+    day = tenant.now().date() + datetime.timedelta(days=1)
+    start = timeutils.local_epoch(day, tenant.tz, 15)
+    item = {'summary': 'Standup', 'start_time': f'{day}T15:00:00', 'end_time': f'{day}T15:30:00'}
+
+    held, release = threading.Event(), threading.Event()
+
+    def single_booking():
+        with ctx.reservations.hold(start, start + 1800):
+            held.set()
+            release.wait()
+    thread = threading.Thread(target=single_booking)
+    thread.start()
+    held.wait()
+    try:
+        with pytest.raises(booking.SlotReservationTimeout):
+            create_events_batch([item], calendar=ctx)
+    finally:
+        release.set()
+        thread.join()
+    assert calendar.calls['events.insert'] == 0
+    assert create_events_batch([item], calendar=ctx)[0]['status'] == 'created'
+
+
+def test_book_endpoint_deduplicates_per_key_or_session(services):
+    import httpx
+    from main import app
+    tenant, _, calendar = services
+    day = tenant.now().date() + datetime.timedelta(days=1)
+    body = {'summary': 'Standup', 'start_time': f'{day}T15:00:00', 'end_time': f'{day}T15:30:00'}
+
+    async def post(json, headers=None):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://calpal') as client:
+            resp = await client.post('/book', json=json, headers=headers)
+            return resp.json()['event']['id']
+
+    first = asyncio.run(post(dict(body, session_id='s1')))
+    assert asyncio.run(post(dict(body, session_id='s1'))) == first
+    assert asyncio.run(post(body, {'Idempotency-Key': 'k1'})) != first
+    assert asyncio.run(post(body, {'Idempotency-Key': 'k1'})) == asyncio.run(post(body, {'Idempotency-Key': 'k1'}))
+    assert calendar.calls['events.insert'] == 2
@@ -0,0 +1,22 @@
+import asyncio
+import datetime
+
+import agent
+from availability import AvailabilityProfile
+
+
+def test_chat_common_slot_uses_the_tenant_profile(services, monkeypatch):
+    tenant, _, calendar = services
+    profile = AvailabilityProfile({'mon': [['10:00', '12:00']], 'tue': [['10:00', '12:00']],
+                                   'wed': [['10:00', '12:00']], 'thu': [['10:00', '12:00']],
+                                   'fri': [['10:00', '12:00']]}, slot_minutes=30)
+    monkeypatch.setattr(tenant, 'availability', profile)
+    day = tenant.now().date() + datetime.timedelta(days=1)
+    while day.weekday() > 4:
+        day += datetime.timedelta(days=1)
+    parsed = {'intent': 'find_common_slot', 'summary': None, 'date': day.isoformat(), 'start_time': None,
+              'end_time': None, 'attendees': ['a@example.com']}
+    reply = asyncio.run(agent.reply_for_intent(parsed, tenant=tenant))
+    assert reply.splitlines()[1:] == ['- ' + f"{day:%a %d %b}, 10:00 AM to 10:30 AM",
+                                      '- ' + f"{day:%a %d %b}, 10:30 AM to 11:00 AM",
+                                      '- ' + f"{day:%a %d %b}, 11:00 AM to 11:30 AM"]
@@ -0,0 +1,34 @@
+import datetime
+
+import fakes
+import timeutils
+from event_store import LIST_FIELDS, EventStore
+
+
+def test_store_lists_busy_fields_only_and_skips_free_events(monkeypatch):
+    tz = timeutils.get_tz('UTC')
+    events = fakes.synthetic_events(datetime.date(2030, 1, 7), 1, tz, per_day=2)
+    events[1]['transparency'] = 'transparent'
+    service = fakes.FakeCalendarService(events, tz=tz)
+    seen = []
+    list_events = fakes._FakeEvents.list
+
+    def listing(self, calendarId, **kwargs):
+        seen.append(kwargs.get('fields'))
+        return list_events(self, calendarId, **kwargs)
+    monkeypatch.setattr(fakes._FakeEvents, 'list', listing)
+
+    store = EventStore('primary', lambda: service, tz=tz)
+    day = timeutils.local_epoch(datetime.date(2030, 1, 7), tz)
+    assert store.busy_intervals(day, day + 86400) == service.busy(day, day + 86400)
+    assert len(store.busy_intervals(day, day + 86400)) == 1
+    assert seen == [LIST_FIELDS]
+
+
+def test_all_day_events_use_the_calendars_timezone():
+    from calendar_utils import CalendarContext
+    ctx = CalendarContext(timezone='America/New_York')
+    ctx.set_service(fakes.FakeCalendarService([{'id': 'holiday', 'status': 'confirmed',
+                                                'start': {'date': '2030-01-07'}, 'end': {'date': '2030-01-08'}}]))
+    day = timeutils.local_epoch(datetime.date(2030, 1, 7), ctx.tz)
+    assert ctx.get_event_store().busy_intervals(day - 86400, day + 2 * 86400) == [(day, day + 86400)]
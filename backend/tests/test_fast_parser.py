@@ -0,0 +1,112 @@
+import asyncio
+import datetime
+
+import pytest
+
+import agent
+import fast_parser
+import timeutils
+from tenants import get_tenant
+
+NOW = datetime.datetime(2026, 10, 18, 9, 0)
+TOMORROW = '2026-10-19'
+
+
+def parse(message):
+    return fast_parser.parse_message(message, NOW)
+
+
+@pytest.mark.parametrize('message, summary, start, end', [
+    ("book team sync tomorrow at 3pm for 30 minutes", 'Team sync', '15:00', '15:30'),
+    ("book 2 hour workshop tomorrow at 2pm", 'Workshop', '14:00', '16:00'),
+    ("book sync tomorrow from 9am to 10", 'Sync', '09:00', '10:00'),
+    ("book review tomorrow from 11am to 1", 'Review', '11:00', '13:00'),
+    ("book lunch tomorrow at 1pm for an hour and a half", 'Lunch', '13:00', '14:30'),
+    ("schedule dentist tomorrow at 10am for half an hour", 'Dentist', '10:00', '10:30'),
+    ("book team sync tomorrow 3-4pm", 'Team sync', '15:00', '16:00'),
+])
+def test_booking_durations_and_ranges(message, summary, start, end):
+    info, confidence = parse(message)
+    assert confidence >= fast_parser.FAST_PATH_MIN_CONFIDENCE
+    assert (info['intent'], info['summary'], info['date'], info['start_time'], info['end_time']) == \
+        ('book', summary, TOMORROW, start, end)
+
+
+@pytest.mark.parametrize('message', [
+    "book standup tomorrow at 11:30pm",              # would end past midnight
+    "book late call tomorrow at 11pm for 2 hours",
+    "book sync tomorrow 3-4pm for 30 minutes",       # range and length disagree
+    "book check-in tomorrow at 1pm for 2.7 minutes",
+    "book 1:1 with sam tomorrow at 3pm",              # leftover digits in the summary
+])
+def test_unclear_bookings_go_to_gemini(message):
+    _, confidence = parse(message)
+    assert confidence < fast_parser.FAST_PATH_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize('message', [
+    "did you book my meeting tomorrow at 3pm?",
+    "did you book my meeting tomorrow at 3pm",
+    "can I book something at 2pm today?",
+    "what did I book for tomorrow at 3pm?",
+    "how do I schedule a call tomorrow at 3pm?",
+    "should I book the dentist tomorrow at 3pm?",
+    "when should we schedule lunch tomorrow at 1pm?",
+    "can you book sync tomorrow at 3pm?",
+    "book my meeting tomorrow at 3pm",               # summary left starting with a pronoun
+])
+def test_questions_about_bookings_go_to_gemini(message):
+    _, confidence = parse(message)
+    assert confidence < fast_parser.FAST_PATH_MIN_CONFIDENCE
+
+
+def test_polite_request_is_still_a_booking():
+    info, confidence = parse("can you book sync tomorrow at 3pm")
+    assert confidence >= fast_parser.FAST_PATH_MIN_CONFIDENCE and info['summary'] == 'Sync'
+
+
+@pytest.mark.parametrize('message', ["ok", "okay", "cool", "great", "thanks", "thx", "sounds good"])
+def test_acknowledgements_are_not_smalltalk(message):
+    info, confidence = parse(message)
+    assert info['intent'] is None
+    assert confidence < fast_parser.FAST_PATH_MIN_CONFIDENCE
+
+
+def test_greeting_is_smalltalk():
+    assert parse("hi there")[0]['intent'] == 'smalltalk'
+
+
+def test_local_intent_rejects_end_before_start(monkeypatch):
+    bad = dict(fast_parser.empty_info(), intent='book', summary='Sync', date=TOMORROW,
+               start_time='15:00', end_time='14:00')
+    monkeypatch.setattr(fast_parser, 'parse_message', lambda message, now=None: (bad, 0.9))
+    assert agent.local_intent("book sync", tenant=get_tenant()) is None
+
+
+def test_chat_books_the_stated_length_without_gemini(services):
+    tenant, llm, calendar = services
+    day = tenant.now().date() + datetime.timedelta(days=1)
+    asyncio.run(agent.chat_with_agent("book team sync tomorrow at 3pm for 30 minutes", tenant=tenant))
+    start = timeutils.local_epoch(day, tenant.tz, 15)
+    assert calendar.busy(start, start + 3600) == [(start, start + 1800)]
+    assert llm.calls == 0
+
+
+def test_chat_sends_late_bookings_to_gemini(services):
+    tenant, llm, calendar = services
+    asyncio.run(agent.chat_with_agent("book standup tomorrow at 11:30pm", tenant=tenant))
+    assert llm.calls == 1
+    assert calendar.calls['events.insert'] == 0
+
+
+def test_chat_sends_acknowledgements_to_gemini(services):
+    tenant, llm, _ = services
+    asyncio.run(agent.chat_with_agent("ok", [{'role': 'assistant', 'content': 'How about 4pm?'}], tenant=tenant))
+    assert llm.calls == 1
+
+
+def test_chat_does_not_book_on_a_question(services):
+    tenant, llm, calendar = services
+    asyncio.run(agent.chat_with_agent("did you book my meeting tomorrow at 3pm?", tenant=tenant))
+    assert llm.calls == 1
+    assert calendar.calls['events.insert'] == 0
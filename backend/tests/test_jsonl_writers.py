@@ -0,0 +1,33 @@
+import json
+import logging
+import threading
+
+import fakes
+import tracing
+from token_ledger import TokenLedger
+
+
+def test_token_ledger_writes_from_a_background_thread(tmp_path, monkeypatch):
+    writing_threads = []
+    emit = logging.FileHandler.emit
+
+    def tracking_emit(self, record):
+        writing_threads.append(threading.current_thread())
+        emit(self, record)
+    monkeypatch.setattr(logging.FileHandler, 'emit', tracking_emit)
+    ledger = TokenLedger(str(tmp_path / 'tokens.jsonl'))
+    ledger.record('chat', fakes.FakeResponse('hi', fakes._Usage(10, 2)), 'smalltalk')
+    ledger._writer.flush()
+    assert writing_threads and threading.main_thread() not in writing_threads
+    line, = (tmp_path / 'tokens.jsonl').read_text().splitlines()
+    assert json.loads(line)['input_tokens'] == 10
+
+
+def test_trace_exporter_writes_spans(tmp_path, monkeypatch):
+    exporter = tracing.JsonlExporter(str(tmp_path / 'trace.jsonl'))
+    monkeypatch.setattr(tracing, 'exporter', exporter)
+    with tracing.span('test.work', size=3):
+        pass
+    exporter._writer.flush()
+    record = json.loads((tmp_path / 'trace.jsonl').read_text())
+    assert record['span'] == 'test.work' and record['size'] == 3
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+import fakes
+import resilience
+from calendar_utils import CalendarContext
+
+
+def calendar(latency=0.0, error_rate=0.0):
+    ctx = CalendarContext(cache_ttl=0, max_concurrency=1)
+    ctx.set_service(fakes.FakeCalendarService(latency=latency, error_rate=error_rate))
+    return ctx
+
+
+def freebusy(ctx):
+    body = {'timeMin': '2030-01-07T00:00:00Z', 'timeMax': '2030-01-08T00:00:00Z', 'items': [{'id': 'x'}]}
+    return ctx.execute(ctx.get_service().freebusy().query(body=body))
+
+
+def test_timed_out_call_keeps_its_tenant_slot(monkeypatch):
+    monkeypatch.setattr(resilience, 'CALENDAR_TIMEOUT', 0.1)
+    stalled, healthy = calendar(latency=0.5), calendar()
+
+    async def scenario():
+        with pytest.raises(resilience.DeadlineExceeded):
+            await stalled.run(freebusy, stalled)
+        # The stalled thread still runs, so this tenant's only slot stays taken...
+        assert stalled._semaphore.locked()
+        with pytest.raises(resilience.DeadlineExceeded):
+            await stalled.run(freebusy, stalled)
+        # ...while other tenants are unaffected
+        await healthy.run(freebusy, healthy)
+        await asyncio.sleep(0.6)
+        assert not stalled._semaphore.locked()
+
+    asyncio.run(scenario())
+
+
+def test_breakers_are_per_calendar(monkeypatch):
+    monkeypatch.setattr(resilience, 'RETRY_ATTEMPTS', 1)
+    failing, healthy = calendar(error_rate=1.0), calendar()
+    for _ in range(failing.breaker.failure_threshold):
+        with pytest.raises(Exception):
+            freebusy(failing)
+    with pytest.raises(resilience.CircuitOpen):
+        freebusy(failing)
+    assert freebusy(healthy)
+    assert not healthy.breaker.is_open()
+
+
+def test_cancelled_half_open_trial_lets_the_next_call_through():
+    breaker = resilience.CircuitBreaker('test', failures=1, reset_timeout=0)
+    breaker.failure()
+    started = asyncio.Event()
+
+    async def stalled():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def ok():
+        return 'ok'
+
+    async def scenario():
+        trial = asyncio.ensure_future(resilience.acall(stalled, breaker, timeout=30))
+        await started.wait()
+        assert breaker.state == 'half_open'
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert await resilience.acall(ok, breaker, timeout=30) == 'ok'
+        assert breaker.state == 'closed'
+
+    asyncio.run(scenario())
@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import httpx
+from google.api_core import exceptions as google_exceptions
+
+import agent
+import fakes
+import resilience
+from booking import SlotReservationTimeout
+from main import app
+
+
+def stream(message):
+    """The /chat/stream events for message, as dicts."""
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://calpal') as client:
+            resp = await client.post('/chat/stream', json={'message': message})
+            return [json.loads(line[len('data: '):]) for line in resp.text.splitlines() if line]
+    return asyncio.run(post())
+
+
+def break_stream(monkeypatch, error, after=1):
+    """Make Gemini streams raise error after `after` chunks."""
+    iterate = fakes.FakeStream._iterate
+
+    async def broken(self):
+        n = 0
+        async for chunk in iterate(self):
+            if n == after:
+                raise error
+            n += 1
+            yield chunk
+    monkeypatch.setattr(fakes.FakeStream, '_iterate', broken)
+
+
+def test_stream_that_breaks_off_ends_with_reply_and_done(services, monkeypatch):
+    _, llm, _ = services
+    llm.default = "Hello there! I can look at your calendar or book something for you."
+    breaker = resilience.CircuitBreaker('gemini')
+    monkeypatch.setattr(agent.gemini_pool, 'breaker', breaker)
+    break_stream(monkeypatch, google_exceptions.ServiceUnavailable('dropped'))
+    events = stream("tell me a joke")
+    assert [e['type'] for e in events] == ['delta', 'reply', 'done']
+    assert events[1]['text'] == agent.GEMINI_DOWN_REPLY
+    assert breaker._failures == 1
+
+
+def test_stalled_chunk_is_bounded(services, monkeypatch):
+    _, llm, _ = services
+    llm.default = "Hello there! I can look at your calendar or book something for you."
+    monkeypatch.setattr(agent.gemini_pool, 'timeout', 0.1)
+    iterate = fakes.FakeStream._iterate
+
+    async def stalling(self):
+        async for chunk in iterate(self):
+            yield chunk
+            await asyncio.sleep(5)
+    monkeypatch.setattr(fakes.FakeStream, '_iterate', stalling)
+    events = stream("tell me a joke")
+    assert [e['type'] for e in events][-2:] == ['reply', 'done']
+
+
+def test_errors_after_the_stream_end_with_reply_and_done(services, monkeypatch):
+    tenant, llm, _ = services
+    llm.responses["book a sync with the design folks sometime soon"] = json.dumps(
+        {'intent': 'book', 'summary': 'Sync', 'date': tenant.now().date().isoformat(),
+         'start_time': '23:00', 'end_time': '23:30', 'attendees': []})
+
+    async def busy(*args, **kwargs):
+        raise SlotReservationTimeout('slot is still being booked')
+    monkeypatch.setattr(agent, 'reply_for_intent', busy)
+    events = stream("book a sync with the design folks sometime soon")
+    assert events[-2] == {'type': 'reply', 'text': agent.SLOT_BUSY_REPLY}
+    assert events[-1]['type'] == 'done' and events[-1]['session_id']
+
+    async def down(*args, **kwargs):
+        raise resilience.CircuitOpen('calendar', 30)
+    monkeypatch.setattr(agent, 'reply_for_intent', down)
+    events = stream("book a sync with the design folks sometime soon")
+    assert events[-2] == {'type': 'reply', 'text': agent.CALENDAR_DOWN_REPLY}
+    assert events[-1]['type'] == 'done'
+
+
+def test_repair_is_counted_under_the_streamed_template(services, monkeypatch):
+    tenant, llm, _ = services
+    message = "put something in for the design review"
+    # Plain-text mode answers with broken JSON; the JSON-mode repair call gets a valid intent
+    replies = iter(['{"intent": "book", "summary": ', json.dumps(
+        {'intent': 'smalltalk', 'summary': None, 'date': None, 'start_time': None, 'end_time': None,
+         'attendees': [], 'reply': 'Sure, when?'})])
+    monkeypatch.setattr(llm, 'reply_for', lambda prompt: next(replies))
+    monkeypatch.setattr(agent, 'token_ledger', type(agent.token_ledger)())
+    monkeypatch.setattr(agent, 'parse_stats', type(agent.parse_stats)())
+    events = stream(message)
+    assert events[-2]['type'] == 'reply'
+    assert {(row['template'], row['intent']) for row in agent.token_ledger.stats()} == \
+        {('chat', 'invalid'), ('chat', 'repair')}
+    assert agent.parse_stats.stats()['chat']['repaired'] == 1
@@ -0,0 +1,89 @@
+"""
+Datetime core. Datetimes are converted to integer UTC epoch seconds once, where they enter
+(API requests, parsed intents, Google responses). All interval math runs on those integers, and
+they are turned back into datetimes or RFC3339 strings only for output.
+Timezones are zoneinfo objects, looked up once per name.
+"""
+import datetime
+import functools
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+UTC = datetime.timezone.utc
+
+
+class UnknownTimezone(ValueError):
+    pass
+
+
+@functools.lru_cache(maxsize=None)
+def get_tz(name):
+    """The ZoneInfo for an IANA name such as "Asia/Kolkata". Raises UnknownTimezone."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise UnknownTimezone(name)
+
+
+def localize(dt, tz):
+    """dt with tz attached if it is naive; aware datetimes are returned as they are."""
+    return dt.replace(tzinfo=tz) if dt.tzinfo is None else dt
+
+
+def to_epoch(dt, tz):
+    """Epoch seconds for dt; a naive dt is wall-clock time in tz."""
+    return int(localize(dt, tz).timestamp())
+
+
+def from_epoch(ts, tz):
+    return datetime.datetime.fromtimestamp(ts, tz)
+
+
+def to_rfc3339(ts):
+    """UTC RFC3339 string for the Google APIs, e.g. "2025-07-07T03:30:00Z"."""
+    return datetime.datetime.fromtimestamp(ts, UTC).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def parse_iso(value):
+    """Datetime from an ISO 8601 / RFC3339 string; naive if the string has no offset."""
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return datetime.datetime.fromisoformat(value)
+
+
+def parse_rfc3339(value):
+    """Epoch seconds from an RFC3339 timestamp with a "Z" or numeric offset."""
+    return int(parse_iso(value).timestamp())
+
+
+def event_epoch(value, tz):
+    """Epoch seconds of an event's start/end (timed, or all-day in the event's or else tz's zone)."""
+    if 'dateTime' in value:
+        return parse_rfc3339(value['dateTime'])
+    if 'date' in value:
+        zone = get_tz(value['timeZone']) if value.get('timeZone') else tz
+        return local_epoch(datetime.date.fromisoformat(value['date']), zone)
+    return None
+
+
+def local_epoch(day, tz, hour=0, minute=0):
+    """Epoch seconds of hour:minute local time on day (DST gaps resolve like zoneinfo does)."""
+    return int(datetime.datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz).timestamp())
+
+
+def local_midnight(ts, tz):
+    """Epoch seconds of the local midnight starting the day that contains ts."""
+    return local_epoch(from_epoch(ts, tz).date(), tz)
+
+
+def local_dates(start, end, tz):
+    """Local calendar dates from the one containing start through the one containing end."""
+    day = from_epoch(start, tz).date()
+    last = from_epoch(end, tz).date()
+    while day <= last:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def now(tz):
+    """Current wall-clock time in tz, naive (like datetime.now())."""
+    return datetime.datetime.now(tz).replace(tzinfo=None)
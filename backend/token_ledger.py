@@ -0,0 +1,59 @@
+import os
+import threading
+import time
+from logging_setup import JsonlWriter
+
+# Optional JSONL file with one line per Gemini call, read by token_report.py (empty = no file)
+TOKEN_LOG_FILE = os.getenv('TOKEN_LOG_FILE', '')
+
+
+def usage_counts(response):
+    """(input, output, cached) token counts from a Gemini response's usage_metadata."""
+    usage = getattr(response, 'usage_metadata', None)
+    return (getattr(usage, 'prompt_token_count', 0) or 0,
+            getattr(usage, 'candidates_token_count', 0) or 0,
+            getattr(usage, 'cached_content_token_count', 0) or 0)
+
+
+class TokenLedger:
+    """
+    Input/output token counts per Gemini call, totalled by prompt template and intent, and
+    optionally appended to a JSONL log for offline reports (written by a background thread).
+    """
+
+    def __init__(self, path=TOKEN_LOG_FILE):
+        self.path = path or None
+        self._writer = JsonlWriter(self.path) if self.path else None
+        self._totals = {}  # (template, intent) -> [calls, input, output, cached]
+        self._lock = threading.Lock()
+
+    def record(self, template, response, intent=None):
+        input_tokens, output_tokens, cached_tokens = usage_counts(response)
+        intent = intent or 'unknown'
+        with self._lock:
+            totals = self._totals.setdefault((template, intent), [0, 0, 0, 0])
+            totals[0] += 1
+            totals[1] += input_tokens
+            totals[2] += output_tokens
+            totals[3] += cached_tokens
+        if self._writer is not None:
+            self._writer.write({
+                'ts': round(time.time(), 3),
+                'template': template,
+                'intent': intent,
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'cached_tokens': cached_tokens,
+            })
+
+    def stats(self):
+        with self._lock:
+            return [{
+                'template': template,
+                'intent': intent,
+                'calls': calls,
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'cached_tokens': cached_tokens,
+            } for (template, intent), (calls, input_tokens, output_tokens, cached_tokens)
+                in sorted(self._totals.items())]
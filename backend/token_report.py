@@ -0,0 +1,47 @@
+"""
+Offline report of Gemini token usage per prompt template and intent, from the TOKEN_LOG_FILE log.
+
+    python token_report.py [path/to/tokens.jsonl] [--since-hours 24]
+"""
+import argparse
+import collections
+import json
+import os
+import time
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('path', nargs='?', default=os.getenv('TOKEN_LOG_FILE', 'tokens.jsonl'))
+    ap.add_argument('--since-hours', type=float, default=None)
+    args = ap.parse_args()
+
+    cutoff = time.time() - args.since_hours * 3600 if args.since_hours else 0
+    groups = collections.defaultdict(list)  # (template, intent) -> [(input, output, cached)]
+    with open(args.path) as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry['ts'] >= cutoff:
+                groups[(entry['template'], entry['intent'])].append(
+                    (entry['input_tokens'], entry['output_tokens'], entry.get('cached_tokens', 0)))
+
+    grand_total = sum(i + o for rows in groups.values() for i, o, _ in rows) or 1
+    print(f"{'template':<10} {'intent':<18} {'calls':>7} {'avg in':>8} {'p95 in':>8} {'avg out':>8} "
+          f"{'cached':>8} {'total':>10} {'share':>7}")
+    for (template, intent), rows in sorted(groups.items(), key=lambda g: -sum(i + o for i, o, _ in g[1])):
+        inputs = [i for i, _, _ in rows]
+        total = sum(i + o for i, o, _ in rows)
+        print(f"{template:<10} {intent:<18} {len(rows):>7} {sum(inputs) / len(rows):>8.0f} "
+              f"{percentile(inputs, 0.95):>8} {sum(o for _, o, _ in rows) / len(rows):>8.0f} "
+              f"{sum(c for _, _, c in rows):>8} {total:>10} {total / grand_total:>7.1%}")
+    calls = sum(len(rows) for rows in groups.values())
+    print(f"{calls} calls, {grand_total if calls else 0} tokens")
+
+
+if __name__ == "__main__":
+    main()
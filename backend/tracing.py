@@ -0,0 +1,206 @@
+"""
+Request tracing and latency metrics.
+
+Every request gets a request ID (from X-Request-ID or generated) kept in a contextvar, so spans
+opened anywhere below it (agent, Gemini pool, calendar threads) are tagged with it. Finished spans
+feed Prometheus-style latency histograms served at /metrics, and are optionally appended as JSON
+lines to TRACE_FILE by a background thread.
+"""
+import bisect
+import contextlib
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+import uuid
+from logging_setup import JsonlWriter
+
+# Optional JSONL file of finished spans (empty = spans only feed the histograms)
+TRACE_FILE = os.getenv('TRACE_FILE', '')
+
+# Seconds; covers cache hits (sub-millisecond) up to slow Gemini calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+request_id_var = contextvars.ContextVar('request_id', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with one series per label tuple."""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted(self._series.items())
+            items = [(labels, list(series)) for labels, series in items]
+        for labels, series in items:
+            base = ','.join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+            sep = ',' if base else ''
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{{base}}} {series[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{base}}} {series[-1]}')
+        return '\n'.join(lines)
+
+
+request_seconds = Histogram('calpal_request_seconds', 'HTTP request latency by path and intent.',
+                            ('path', 'intent', 'status'))
+dependency_seconds = Histogram('calpal_dependency_seconds', 'Latency of spans (external calls and parse steps).',
+                               ('span', 'outcome'))
+
+
+class JsonlExporter:
+    """Appends finished spans to path from a background thread (see logging_setup.JsonlWriter)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._writer = JsonlWriter(path)
+
+    def export(self, record):
+        self._writer.write(record)
+
+
+exporter = JsonlExporter(TRACE_FILE) if TRACE_FILE else None
+
+
+class Span:
+    __slots__ = ('name', 'attrs', 'parent', 'start', 'duration')
+
+    def __init__(self, name, attrs, parent):
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """Time a block as a child of the current span. Yields the Span so callers can add attributes."""
+    parent = _current_span.get()
+    current = Span(name, attrs, parent)
+    token = _current_span.set(current)
+    outcome = 'ok'
+    try:
+        yield current
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        _current_span.reset(token)
+        current.duration = time.perf_counter() - current.start
+        dependency_seconds.observe(current.duration, name, outcome)
+        if exporter is not None:
+            exporter.export({
+                'request_id': request_id_var.get(),
+                'span': name,
+                'parent': parent.name if parent else None,
+                'duration_ms': round(current.duration * 1e3, 3),
+                'outcome': outcome,
+                **current.attrs,
+            })
+
+
+def traced(name):
+    """Decorator form of span() for whole functions."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def current_span():
+    return _current_span.get()
+
+
+def set_request_attribute(**attrs):
+    """Attach attributes (e.g. intent) to the request's root span."""
+    current = _current_span.get()
+    while current is not None and current.parent is not None:
+        current = current.parent
+    if current is not None:
+        current.set(**attrs)
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request ID to every log record as record.request_id."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get() or '-'
+        return True
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware: assigns the request ID, opens the root span and records request latency
+    once the response body has been sent (so streamed responses are timed to the end).
+    """
+
+    def __init__(self, app, skip_paths=('/metrics',)):
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] in self.skip_paths:
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get('headers') or [])
+        request_id = headers.get(b'x-request-id', b'').decode('latin-1')[:64] or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                message.setdefault('headers', [])
+                message['headers'] = list(message['headers']) + [(b'x-request-id', request_id.encode('latin-1'))]
+            await send(message)
+
+        root = Span('http', {'path': scope['path'], 'method': scope.get('method')}, None)
+        span_token = _current_span.set(root)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _current_span.reset(span_token)
+            root.duration = time.perf_counter() - root.start
+            # The route template (e.g. /sessions/{session_id}) keeps label cardinality bounded
+            path = getattr(scope.get('route'), 'path', scope['path'])
+            request_seconds.observe(root.duration, path, root.attrs.get('intent', 'none'), str(status))
+            if exporter is not None:
+                exporter.export({'request_id': request_id, 'span': 'http', 'parent': None,
+                                 'duration_ms': round(root.duration * 1e3, 3), 'status': status, **root.attrs})
+            request_id_var.reset(token)
+
+
+def render_metrics():
+    return '\n'.join([request_seconds.render(), dependency_seconds.render()]) + '\n'
@@ -3,44 +3,21 @@ import requests
 import random
 import math
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Generate 120 stars, each with a random direction and speed
-star_styles = []
-star_keyframes = []
-for i in range(120):
-    left = random.randint(0, 99)
-    top = random.randint(0, 99)
-    duration = random.uniform(8, 18)
-    delay = random.uniform(0, 10)
-    angle = random.uniform(0, 360)
-    distance = random.randint(60, 120)  # how far the star will travel (vh)
-    # Calculate x/y offset using angle
-    dx = distance * random.uniform(0.7, 1.0) * math.cos(math.radians(angle))
-    dy = distance * random.uniform(0.7, 1.0) * math.sin(math.radians(angle))
-    # Unique keyframes for each star
-    kf_name = f"moveStar{i}"
-    star_styles.append(
-        f'<div class="star" style="left:{left}vw; top:{top}vh; animation: {kf_name} {duration:.1f}s linear {delay:.1f}s infinite;"></div>'
-    )
-    star_keyframes.append(
-        f"""
-        @keyframes {kf_name} {{
-            0% {{ transform: translate(0, 0); opacity: 0.85; }}
-            90% {{ opacity: 0.85; }}
-            100% {{ transform: translate({dx:.1f}px, {dy:.1f}px); opacity: 0.2; }}
-        }}
-        """
-    )
+st.set_page_config(page_title="CalPal - AI Calendar Assistant", page_icon="🪐")
 
-star_divs = "".join(star_styles)
-keyframes_css = "\n".join(star_keyframes)
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000/chat")
+# Server-sent events variant of the chat endpoint (defaults to <BACKEND_URL>/stream)
+BACKEND_STREAM_URL = os.getenv("BACKEND_STREAM_URL", BACKEND_URL.rstrip("/") + "/stream")
+# Messages shown before "Show earlier messages"; older ones are not rendered until asked for
+HISTORY_PAGE = int(os.getenv("CHAT_HISTORY_PAGE", "20"))
 
-# Custom CSS for chat area, input, and message bubbles
-st.markdown(
-    f"""
+# Custom CSS for chat area, input, and message bubbles (filled in by page_assets())
+PAGE_TEMPLATE = """
     <style>
     @import url('https://fonts.googleapis.com/css2?family=Orbitron:wght@700&family=Share+Tech+Mono&display=swap');
     body, .stApp {{
@@ -225,13 +202,67 @@ st.markdown(
     .custom-send-btn:hover {{
         box-shadow: 0 0 32px #00c3ffcc;
     }}
+    /* Chat form input and send button */
+    .custom-input-box:focus, .custom-input-box.not-empty {{ background: #232526 !important; }}
+    button[kind="secondary"] {{
+        background: linear-gradient(90deg, #a259ff 0%, #00c3ff 100%) !important;
+        color: #fff !important;
+        border-radius: 12px !important;
+        font-family: 'Orbitron', monospace !important;
+        font-size: 1.3rem !important;
+        font-weight: 700 !important;
+        box-shadow: 0 0 16px #a259ff88 !important;
+        padding: 0.7rem 1.3rem !important;
+        cursor: pointer !important;
+        display: flex !important;
+        align-items: center !important;
+        gap: 0.5rem !important;
+        transition: box-shadow 0.2s !important;
+    }}
+    button[kind="secondary"]:hover {{
+        box-shadow: 0 0 32px #00c3ffcc !important;
+    }}
     </style>
     <div class="stars">{star_divs}</div>
-    """,
-    unsafe_allow_html=True
-)
+    """
 
-st.set_page_config(page_title="CalPal - AI Calendar Assistant", page_icon="🪐")
+@st.cache_resource
+def page_assets():
+    """
+    The page CSS and the starfield, built once per server process. Every rerun sends the same
+    string, which the browser already has cached (Streamlit sends repeated large elements by
+    hash), and the stars keep their places instead of jumping on each message.
+    """
+    # Generate 120 stars, each with a random direction and speed
+    star_styles = []
+    star_keyframes = []
+    for i in range(120):
+        left = random.randint(0, 99)
+        top = random.randint(0, 99)
+        duration = random.uniform(8, 18)
+        delay = random.uniform(0, 10)
+        angle = random.uniform(0, 360)
+        distance = random.randint(60, 120)  # how far the star will travel (vh)
+        # Calculate x/y offset using angle
+        dx = distance * random.uniform(0.7, 1.0) * math.cos(math.radians(angle))
+        dy = distance * random.uniform(0.7, 1.0) * math.sin(math.radians(angle))
+        # Unique keyframes for each star
+        kf_name = f"moveStar{i}"
+        star_styles.append(
+            f'<div class="star" style="left:{left}vw; top:{top}vh; animation: {kf_name} {duration:.1f}s linear {delay:.1f}s infinite;"></div>'
+        )
+        star_keyframes.append(
+            f"""
+            @keyframes {kf_name} {{
+                0% {{ transform: translate(0, 0); opacity: 0.85; }}
+                90% {{ opacity: 0.85; }}
+                100% {{ transform: translate({dx:.1f}px, {dy:.1f}px); opacity: 0.2; }}
+            }}
+            """
+        )
+    return PAGE_TEMPLATE.format(star_divs="".join(star_styles), keyframes_css="\n".join(star_keyframes))
+
+st.markdown(page_assets(), unsafe_allow_html=True)
 
 # Space-themed header
 st.markdown(
@@ -247,36 +278,66 @@ st.markdown(
 
 if "messages" not in st.session_state:
     st.session_state["messages"] = []
+# The backend keeps the conversation; we only send the new message and this ID
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = None
+if "history_shown" not in st.session_state:
+    st.session_state["history_shown"] = HISTORY_PAGE
 
-# Display chat history with custom bubbles and icons
-for msg in st.session_state["messages"]:
-    if msg["role"] == "user":
-        st.markdown(
-            f'''
+def user_html(content):
+    return f'''
             <div class="custom-user-msg fade-in">
-                <div class="user-bubble">{msg["content"]}</div>
+                <div class="user-bubble">{content}</div>
                 <div class="user-icon">
                     <img src="https://img.icons8.com/ios-filled/50/00c3ff/astronaut.png" width="26" height="26" alt="User" />
                 </div>
             </div>
-            ''', unsafe_allow_html=True
-        )
-    else:
-        st.markdown(
-            f'''
+            '''
+
+def assistant_html(content):
+    return f'''
             <div class="custom-assistant-msg fade-in">
                 <div class="assistant-icon">
                     <img src="https://img.icons8.com/ios-filled/50/a259ff/robot-2.png" width="26" height="26" alt="Bot" />
                 </div>
-                <div class="assistant-bubble">{msg["content"]}</div>
+                <div class="assistant-bubble">{content}</div>
             </div>
-            ''', unsafe_allow_html=True
-        )
+            '''
+
+def status_html(text):
+    return f'<div style="text-align:center; color:#a259ff; font-size:1.2rem; margin:1.5rem 0;">{text}</div>'
+
+def message_html(msg):
+    # Rendered once and kept on the message, so reruns only join strings
+    html = msg.get("html")
+    if html is None:
+        html = msg["html"] = (user_html if msg["role"] == "user" else assistant_html)(msg["content"])
+    return html
+
+def add_message(role, content):
+    msg = {"role": role, "content": content}
+    message_html(msg)
+    st.session_state["messages"].append(msg)
+    return msg
+
+def show_earlier():
+    st.session_state["history_shown"] += HISTORY_PAGE
+
+# Chat history: the latest messages in a single markdown element, older ones on request
+history = st.container()
+with history:
+    messages = st.session_state["messages"]
+    hidden = max(0, len(messages) - st.session_state["history_shown"])
+    if hidden:
+        st.button(f"Show {min(hidden, HISTORY_PAGE)} earlier messages ({hidden} hidden)",
+                  on_click=show_earlier, key="show_earlier")
+    if messages:
+        st.markdown("".join(message_html(msg) for msg in messages[hidden:]), unsafe_allow_html=True)
 
 # Add custom instruction above the input
 st.markdown('<div style="text-align:center; color:#b2b7ff; font-size:1.1rem; margin-bottom:0.5rem;">Press the rocket button 🚀 to submit your message.</div>', unsafe_allow_html=True)
 
-# Custom input area using Streamlit's public API
+# Custom input area using Streamlit's public API (its CSS is part of page_assets())
 with st.form(key="custom-chat-form", clear_on_submit=True):
     col1, col2 = st.columns([8, 1])
     with col1:
@@ -286,89 +347,49 @@ with st.form(key="custom-chat-form", clear_on_submit=True):
             key="input_box",
             label_visibility="collapsed",
         )
-        # Add dynamic styling for input box
-        user_input_class = "custom-input-box"
-        if user_input and user_input.strip():
-            user_input_class += " not-empty"
-        st.markdown(f"""
-            <style>
-            .custom-input-box {{ background: #181828; }}
-            .custom-input-box:focus, .custom-input-box.not-empty {{ background: #232526 !important; }}
-            </style>
-            <script>
-            const input = window.parent.document.querySelector('input[data-testid="stTextInput"]');
-            if (input) {{
-                input.classList.add('{user_input_class}');
-                input.addEventListener('input', function() {{
-                    if (this.value) {{
-                        this.classList.add('not-empty');
-                    }} else {{
-                        this.classList.remove('not-empty');
-                    }}
-                }});
-            }}
-            </script>
-        """, unsafe_allow_html=True)
     with col2:
         send_clicked = st.form_submit_button(
             label="\U0001F680",  # Rocket emoji
             help="Send message",
             use_container_width=True
         )
-    st.markdown(
-        """
-        <style>
-        button[kind="secondary"] {
-            background: linear-gradient(90deg, #a259ff 0%, #00c3ff 100%) !important;
-            color: #fff !important;
-            border-radius: 12px !important;
-            font-family: 'Orbitron', monospace !important;
-            font-size: 1.3rem !important;
-            font-weight: 700 !important;
-            box-shadow: 0 0 16px #a259ff88 !important;
-            padding: 0.7rem 1.3rem !important;
-            cursor: pointer !important;
-            display: flex !important;
-            align-items: center !important;
-            gap: 0.5rem !important;
-            transition: box-shadow 0.2s !important;
-        }
-        button[kind="secondary"]:hover {
-            box-shadow: 0 0 32px #00c3ffcc !important;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
-
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000/chat")
 
-# Add a session state flag for bot thinking
-if "bot_thinking" not in st.session_state:
-    st.session_state["bot_thinking"] = False
+def stream_reply(message, placeholder):
+    """Stream the bot reply for message into placeholder; returns the final reply text."""
+    placeholder.markdown(status_html("🤖 Bot is thinking..."), unsafe_allow_html=True)
+    bot_reply = ""
+    try:
+        with requests.post(
+            BACKEND_STREAM_URL,
+            json={"message": message, "session_id": st.session_state["session_id"]},
+            stream=True,
+            timeout=30
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                line = line.decode("utf-8")
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                if event["type"] == "delta":
+                    bot_reply += event["text"]
+                    placeholder.markdown(assistant_html(bot_reply + " ▌"), unsafe_allow_html=True)
+                elif event["type"] == "status":
+                    placeholder.markdown(status_html(event["text"]), unsafe_allow_html=True)
+                elif event["type"] == "reply":
+                    bot_reply = event["text"]
+                elif event["type"] == "done":
+                    st.session_state["session_id"] = event.get("session_id")
+        bot_reply = bot_reply or "(No response)"
+    except Exception as e:
+        bot_reply = f"Error: {e}"
+    return bot_reply
 
+# The new turn is drawn into the history container in this same run (no st.rerun): the user's
+# bubble, then the reply streamed into a placeholder that ends up holding the final bubble
 if send_clicked and user_input.strip():
-    st.session_state["messages"].append({"role": "user", "content": user_input.strip()})
-    st.session_state["bot_thinking"] = True
-    st.rerun()
-
-# Show 'Bot is thinking...' indicator if bot_thinking is True and last message is from user
-if st.session_state.get("bot_thinking", False):
-    if st.session_state["messages"] and st.session_state["messages"][-1]["role"] == "user":
-        st.markdown('<div style="text-align:center; color:#a259ff; font-size:1.2rem; margin:1.5rem 0;">🤖 Bot is thinking...</div>', unsafe_allow_html=True)
-        # Try to get bot reply
-        try:
-            # Send conversation history (excluding the last user message) for context
-            history = st.session_state["messages"][:-1]
-            response = requests.post(
-                BACKEND_URL,
-                json={"message": st.session_state["messages"][-1]["content"], "history": history},
-                timeout=30
-            )
-            response.raise_for_status()
-            bot_reply = response.json().get("response", "(No response)")
-        except Exception as e:
-            bot_reply = f"Error: {e}"
-        st.session_state["messages"].append({"role": "assistant", "content": bot_reply})
-        st.session_state["bot_thinking"] = False
-        st.rerun() 
\ No newline at end of file
+    with history:
+        st.markdown(add_message("user", user_input.strip())["html"], unsafe_allow_html=True)
+        placeholder = st.empty()
+    reply = add_message("assistant", stream_reply(user_input.strip(), placeholder))
+    placeholder.markdown(reply["html"], unsafe_allow_html=True)